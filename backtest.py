@@ -0,0 +1,255 @@
+"""
+Rolling-origin backtests for the forecast backends.
+
+Each cutoff is the first forecast month of a fold: the backend sees only the
+months before it and forecasts `horizon` months, which are scored against the
+actual quantities. Cutoffs step back from the end of the data, so the last
+fold's horizon ends on the last month.
+
+Backends (BACKENDS) return one point per (cutoff, item, month):
+
+  'summary'  the summary forecaster of generate_summary_stats.py. Summaries
+             are computed once at the first cutoff, then advanced month by
+             month with the incremental update (ingest_month) instead of
+             being recomputed for every fold, and all items are forecast in
+             one vectorized call per fold.
+  'prophet'  one Prophet fit per (fold, item), spread over a process pool with
+             optional per-fit timeouts (see parallel_training.py).
+  'seasonal_naive', 'holt_winters', 'croston', 'tsb'
+             the vectorized models of classical_models.py; one fit of all
+             items per fold. Items are selected as for 'prophet', so the
+             scores are directly comparable.
+
+Errors are reported per item and overall for each backend:
+
+  MAE   mean |y - yhat|
+  MAPE  mean |y - yhat| / y over points with y > 0, in %
+  WAPE  sum |y - yhat| / sum y, in %; comparable across items of any volume
+"""
+import functools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from classical_models import MODELS, fit_predict
+from dense_grid import read_grid_matrix
+from generate_summary_stats import compute_summaries, ingest_month
+from parallel_training import _run_pool
+from summary_store import records_from_summaries, table_from_records
+
+POINT_COLUMNS = ['backend', 'cutoff', 'item', 'ds', 'y', 'yhat']
+
+
+def _month_label(ordinal):
+    return f"{ordinal // 12}-{ordinal % 12 + 1:02d}"
+
+
+def _month_start(ordinal):
+    return pd.Timestamp(year=int(ordinal // 12), month=int(ordinal % 12 + 1), day=1)
+
+
+def rolling_cutoffs(first, n_months, horizon, folds, step=1, min_train=12):
+    # Cutoff ordinals, oldest first; folds without min_train months of history are dropped
+    last_cutoff = first + n_months - horizon
+    cutoffs = [last_cutoff - k * step for k in range(folds)]
+    return sorted(c for c in cutoffs if c - first >= min_train)
+
+
+def _points(backend, cutoff, items, rows, offsets, y, yhat):
+    return pd.DataFrame({
+        'backend': backend,
+        'cutoff': _month_label(cutoff),
+        'item': items[rows],
+        'ds': [_month_label(cutoff + h) for h in offsets],
+        'y': y,
+        'yhat': yhat,
+    }, columns=POINT_COLUMNS)
+
+
+# === Summary backend ===
+
+def _history_frame(items, first, qty, end):
+    # Long frame (Item_Code, YearMonth, Order_Qty) of the months before `end`
+    rows, cols = np.nonzero(~np.isnan(qty[:, :end - first]))
+    return pd.DataFrame({
+        'Item_Code': items[rows],
+        'YearMonth': pd.DatetimeIndex([_month_start(first + c) for c in range(end - first)])[cols],
+        'Order_Qty': qty[rows, cols],
+    })
+
+
+def summary_points(items, first, qty, cutoffs, horizon, min_train=12, **_):
+    qty_is_int = bool(np.all(np.nan_to_num(qty) == np.round(np.nan_to_num(qty))))
+
+    # Stats for every item with any history (min_months=1); eligibility is checked per fold
+    history = _history_frame(items, first, qty, cutoffs[0])
+    if qty_is_int:
+        history['Order_Qty'] = history['Order_Qty'].astype(np.int64)
+    names, records = records_from_summaries(compute_summaries(history, min_months=1, include_stats=True))
+    record_of = pd.Index(names).get_indexer(items)
+    known = np.flatnonzero(record_of >= 0)
+
+    frames = []
+    month = cutoffs[0]
+    for cutoff in cutoffs:
+        # === Advance the summaries to this cutoff, one month at a time ===
+        while month < cutoff:
+            values = qty[known, month - first]
+            present = ~np.isnan(values)
+            if present.any():
+                ingest_month(records, record_of[known[present]], values[present], _month_start(month), qty_is_int)
+            month += 1
+
+        # === Forecast all eligible items for the whole horizon in one call ===
+        offsets = np.arange(horizon)
+        month_nums = (cutoff + offsets) % 12 + 1
+        predicted, valid = table_from_records(names, records).forecast(month_nums, rows=record_of[known])
+        # Same selection as the other backends: min_train observed months before the cutoff
+        usable = valid & (records['n'][record_of[known]] >= min_train)
+
+        actual = qty[known[usable]][:, cutoff - first:cutoff - first + horizon]
+        rows, cols = np.nonzero(~np.isnan(actual))
+        frames.append(_points('summary', cutoff, items, known[usable][rows], offsets[cols],
+                              actual[rows, cols], predicted[usable][rows, cols].astype(float)))
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=POINT_COLUMNS)
+
+
+# === Prophet backend ===
+
+def _prophet_forecast(ds, y, target_ds):
+    from prophet import Prophet
+
+    model = Prophet()
+    model.fit(pd.DataFrame({'ds': ds, 'y': y}))
+    return model.predict(pd.DataFrame({'ds': target_ds}))['yhat'].to_numpy()
+
+
+def _prophet_task(task):
+    key, ds, y, target_ds = task
+    try:
+        return key, {'status': 'ok', 'yhat': _prophet_forecast(ds, y, target_ds)}
+    except Exception as e:
+        return key, {'status': 'failed', 'error': str(e)}
+
+
+def prophet_points(items, first, qty, cutoffs, horizon, min_train=12, workers=None, chunksize=4,
+                   timeout=None, **_):
+    # One task per (fold, item) with enough history and at least one actual in the horizon
+    tasks = []
+    targets = {}
+    for cutoff in cutoffs:
+        train = qty[:, :cutoff - first]
+        actual = qty[:, cutoff - first:cutoff - first + horizon]
+        enough = ((~np.isnan(train)).sum(axis=1) >= min_train) & (~np.isnan(actual)).any(axis=1)
+
+        train_ds = np.array([_month_start(first + c) for c in range(cutoff - first)])
+        for i in np.flatnonzero(enough):
+            seen = ~np.isnan(train[i])
+            offsets = np.flatnonzero(~np.isnan(actual[i]))
+            target_ds = [_month_start(cutoff + h) for h in offsets]
+            targets[(cutoff, i)] = (offsets, actual[i, offsets])
+            tasks.append(((cutoff, i), train_ds[seen], train[i, seen], target_ds))
+
+    frames = []
+    failures = 0
+    for (cutoff, i), entry in _run_pool(_prophet_task, tasks, workers or os.cpu_count(), chunksize, timeout):
+        if entry['status'] != 'ok':
+            failures += 1
+            continue
+        offsets, y = targets[(cutoff, i)]
+        frames.append(_points('prophet', cutoff, items, np.full(len(offsets), i), offsets, y, entry['yhat']))
+
+    points = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=POINT_COLUMNS)
+    points.attrs['failed'] = failures
+    return points
+
+
+# === Classical backends ===
+
+def classical_points(items, first, qty, cutoffs, horizon, model='holt_winters', min_train=12, **_):
+    frames = []
+    for cutoff in cutoffs:
+        train = qty[:, :cutoff - first]
+        actual = qty[:, cutoff - first:cutoff - first + horizon]
+        enough = np.flatnonzero(((~np.isnan(train)).sum(axis=1) >= min_train) & (~np.isnan(actual)).any(axis=1))
+
+        yhat = fit_predict(train[enough], model, horizon)[0][:, -horizon:]
+        rows, cols = np.nonzero(~np.isnan(actual[enough]))
+        frames.append(_points(model, cutoff, items, enough[rows], cols, actual[enough][rows, cols], yhat[rows, cols]))
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=POINT_COLUMNS)
+
+
+BACKENDS = {
+    'summary': summary_points,
+    'prophet': prophet_points,
+    **{name: functools.partial(classical_points, model=name) for name in MODELS},
+}
+
+
+# === Scoring ===
+
+def _errors(points):
+    err = (points['y'] - points['yhat']).abs()
+    nonzero = points['y'] > 0
+    return pd.DataFrame({
+        'backend': points['backend'],
+        'item': points['item'],
+        'abs_err': err,
+        'actual': points['y'].abs(),
+        'ape': np.where(nonzero, err / points['y'].where(nonzero, 1), np.nan),
+    })
+
+
+def _metrics(grouped):
+    out = pd.DataFrame({
+        'points': grouped['abs_err'].count(),
+        'MAE': grouped['abs_err'].mean(),
+        'MAPE': grouped['ape'].mean() * 100,
+        'WAPE': grouped['abs_err'].sum() / grouped['actual'].sum() * 100,
+    })
+    # WAPE is undefined for items whose actuals are all zero
+    return out.replace([np.inf, -np.inf], np.nan).round(2)
+
+
+def score(points):
+    # (per-item metrics, overall metrics per backend)
+    errors = _errors(points)
+    per_item = _metrics(errors.groupby(['backend', 'item'], sort=True)).reset_index()
+    overall = _metrics(errors.groupby('backend', sort=True)).reset_index()
+    return per_item, overall
+
+
+def run_backtest(input_file='final_output_with_nan.csv', output_dir='backtest', backends=('summary',),
+                 folds=6, horizon=3, step=1, min_train=12, workers=None, chunksize=4, timeout=None):
+    os.makedirs(output_dir, exist_ok=True)
+    items, first, qty = read_grid_matrix(input_file)
+    cutoffs = rolling_cutoffs(first, qty.shape[1], horizon, folds, step, min_train)
+    if not cutoffs:
+        raise ValueError("Not enough history for any fold; lower folds, horizon or min_train")
+
+    frames = []
+    failed = {}
+    for backend in backends:
+        points = BACKENDS[backend](items, first, qty, cutoffs, horizon, min_train=min_train,
+                                   workers=workers, chunksize=chunksize, timeout=timeout)
+        failed[backend] = points.attrs.get('failed', 0)
+        frames.append(points)
+    points = pd.concat(frames, ignore_index=True)
+
+    per_item, overall = score(points)
+    points.to_csv(os.path.join(output_dir, 'points.csv'), index=False)
+    per_item.to_csv(os.path.join(output_dir, 'item_metrics.csv'), index=False)
+
+    report = {
+        'config': {'input_file': input_file, 'backends': list(backends), 'cutoffs': [_month_label(c) for c in cutoffs],
+                   'horizon': horizon, 'step': step, 'min_train': min_train, 'workers': workers, 'timeout': timeout},
+        'failed_fits': failed,
+        'overall': overall.to_dict(orient='records'),
+    }
+    with open(os.path.join(output_dir, 'overall.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return per_item, overall
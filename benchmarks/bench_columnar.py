@@ -0,0 +1,72 @@
+"""
+Benchmark: reading the grid back from final_output_with_nan.csv vs a .grid directory.
+
+Builds the grid from orders2.csv (scaled up with synthetic item codes), saves
+it both ways and times what the later stages do on load: the items × months
+matrix (backtest, classical models, demand classes, ranking index) and the
+YearMonth / Item_Code / Order_Qty frame (summaries, Prophet, charts). Each
+read runs in a fresh process, so page cache is the only thing shared.
+
+    python benchmarks/bench_columnar.py --scales 1 10
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from bench_dense_grid import scale_orders
+from dense_grid import build_final_grid
+
+
+def _read(kind, path):
+    from dense_grid import read_grid_frame, read_grid_matrix
+
+    start = time.perf_counter()
+    if kind == 'matrix':
+        read_grid_matrix(path)
+    else:
+        read_grid_frame(path)
+    return time.perf_counter() - start
+
+
+def measure(kind, path, repeat):
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return min(pool.apply(_read, (kind, path)) for _ in range(repeat))
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+    return os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', default=os.path.join(REPO_DIR, 'orders2.csv'))
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            orders = os.path.join(tmp, f'orders_{scale}.csv')
+            scale_orders(args.orders, scale, orders)
+            csv_path = os.path.join(tmp, f'grid_{scale}.csv')
+            grid_path = os.path.join(tmp, f'grid_{scale}.grid')
+            build_final_grid(orders, grid_path, csv_path=csv_path)
+
+            for kind in ('matrix', 'frame'):
+                csv_time = measure(kind, csv_path, args.repeat)
+                grid_time = measure(kind, grid_path, args.repeat)
+                print(f"scale={scale:>4}  {kind:<6}  csv={csv_time:7.3f}s ({_size(csv_path) / 2**20:6.1f}MiB)"
+                      f"  grid={grid_time:7.3f}s ({_size(grid_path) / 2**20:6.1f}MiB)"
+                      f"  speedup={csv_time / grid_time:6.1f}x", flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark: addZeros → handleMissingMonths vs the single-pass dense grid.
+
+Scales orders2.csv up with synthetic item codes and reports wall time and
+peak RSS for both paths. Each run happens in a fresh process so the peaks do
+not mix. The legacy path includes its intermediate CSV round trip, as in
+production.
+
+    python benchmarks/bench_dense_grid.py --scales 1 10 100
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from dense_grid import build_final_grid
+
+
+def scale_orders(orders_path, scale, output_path):
+    df = pd.read_csv(orders_path)
+    copies = [df]
+    for k in range(1, scale):
+        copy = df.copy()
+        copy['Item_Code'] = copy['Item_Code'] + f'SYN{k}'
+        copies.append(copy)
+    pd.concat(copies, ignore_index=True).to_csv(output_path, index=False)
+
+
+def _run(variant, orders, tmp):
+    if variant == 'dense':
+        start = time.perf_counter()
+        build_final_grid(orders, os.path.join(tmp, 'grid.csv'), gap_months='zero')
+    else:
+        from cleanData import addZeros, handleMissingMonths
+        zeros = os.path.join(tmp, 'zeros.csv')
+        start = time.perf_counter()
+        addZeros(orders, zeros)
+        handleMissingMonths(zeros, os.path.join(tmp, 'legacy.csv'))
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is KiB on Linux
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(variant, orders, tmp):
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(_run, (variant, orders, tmp))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', default=os.path.join(REPO_DIR, 'orders2.csv'))
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--skip-legacy', action='store_true')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            orders = os.path.join(tmp, f'orders_{scale}.csv')
+            scale_orders(args.orders, scale, orders)
+
+            new_time, new_peak = measure('dense', orders, tmp)
+            line = f"scale={scale:>4}  dense-grid={new_time:8.2f}s peak_rss={new_peak:9.1f}MiB"
+
+            if not args.skip_legacy:
+                old_time, old_peak = measure('legacy', orders, tmp)
+                with open(os.path.join(tmp, 'legacy.csv'), 'rb') as a, open(os.path.join(tmp, 'grid.csv'), 'rb') as b:
+                    same = a.read() == b.read()
+                line += f"  legacy={old_time:8.2f}s peak_rss={old_peak:9.1f}MiB  identical={same}"
+
+            print(line, flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark: the forecasting pipeline stage by stage on synthetic catalogs.
+
+Generates order histories with synthetic_orders.py at each scale (1x is about
+the size of orders2.csv: 2000 items over 112 months; 10x/100x multiply the
+item count) and runs the stages in pipeline order, each feeding the next:
+
+    addZeros → handleMissingMonths → generate_summary_stats →
+    update_summary_with_new_month → predict_next_month_quantities → addToDB
+
+plus the single-pass replacements (build_final_grid, export_items). Each
+stage runs in a fresh process, so its wall time, CPU time and peak RSS are
+its own (peak RSS includes the interpreter and imports, which are reported
+separately as import_rss_mib). With --stages, the stages they read from run
+untimed. Results go to a JSON file; with --baseline they are compared to a
+saved run and any stage slower (or bigger) than the tolerance is flagged,
+with a non-zero exit status.
+
+    python benchmarks/bench_pipeline.py --scales 1 10 --output results.json
+    python benchmarks/bench_pipeline.py --scales 1 10 --save-baseline baseline.json
+    python benchmarks/bench_pipeline.py --scales 1 10 --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_orders import generate_new_month, generate_orders
+
+BASE_ITEMS = 2000
+NEW_MONTH = '2025-03'
+FORECAST_MONTH = '2025-04'
+
+
+# === Stages (run inside the worker process, paths relative to the run dir) ===
+
+def _add_zeros():
+    from cleanData import addZeros
+    return lambda: addZeros('orders.csv', 'final_orders_with_zeros2.csv')
+
+
+def _handle_missing_months():
+    from cleanData import handleMissingMonths
+    return lambda: handleMissingMonths('final_orders_with_zeros2.csv', 'final_output_with_nan2.csv')
+
+
+def _generate_summary_stats():
+    from generate_summary_stats import generate_summary_stats
+    return lambda: generate_summary_stats('final_output_with_nan2.csv', 'item_summary_stats.json')
+
+
+def _update_summary():
+    from generate_summary_stats import update_summary_with_new_month
+    return lambda: update_summary_with_new_month('item_summary_stats.json', 'new_month.csv',
+                                                 'item_summary_stats_updated.json')
+
+
+def _predict():
+    from generate_summary_stats import predict_next_month_quantities
+    return lambda: predict_next_month_quantities('item_summary_stats_updated.json', FORECAST_MONTH)
+
+
+def _add_to_db():
+    # addToDB reads final_output_with_nan2.csv from the working directory
+    from cleanData import addToDB
+    return addToDB
+
+
+def _build_final_grid():
+    from dense_grid import build_final_grid
+    return lambda: build_final_grid('orders.csv', 'grid.csv', gap_months='zero')
+
+
+def _export_items():
+    from dense_grid import read_orders
+    from item_export import export_items
+    return lambda: export_items(read_orders('orders.csv'), 'item_export_state.json', 'item_upserts.ndjson')
+
+
+# Stage → the stage whose output it reads
+REQUIRES = {
+    'handleMissingMonths': 'addZeros',
+    'generate_summary_stats': 'handleMissingMonths',
+    'update_summary_with_new_month': 'generate_summary_stats',
+    'predict_next_month_quantities': 'update_summary_with_new_month',
+    'addToDB': 'handleMissingMonths',
+}
+
+STAGES = {
+    'addZeros': _add_zeros,
+    'handleMissingMonths': _handle_missing_months,
+    'generate_summary_stats': _generate_summary_stats,
+    'update_summary_with_new_month': _update_summary,
+    'predict_next_month_quantities': _predict,
+    'addToDB': _add_to_db,
+    'build_final_grid': _build_final_grid,
+    'export_items': _export_items,
+}
+
+
+def _run_stage(stage, run_dir):
+    os.chdir(run_dir)
+    fn = STAGES[stage]()  # imports happen here, outside the timed region
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    return {
+        'seconds': round(seconds, 4),
+        'cpu_seconds': round(after.ru_utime + after.ru_stime - usage.ru_utime - usage.ru_stime, 4),
+        # ru_maxrss is KiB on Linux
+        'peak_rss_mib': round(after.ru_maxrss / 1024, 1),
+        # Peak before the stage started, i.e. the interpreter plus the stage's imports
+        'import_rss_mib': round(usage.ru_maxrss / 1024, 1),
+    }
+
+
+def with_prerequisites(stages):
+    # Selected stages plus everything they read from, in pipeline order
+    needed = set()
+    for stage in stages:
+        while stage is not None and stage not in needed:
+            needed.add(stage)
+            stage = REQUIRES.get(stage)
+    return [stage for stage in STAGES if stage in needed]
+
+
+def measure(stage, run_dir):
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(_run_stage, (stage, run_dir))
+
+
+# === Baseline comparison ===
+
+def compare(results, baseline, tolerance, min_seconds=0.05):
+    # [(stage, scale, metric, baseline, current)] for every metric over baseline * (1 + tolerance)
+    previous = {(r['stage'], r['scale']): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = previous.get((r['stage'], r['scale']))
+        if old is None:
+            continue
+        # Very short stages are dominated by noise
+        if r['seconds'] > old['seconds'] * (1 + tolerance) and r['seconds'] - old['seconds'] > min_seconds:
+            regressions.append((r['stage'], r['scale'], 'seconds', old['seconds'], r['seconds']))
+        if r['peak_rss_mib'] > old['peak_rss_mib'] * (1 + tolerance):
+            regressions.append((r['stage'], r['scale'], 'peak_rss_mib', old['peak_rss_mib'], r['peak_rss_mib']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--months', type=int, default=112)
+    parser.add_argument('--sparsity', type=float, default=0.9)
+    parser.add_argument('--seasonality', type=float, default=0.5)
+    parser.add_argument('--gap-months', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="write results JSON here")
+    parser.add_argument('--baseline', default=None, help="compare against this results JSON")
+    parser.add_argument('--save-baseline', default=None, help="also write results JSON here as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scales:
+            run_dir = os.path.join(tmp, f'scale_{scale}')
+            os.makedirs(run_dir)
+            orders = generate_orders(BASE_ITEMS * scale, args.months, sparsity=args.sparsity,
+                                     seasonality=args.seasonality, gap_months=args.gap_months, seed=args.seed)
+            orders.to_csv(os.path.join(run_dir, 'orders.csv'), index=False)
+            generate_new_month(orders, NEW_MONTH, seed=args.seed).to_csv(os.path.join(run_dir, 'new_month.csv'),
+                                                                         index=False)
+
+            for stage in with_prerequisites(args.stages):
+                if stage not in args.stages:
+                    measure(stage, run_dir)  # only to produce its output for the next stage
+                    continue
+                entry = {'stage': stage, 'scale': scale, 'items': BASE_ITEMS * scale, 'order_lines': len(orders)}
+                entry.update(measure(stage, run_dir))
+                results.append(entry)
+                print(f"scale={scale:>4}  {stage:<30} {entry['seconds']:9.2f}s  cpu={entry['cpu_seconds']:9.2f}s"
+                      f"  peak_rss={entry['peak_rss_mib']:9.1f}MiB", flush=True)
+
+    report = {
+        'config': {'months': args.months, 'sparsity': args.sparsity, 'seasonality': args.seasonality,
+                   'gap_months': args.gap_months, 'seed': args.seed, 'base_items': BASE_ITEMS},
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for stage, scale, metric, old, new in regressions:
+            print(f"REGRESSION scale={scale} {stage} {metric}: {old} → {new}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark: batch safety stock / reorder points at catalog scale.
+
+Builds a synthetic summary table and item × month history (Poisson demand with
+random item levels and a share of intermittent items) and times
+compute_safety_stock for both methods, plus saving the result.
+
+    python benchmarks/bench_safety_stock.py --items 2000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from safety_stock import compute_safety_stock
+from summary_table import SummaryTable
+
+
+def synthetic(n_items, n_months, seed=0):
+    # (SummaryTable, read_grid_matrix-style history) with matching stats
+    rng = np.random.default_rng(seed)
+    level = rng.gamma(1.5, 20, n_items)
+    active = rng.random((n_items, n_months)) < rng.uniform(0.2, 1.0, n_items)[:, None]
+    qty = rng.poisson(level[:, None], (n_items, n_months)) * active.astype(float)
+    qty[:, rng.random(n_months) < 0.05] = np.nan
+
+    items = np.array([f'SYN-{i:06d}' for i in range(n_items)], dtype=object)
+    recent = np.nan_to_num(qty[:, -6:])
+    seasonality = np.nanmean(qty[:, :n_months // 12 * 12].reshape(n_items, -1, 12), axis=1)
+    table = SummaryTable(items=list(items), mean_qty=np.nanmean(qty, axis=1), slope=np.zeros(n_items),
+                         intercept=recent.mean(axis=1), last6=recent, last6_len=np.full(n_items, 6),
+                         seasonality=seasonality, std_dev_qty=np.nanstd(qty, axis=1, ddof=1))
+    return table, (items, 0, qty)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, nargs='+', default=[2000, 100000])
+    parser.add_argument('--months', type=int, default=111)
+    parser.add_argument('--horizon', type=int, default=3)
+    parser.add_argument('--lead-time', type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_items in args.items:
+            table, history = synthetic(n_items, args.months)
+            line = f"items={n_items:>7}"
+            for method in ('normal', 'empirical'):
+                start = time.perf_counter()
+                result = compute_safety_stock(table, horizon=args.horizon, lead_time=args.lead_time,
+                                              method=method, history=history)
+                elapsed = time.perf_counter() - start
+                start = time.perf_counter()
+                result.save(os.path.join(tmp, method))
+                saved = time.perf_counter() - start
+                line += f"  {method}={elapsed:7.3f}s (save {saved:6.3f}s)"
+            print(line, flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: cold-start cost of predict_runner.py.
+
+Runs the runner in fresh interpreters under `python -X importtime` and reports
+the median wall time of a full run, the total import time, and the slowest
+top-level imports. With --compare-rev the same measurement is made on another
+git revision (extracted with git archive), e.g. the commit before the imports
+were made lazy:
+
+    python benchmarks/bench_startup.py --runs 5 --compare-rev HEAD~1
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SUMMARY_NAME = 'item_summary_stats_updated.json'
+
+
+def parse_importtime(stderr):
+    # {top-level module: cumulative µs}, from `-X importtime` lines "import time: self | cumulative | name"
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Top-level imports are not indented
+        if not name.startswith('  '):
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def measure(repo_dir, runs):
+    runner = os.path.join(repo_dir, 'predict_runner.py')
+    env = dict(os.environ)
+    env.pop('FORECAST_METRICS', None)
+
+    walls, imports = [], None
+    for _ in range(runs):
+        start = time.perf_counter()
+        done = subprocess.run([sys.executable, '-X', 'importtime', runner], cwd=repo_dir, env=env,
+                              capture_output=True, text=True, check=True)
+        walls.append(time.perf_counter() - start)
+        imports = parse_importtime(done.stderr)
+    return statistics.median(walls), imports
+
+
+def checkout(rev, target, summary_path):
+    archive = subprocess.run(['git', 'archive', rev], cwd=REPO_DIR, capture_output=True, check=True).stdout
+    with tempfile.TemporaryFile() as f:
+        f.write(archive)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tar:
+            tar.extractall(target)
+    # Same summary file for both sides, so only the code differs
+    with open(summary_path, 'rb') as src, open(os.path.join(target, SUMMARY_NAME), 'wb') as dst:
+        dst.write(src.read())
+
+
+def report(label, wall, imports, top):
+    total = sum(imports.values())
+    print(f"{label}: run={wall * 1000:8.1f}ms  imports={total / 1000:8.1f}ms")
+    for name, us in sorted(imports.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"    {us / 1000:8.1f}ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=8)
+    parser.add_argument('--compare-rev', default=None)
+    args = parser.parse_args()
+
+    wall, imports = measure(REPO_DIR, args.runs)
+    report('working tree', wall, imports, args.top)
+
+    if args.compare_rev:
+        with tempfile.TemporaryDirectory() as tmp:
+            checkout(args.compare_rev, tmp, os.path.join(REPO_DIR, SUMMARY_NAME))
+            old_wall, old_imports = measure(tmp, args.runs)
+        report(args.compare_rev, old_wall, old_imports, args.top)
+        print(f"speedup: {old_wall / wall:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
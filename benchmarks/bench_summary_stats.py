@@ -0,0 +1,121 @@
+"""
+Benchmark: per-item loop vs single-pass summary statistics.
+
+Builds the item × month grid from orders2.csv (same steps as addZeros), scales
+it up with synthetic items, and times compute_summaries_loop against
+compute_summaries, checking that both produce the same JSON (up to the sign
+of zero slopes / intercepts), both on the zero-filled grid and on a copy with
+gap (NaN) months and flat items.
+
+    python benchmarks/bench_summary_stats.py --scales 1 10 100 --loop-max-scale 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from generate_summary_stats import compute_summaries, compute_summaries_loop
+
+
+def load_grid(orders_path):
+    df = pd.read_csv(orders_path)
+    df['Ship_Date'] = pd.to_datetime(df['Ship_Date'], format='mixed', errors='coerce')
+    df = df.dropna(subset=['Ship_Date'])
+    df['YearMonth'] = df['Ship_Date'].dt.to_period('M').dt.to_timestamp()
+
+    grouped = df.groupby(['Item_Code', 'YearMonth'])['Order_Qty'].sum()
+    all_items = df['Item_Code'].unique()
+    all_months = pd.date_range(grouped.index.get_level_values(1).min(),
+                               grouped.index.get_level_values(1).max(), freq='MS')
+    full_index = pd.MultiIndex.from_product([all_items, all_months], names=['Item_Code', 'YearMonth'])
+    grid = grouped.reindex(full_index, fill_value=0).reset_index()
+    return grid
+
+
+def scale_grid(grid, scale, seed=0):
+    # Copies of every item under new codes, with Poisson noise around the original series
+    if scale == 1:
+        return grid
+    rng = np.random.default_rng(seed)
+    copies = [grid]
+    for k in range(1, scale):
+        copy = grid.copy()
+        copy['Item_Code'] = copy['Item_Code'] + f'SYN{k}'
+        copy['Order_Qty'] = rng.poisson(copy['Order_Qty'].to_numpy() * rng.uniform(0.5, 1.5))
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+
+def with_gaps(grid, seed=0):
+    # NaN for every item in a few whole months (gaps in the source data), plus flat items
+    # (constant quantity), the cases where a fitted slope can come out as a signed zero
+    rng = np.random.default_rng(seed)
+    months = grid['YearMonth'].unique()
+    gaps = rng.choice(months, size=max(len(months) // 20, 1), replace=False)
+    grid = grid.copy()
+    grid['Order_Qty'] = grid['Order_Qty'].astype(float)
+    grid.loc[grid['YearMonth'].isin(gaps), 'Order_Qty'] = np.nan
+
+    flat = grid[grid['Item_Code'] == grid['Item_Code'].iloc[0]].copy()
+    copies = []
+    for k, value in enumerate([0.0, 1.0, 3.0]):
+        copy = flat.copy()
+        copy['Item_Code'] = copy['Item_Code'] + f'FLAT{k}'
+        copy['Order_Qty'] = np.where(copy['Order_Qty'].isna(), np.nan, value)
+        copies.append(copy)
+    return pd.concat([grid] + copies, ignore_index=True)
+
+
+def same_output(old, new):
+    # Byte-identical JSON once signed zeros are normalized: compute_summaries writes 0.0
+    # where the loop's sklearn fit can round a flat trend to -0.0
+    def normalized(summaries):
+        return {item: dict(s, slope=s['slope'] + 0.0, intercept=s['intercept'] + 0.0)
+                for item, s in summaries.items()}
+    return json.dumps(normalized(old)) == json.dumps(normalized(new))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', default=os.path.join(REPO_DIR, 'orders2.csv'))
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--loop-max-scale', type=int, default=10,
+                        help='skip the per-item loop above this scale (it takes minutes at 100x)')
+    args = parser.parse_args()
+
+    base = load_grid(args.orders)
+
+    for scale in args.scales:
+        grid = scale_grid(base, scale)
+        n_items = grid['Item_Code'].nunique()
+
+        new, new_time = timed(compute_summaries, grid)
+        line = f"scale={scale:>4} items={n_items:>8} rows={len(grid):>10}  single-pass={new_time:8.2f}s"
+
+        if scale <= args.loop_max_scale:
+            old, old_time = timed(compute_summaries_loop, grid)
+            same = same_output(old, new)
+            line += f"  loop={old_time:8.2f}s  speedup={old_time / new_time:6.1f}x  identical={same}"
+
+            gapped = with_gaps(grid)
+            same = same_output(compute_summaries_loop(gapped), compute_summaries(gapped))
+            line += f"  identical_with_gaps={same}"
+
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Benchmark: JSON summaries vs the binary summary store.
+
+Converts a summary JSON file to .sumbin and reports file size, full load time,
+time to a forecast-ready SummaryTable, and single-item lookup time.
+
+    python benchmarks/bench_summary_store.py --summary item_summary_stats_updated.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from summary_store import BinarySummaryStore, json_to_binary, load_summaries, load_table
+
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--summary', default=os.path.join(REPO_DIR, 'item_summary_stats_updated.json'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        binary_path = os.path.join(tmp, 'summary.sumbin')
+        json_to_binary(args.summary, binary_path)
+
+        with open(args.summary, 'r') as f:
+            item = next(iter(json.load(f)))
+
+        def json_lookup():
+            with open(args.summary, 'r') as f:
+                return json.load(f)[item]
+
+        rows = [
+            ('size (bytes)', os.path.getsize(args.summary), os.path.getsize(binary_path)),
+            ('full load (s)', best_of(lambda: load_summaries(args.summary), args.repeat),
+             best_of(lambda: load_summaries(binary_path), args.repeat)),
+            ('load table (s)', best_of(lambda: load_table(args.summary), args.repeat),
+             best_of(lambda: load_table(binary_path), args.repeat)),
+            ('one item (s)', best_of(json_lookup, args.repeat),
+             best_of(lambda: BinarySummaryStore(binary_path)[item], args.repeat)),
+        ]
+
+    print(f"{'':16s} {'json':>14s} {'sumbin':>14s}")
+    for name, json_value, binary_value in rows:
+        print(f"{name:16s} {json_value:14.6g} {binary_value:14.6g}")
+
+
+if __name__ == '__main__':
+    main()
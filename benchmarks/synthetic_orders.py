@@ -0,0 +1,114 @@
+"""
+Synthetic order histories shaped like orders2.csv.
+
+Every item gets a category prefix and code (PRO-1234-, DBN-1320, ...), a
+start month (so history lengths vary), a base demand level drawn from a
+log-normal, a yearly seasonal profile with its own amplitude and phase, and
+a probability of being ordered in any given month (1 - sparsity). An ordered
+month becomes one or more order lines on random days, grouped into order
+PDFs of about 70 lines. Ship_Date mostly uses m/d/YYYY like orders2.csv, with
+a small share of zero-padded mm/dd/yy dates; whole months can be left empty
+to mimic gaps in the source data.
+
+    python benchmarks/synthetic_orders.py --items 2000 --months 112 --output /tmp/orders.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+PREFIXES = ['PRO', 'MEA', 'DBN', 'FRU', 'VEG', 'ENT', 'SEA', 'PAS', 'CER', 'JUI', 'BRD', 'PER', 'AFI']
+ORDER_COLUMNS = ['PDF_File', 'Page', 'Ship_Date', 'Item_Code', 'Description', 'Order_Qty']
+
+
+def item_codes(n_items, rng):
+    prefixes = rng.choice(PREFIXES, n_items)
+    # Unique 4+ digit numbers; about half the codes carry the trailing '-'
+    numbers = rng.permutation(max(n_items, 9000))[:n_items] + 1000
+    dash = np.where(rng.random(n_items) < 0.5, '-', '')
+    return [f"{p}-{n}{d}" for p, n, d in zip(prefixes, numbers, dash)]
+
+
+def generate_orders(n_items=2000, n_months=112, end_month='2025-02', sparsity=0.9,
+                    seasonality=0.5, short_date_share=0.006, gap_months=0, seed=0):
+    # DataFrame with the orders2.csv columns
+    rng = np.random.default_rng(seed)
+    months = pd.period_range(end=pd.Period(end_month, 'M'), periods=n_months, freq='M')
+
+    codes = np.array(item_codes(n_items, rng), dtype=object)
+    descriptions = np.array([f"Synthetic item {i}" for i in range(n_items)], dtype=object)
+    start = rng.integers(0, n_months, n_items)
+    start[: max(1, n_items // 5)] = 0  # a share of items span the whole range
+    level = rng.lognormal(mean=0.8, sigma=0.6, size=n_items)
+    amplitude = seasonality * rng.random(n_items)
+    phase = rng.uniform(0, 2 * np.pi, n_items)
+
+    # === Item × month demand, vectorized over the whole grid ===
+    month_of_year = months.month.to_numpy() - 1
+    seasonal = 1 + amplitude[:, None] * np.sin(2 * np.pi * month_of_year[None, :] / 12 + phase[:, None])
+    active = (np.arange(n_months)[None, :] >= start[:, None]) & (rng.random((n_items, n_months)) >= sparsity)
+    if gap_months:
+        active[:, rng.choice(np.arange(1, n_months - 1), gap_months, replace=False)] = False
+
+    item_idx, month_idx = np.nonzero(active)
+    # One or more order lines per ordered month
+    lines = 1 + rng.poisson(0.3, len(item_idx))
+    item_idx = np.repeat(item_idx, lines)
+    month_idx = np.repeat(month_idx, lines)
+    qty = rng.poisson(level[item_idx] * seasonal[item_idx, month_idx]) + 1
+
+    # === Ship dates and formats ===
+    first_day = months.start_time.to_numpy()[month_idx]
+    days = rng.integers(0, months.days_in_month.to_numpy()[month_idx])
+    ship = pd.DatetimeIndex(first_day + days.astype('timedelta64[D]'))
+    short = rng.random(len(ship)) < short_date_share
+    ship_date = np.where(short,
+                         ship.strftime('%m/%d/%y'),
+                         [f"{m}/{d}/{y}" for m, d, y in zip(ship.month, ship.day, ship.year)])
+
+    # Order lines grouped into order PDFs of ~70 lines, in ship date order
+    order = np.argsort(ship.to_numpy(), kind='stable')
+    pdf = np.arange(len(order)) // 70
+    page = (np.arange(len(order)) % 70) // 12 + 1
+
+    return pd.DataFrame({
+        'PDF_File': [f"Orders/CNAVTEMPOrder_AO-{100000 + p}.pdf" for p in pdf],
+        'Page': page,
+        'Ship_Date': ship_date[order],
+        'Item_Code': codes[item_idx][order],
+        'Description': descriptions[item_idx][order],
+        'Order_Qty': qty[order],
+    }, columns=ORDER_COLUMNS)
+
+
+def generate_new_month(orders, month, qty_range=(0, 10), seed=0):
+    # Next-month file in the update_summary_with_new_month format (Item_Code, Order_Qty, YearMonth)
+    rng = np.random.default_rng(seed)
+    items = pd.unique(orders['Item_Code'])
+    return pd.DataFrame({
+        'Item_Code': items,
+        'Order_Qty': rng.integers(qty_range[0], qty_range[1] + 1, len(items)),
+        'YearMonth': f"{month}-01",
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--months', type=int, default=112)
+    parser.add_argument('--end-month', default='2025-02')
+    parser.add_argument('--sparsity', type=float, default=0.9)
+    parser.add_argument('--seasonality', type=float, default=0.5)
+    parser.add_argument('--gap-months', type=int, default=0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args()
+
+    orders = generate_orders(args.items, args.months, args.end_month, args.sparsity,
+                             args.seasonality, gap_months=args.gap_months, seed=args.seed)
+    orders.to_csv(args.output, index=False)
+    print(f"{len(orders)} order lines, {orders['Item_Code'].nunique()} items → {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Per-item order history charts (the plotForAtItem2 stage).
+
+The item × month grid is sorted once and split into per-item series by
+position, instead of filtering the whole DataFrame once per item. Charts are
+drawn on a process pool with the Agg backend; each worker creates one
+figure/axes at startup and clears and redraws it for every item it gets.
+
+Each chart's input (dates, quantities, item) is hashed and the hashes are kept
+in chart_index.json next to the images, so a rerun only redraws items whose
+series changed (or whose image is missing).
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+
+import numpy as np
+
+from dense_grid import read_grid_frame
+from instrumentation import progress
+
+INDEX_NAME = 'chart_index.json'
+
+_fig = None
+_ax = None
+
+
+def item_series(df):
+    # [(item, ds, y)] for every item, months in order (missing months kept as NaN)
+    df = df.sort_values(['Item_Code', 'YearMonth'], kind='stable')
+    items = df['Item_Code'].to_numpy()
+    ds = df['YearMonth'].to_numpy()
+    y = df['Order_Qty'].to_numpy(dtype=float)
+
+    # Item boundaries in the sorted frame
+    starts = np.flatnonzero(np.r_[True, items[1:] != items[:-1]])
+    ends = np.r_[starts[1:], len(items)]
+    return [(items[s], ds[s:e], y[s:e]) for s, e in zip(starts, ends)]
+
+
+def series_hash(item, ds, y):
+    h = hashlib.sha1()
+    h.update(str(item).encode('utf-8'))
+    h.update(np.asarray(ds, dtype='datetime64[D]').astype(np.int64).tobytes())
+    h.update(np.asarray(y, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+def chart_path(output_dir, item):
+    safe_item = item.replace("/", "_").replace("\\", "_")  # avoid invalid filename characters
+    return os.path.join(output_dir, f"{safe_item}.png")
+
+
+# === Workers ===
+
+def _init_worker():
+    # One figure per worker, reused for every chart it draws
+    global _fig, _ax
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    _fig, _ax = plt.subplots(figsize=(10, 4))
+
+
+def _render_task(task):
+    item, ds, y, path = task
+
+    _ax.clear()
+    _ax.plot(ds, y, marker='o')
+    _ax.set_title(f"Monthly Orders for {item}")
+    _ax.set_xlabel("Month")
+    _ax.set_ylabel("Order Qty")
+    _ax.tick_params(axis='x', labelrotation=45)
+    _ax.grid(True)
+    _fig.tight_layout()
+    _fig.savefig(path)
+    return item
+
+
+def _run_render_pool(tasks, workers, chunksize):
+    if workers == 1:
+        if _fig is None:
+            _init_worker()
+        for task in tasks:
+            yield _render_task(task)
+        return
+
+    with multiprocessing.Pool(processes=workers, initializer=_init_worker) as pool:
+        yield from pool.imap_unordered(_render_task, tasks, chunksize=chunksize)
+
+
+# === Stage ===
+
+def render_item_charts(input_file='final_output_with_nan.csv', output_dir='item_charts',
+                       workers=None, chunksize=16, force=False):
+    # Returns {'rendered': n, 'skipped': n}
+    df = read_grid_frame(input_file)
+    os.makedirs(output_dir, exist_ok=True)
+
+    index_path = os.path.join(output_dir, INDEX_NAME)
+    index = {}
+    if os.path.exists(index_path) and not force:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+
+    tasks = []
+    hashes = {}
+    skipped = 0
+    for item, ds, y in item_series(df):
+        digest = series_hash(item, ds, y)
+        path = chart_path(output_dir, item)
+        if index.get(item) == digest and os.path.exists(path):
+            skipped += 1
+            continue
+        hashes[item] = digest
+        tasks.append((item, ds, y, path))
+
+    # The index is only updated for charts that were actually written
+    for done, item in enumerate(_run_render_pool(tasks, workers or os.cpu_count(), chunksize), 1):
+        index[item] = hashes[item]
+        progress(done, len(tasks), item)
+
+    with open(index_path, 'w') as f:
+        json.dump(index, f)
+    return {'rendered': len(tasks), 'skipped': skipped}
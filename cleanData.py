@@ -1,18 +1,17 @@
 import pandas as pd
 import itertools
-import matplotlib.pyplot as plt
 import os
-import seaborn as sns
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
-from sklearn.metrics import mean_absolute_error
 import numpy as np
-from prophet import Prophet
-import pandas as pd
+from instrumentation import count_rows, timed
 
-def addZeros():
+@timed
+def addZeros(input_path='/Users/shivam/Desktop/HTF/orders2.csv',
+             final_path='/Users/shivam/Desktop/HTF/final_orders_with_zeros2.csv'):
     # Step 1: Load and clean data
-    df = pd.read_csv('/Users/shivam/Desktop/HTF/orders2.csv')  # Make sure this file has 'Description'
+    df = pd.read_csv(input_path)  # Make sure this file has 'Description'
+    count_rows(len(df))
     df['Ship_Date'] = pd.to_datetime(df['Ship_Date'], format='mixed', errors='coerce')
     df = df.dropna(subset=['Ship_Date'])
 
@@ -54,14 +53,15 @@ def addZeros():
     final_df = final_df.sort_values(by=['Year', 'Month', 'Item_Code'])
 
     # Step 9: Save result
-    final_path = '/Users/shivam/Desktop/HTF/final_orders_with_zeros2.csv'
     final_df.to_csv(final_path, index=False)
     # print(f"✅ CSV saved to {final_path}")
 
 
+@timed
 def findMisssingMonths():
     # Load and clean data
     df = pd.read_csv('/Users/shivam/Desktop/HTF/orders2.csv')
+    count_rows(len(df))
     df['Ship_Date'] = pd.to_datetime(df['Ship_Date'], format='mixed', errors='coerce')
     df = df.dropna(subset=['Ship_Date'])
 
@@ -89,10 +89,12 @@ def findMisssingMonths():
 import pandas as pd
 import itertools
 
-def handleMissingMonths():
+@timed
+def handleMissingMonths(input_path='/Users/shivam/Desktop/HTF/final_orders_with_zeros2.csv',
+                        output_path='/Users/shivam/Desktop/HTF/final_output_with_nan2.csv'):
     # === Load cleaned data ===
-    input_path = '/Users/shivam/Desktop/HTF/final_orders_with_zeros2.csv'
     df = pd.read_csv(input_path)
+    count_rows(len(df))
 
     # print("✅ Loaded data with columns:", df.columns.tolist())
 
@@ -148,60 +150,76 @@ def handleMissingMonths():
     # Sort and save
     final_df = final_df.sort_values(by=['Year', 'Month', 'Item_Code'])
 
-    output_path = '/Users/shivam/Desktop/HTF/final_output_with_nan2.csv'
     final_df.to_csv(output_path, index=False)
     # print(f"✅ Final dataset saved with NaNs for missing months → {output_path}")
 
 
+@timed
+def buildFinalGrid(gap_months='nan', export_csv=True):
+    # addZeros + handleMissingMonths in one in-memory pass (see dense_grid.py),
+    # without the final_orders_with_zeros2.csv round trip.
+    # gap_months='zero' reproduces the old chain's output exactly.
+    # Saved as a typed .grid directory (columnar.py) for the later stages; the CSV
+    # export is still written for addToDB and anything else reading it as text.
+    from dense_grid import build_final_grid
 
-def plotForAtItem2():
-    # === Load data inside the function ===
-    df = pd.read_csv('/Users/shivam/Desktop/HTF/final_output_with_nan.csv')
-    df['YearMonth'] = pd.to_datetime(df['YearMonth'])
+    build_final_grid('/Users/shivam/Desktop/HTF/orders2.csv',
+                     '/Users/shivam/Desktop/HTF/final_output_with_nan2.grid',
+                     gap_months=gap_months,
+                     dictionary_path='/Users/shivam/Desktop/HTF/item_dictionary.json',
+                     csv_path='/Users/shivam/Desktop/HTF/final_output_with_nan2.csv' if export_csv else None)
 
-    # === Create output folder ===
-    output_dir = '/Users/shivam/Desktop/HTF/item_charts'
-    os.makedirs(output_dir, exist_ok=True)
 
-    # === Loop through each unique item ===
-    for item in df['Item_Code'].unique():
-        item_df = df[df['Item_Code'] == item].sort_values('YearMonth')
 
-        plt.figure(figsize=(10, 4))
-        plt.plot(item_df['YearMonth'], item_df['Order_Qty'], marker='o')
-        plt.title(f"Monthly Orders for {item}")
-        plt.xlabel("Month")
-        plt.ylabel("Order Qty")
-        plt.xticks(rotation=45)
-        plt.grid(True)
-        plt.tight_layout()
+@timed
+def ingestOrders(order_files=('/Users/shivam/Desktop/HTF/orders2.csv',),
+                 state_path='/Users/shivam/Desktop/HTF/order_aggregate.json',
+                 gap_months='nan'):
+    # Streaming alternative to buildFinalGrid: order files are read in chunks and
+    # folded into saved per-(item, month) totals (see order_ingest.py); files
+    # ingested on an earlier run are skipped, so only new order files are read.
+    from order_ingest import ingest_orders
+    from dense_grid import build_grid, grid_to_frame
+    from item_dictionary import load_or_build
 
-        # Save plot as image file
-        safe_item = item.replace("/", "_").replace("\\", "_")  # avoid invalid filename characters
-        plt.savefig(f"{output_dir}/{safe_item}.png")
-        plt.close()
+    aggregate = ingest_orders(order_files, state_path)
+    orders = aggregate.to_frame()
+    dictionary = load_or_build('/Users/shivam/Desktop/HTF/item_dictionary.json', orders)
+    grid = grid_to_frame(*build_grid(orders, gap_months, dictionary))
+    grid.to_csv('/Users/shivam/Desktop/HTF/final_output_with_nan2.csv', index=False)
 
-    # print(f"Saved plots for {len(df['Item_Code'].unique())} items to → {output_dir}")
+    # print("📅 Months with NO data at all:", aggregate.missing_months())
 
 
-def plotForAtItem3():
-    # === Load and preprocess data ===
-    df = pd.read_csv('/Users/shivam/Desktop/HTF/final_output_with_nan.csv')
-    df['YearMonth'] = pd.to_datetime(df['YearMonth'])
+@timed
+def plotForAtItem2(workers=None, force=False):
+    # One chart per item, rendered on a process pool; items whose series is
+    # unchanged since the last run are skipped (see chart_render.py)
+    from chart_render import render_item_charts
 
-    # === Step 1: Get Top N items ===
-    top_n = 10
-    top_items = df.groupby('Item_Code')['Order_Qty'].sum().nlargest(top_n).index.tolist()
+    counts = render_item_charts('/Users/shivam/Desktop/HTF/final_output_with_nan.csv',
+                                '/Users/shivam/Desktop/HTF/item_charts',
+                                workers=workers, force=force)
+
+    # print(f"Saved {counts['rendered']} plots ({counts['skipped']} unchanged) → /Users/shivam/Desktop/HTF/item_charts")
 
-    # === Step 2: Filter data for those items ===
-    filtered_df = df[df['Item_Code'].isin(top_items)]
 
-    # === Step 3: Pivot table: Items vs Months ===
-    pivot_df = filtered_df.pivot_table(index='Item_Code',
-                                       columns='YearMonth',
-                                       values='Order_Qty',
-                                       aggfunc='sum',
-                                       fill_value=0)
+@timed
+def plotForAtItem3(start=None, end=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    from ranking_index import open_index
+
+    # === Load the ranking index (built from the grid on first use, see ranking_index.py) ===
+    index = open_index('/Users/shivam/Desktop/HTF/ranking_index',
+                       '/Users/shivam/Desktop/HTF/final_output_with_nan.csv')
+
+    # === Step 1: Get Top N items (overall, or over start..end months) ===
+    top_n = 10
+    top_items = [item for item, _ in index.top(top_n, start, end)]
+
+    # === Step 2: Items vs Months slice for those items only ===
+    pivot_df = index.heatmap_frame(top_items, start, end)
 
     # === Step 4: Plot heatmap ===
     plt.figure(figsize=(14, 6))
@@ -215,14 +233,54 @@ def plotForAtItem3():
     plt.show()
 
 
-def prophetModel():
+@timed
+def prophetModel(workers=None, timeout=None, plot=True, cache_dir=None, export_csv=False, model='prophet'):
+    from forecast_store import ForecastStore
+
     # --- Config ---
     INPUT_FILE = 'final_output_with_nan.csv'
     OUTPUT_DIR = 'prophet_forecasts_all_items'
+    STORE_PATH = f'{OUTPUT_DIR}/forecasts.sqlite'
     FORECAST_MONTHS = 12
 
-    # --- Create output directory ---
+    # --- Routed by demand class (see demand_classes.py): Prophet only for smooth
+    # items with a long history, classical models for the rest, nothing for inactive items ---
+    if model == 'auto':
+        from demand_classes import forecast_routed
+        forecast_routed(INPUT_FILE, OUTPUT_DIR, 'demand_classes.json', periods=FORECAST_MONTHS, workers=workers,
+                        timeout=timeout, cache_dir=cache_dir, export_csv=export_csv)
+        if plot:
+            from parallel_training import plot_forecasts
+            plot_forecasts(INPUT_FILE, OUTPUT_DIR, workers=workers)
+        return
+
+    # --- Classical models (holt_winters, tsb, croston, seasonal_naive): all items in
+    # one vectorized fit, written to the same store as the Prophet forecasts ---
+    if model != 'prophet':
+        from classical_models import forecast_catalog
+        forecast_catalog(INPUT_FILE, OUTPUT_DIR, model=model, periods=FORECAST_MONTHS, export_csv=export_csv)
+        if plot:
+            from parallel_training import plot_forecasts
+            plot_forecasts(INPUT_FILE, OUTPUT_DIR, workers=workers)
+        return
+
+    # --- Parallel / cached mode: fit on a process pool (skipping items whose
+    # history is unchanged when cache_dir is set), plot as a separate stage ---
+    if workers or cache_dir:
+        from parallel_training import train_prophet_parallel, plot_forecasts
+        workers = workers or 1
+        train_prophet_parallel(INPUT_FILE, OUTPUT_DIR, periods=FORECAST_MONTHS, workers=workers, timeout=timeout,
+                               cache_dir=cache_dir, export_csv=export_csv)
+        if plot:
+            plot_forecasts(INPUT_FILE, OUTPUT_DIR, workers=workers)
+        return
+
+    from prophet import Prophet
+    import matplotlib.pyplot as plt
+
+    # --- Create output directory and forecast store ---
     os.makedirs(OUTPUT_DIR, exist_ok=True)
+    store = ForecastStore(STORE_PATH)
 
     # --- Load and prepare data ---
     df = pd.read_csv(INPUT_FILE)
@@ -257,8 +315,11 @@ def prophetModel():
         future = model.make_future_dataframe(periods=FORECAST_MONTHS, freq='MS')
         forecast = model.predict(future)
 
-        # Save forecast CSV
-        forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_csv(f'{OUTPUT_DIR}/{item}_forecast.csv', index=False)
+        # Save forecast to the store
+        store.write(item, forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']])
+
+        if not plot:
+            continue
 
         # Plot and save
         fig = model.plot(forecast)
@@ -269,27 +330,26 @@ def prophetModel():
         plt.savefig(f"{OUTPUT_DIR}/{item}_forecast_plot.png")
         plt.close()
 
+    # Per-item {item}_forecast.csv files only on request
+    if export_csv:
+        store.export_csv(OUTPUT_DIR)
+    store.close()
+
     # print(f"Forecasts completed for all items. Check the '{OUTPUT_DIR}' folder.")
 
 
+@timed
 def printPrediction():
-    FORECAST_DIR = 'prophet_forecasts_all_items'
+    from forecast_store import ForecastStore
+
+    STORE_PATH = 'prophet_forecasts_all_items/forecasts.sqlite'
 
     # Get next month's 1st date (aligned with Prophet's freq='MS')
     next_month = (datetime.today().replace(day=1) + relativedelta(months=1)).strftime('%Y-%m-%d')
 
-    summary = []
-
-    for file in os.listdir(FORECAST_DIR):
-        if file.endswith('_forecast.csv'):
-            item_code = file.replace('_forecast.csv', '')
-            path = os.path.join(FORECAST_DIR, file)
-            forecast_df = pd.read_csv(path)
-
-            next_month_row = forecast_df[forecast_df['ds'] == next_month]
-            if not next_month_row.empty:
-                predicted_qty = round(next_month_row['yhat'].values[0])
-                summary.append((item_code, predicted_qty))
+    # One indexed query for the target month across all items
+    with ForecastStore(STORE_PATH) as store:
+        summary = [(item_code, round(yhat)) for item_code, yhat in store.month(next_month)]
 
     # Sort in descending order of predicted quantity
     summary.sort(key=lambda x: x[1], reverse=True)
@@ -301,7 +361,18 @@ def printPrediction():
     #     print(f"{item:20s} → {qty}")
 
 
-def trainSplit():
+@timed
+def trainSplit(workers=None, timeout=None):
+    # --- Parallel mode: one holdout fit per item on a process pool ---
+    if workers:
+        from parallel_training import holdout_prophet_parallel
+        holdout_prophet_parallel("final_output_with_nan.csv", "forecast_error_summary.csv",
+                                 workers=workers, timeout=timeout)
+        return
+
+    from prophet import Prophet
+    from sklearn.metrics import mean_absolute_error
+
     # Load your dataset
     df = pd.read_csv("final_output_with_nan.csv")
     df['YearMonth'] = pd.to_datetime(df['YearMonth'])
@@ -353,9 +424,48 @@ def trainSplit():
     results_df.to_csv("forecast_error_summary.csv", index=False)
 
 
+@timed
+def backtestModels(backends=('summary', 'prophet', 'holt_winters', 'tsb'), folds=6, horizon=3, workers=None,
+                   timeout=None):
+    # Rolling-origin comparison of the summary forecaster, Prophet and the classical
+    # models over several cutoffs, with MAE/MAPE/WAPE per item and overall (see backtest.py).
+    # WAPE, unlike trainSplit's Percentage_Error, is comparable across items.
+    from backtest import run_backtest
+
+    per_item, overall = run_backtest("final_output_with_nan.csv", "backtest", backends=backends,
+                                     folds=folds, horizon=horizon, workers=workers, timeout=timeout)
+
+    # print(overall)
+
+
+@timed
+def updateRankingIndex(new_month_csv='/Users/shivam/Desktop/HTF/orders_march_2025.csv'):
+    # Fold a new month file (YearMonth, Item_Code, Order_Qty) into the saved ranking index,
+    # so plotForAtItem3's top-N and heatmap include it without rebuilding from the grid
+    from ranking_index import open_index
+
+    index = open_index('/Users/shivam/Desktop/HTF/ranking_index',
+                       '/Users/shivam/Desktop/HTF/final_output_with_nan.csv')
+    index.ingest_csv(new_month_csv)
+    index.save('/Users/shivam/Desktop/HTF/ranking_index')
+
+
+@timed
+def classifyItems(inactive_months=12):
+    # ADI / CV² demand classes per item (smooth, erratic, intermittent, lumpy, inactive)
+    # and the model each is routed to; saved, and updated with new grid months on rerun
+    from demand_classes import load_or_build
+
+    classes = load_or_build('demand_classes.json', 'final_output_with_nan.csv')
+    classes.to_frame(inactive_months).to_csv('demand_classes.csv', index=False)
+
+    # print(classes.to_frame(inactive_months)['class'].value_counts())
+
+
 import csv
 from datetime import datetime
 
+@timed
 def addToDB():
     input_csv = "final_output_with_nan2.csv"  # Input file path
     output_csv = "output_items2.csv"          # Output file path
@@ -401,6 +511,8 @@ def addToDB():
                     if date_val > old_date:
                         last_positive_order_info[item_code] = (date_val, order_qty, description)
 
+        count_rows(reader.line_num - 1)
+
     # 2) Output fieldnames
     fieldnames = [
         "Object Id",
@@ -450,27 +562,83 @@ def addToDB():
     # print(f"✅ Exported {len(all_items)} items to '{output_csv}'.")
 
 
+@timed
+def exportItems(state_path='/Users/shivam/Desktop/HTF/order_aggregate.json',
+                export_state_path='item_export_state.json',
+                upsert_path='item_upserts.ndjson',
+                output_csv=None,
+                stock_dir=None):
+    # Incremental alternative to addToDB (see item_export.py): last-restock info
+    # comes from the saved order aggregate (ingestOrders), item ids stay stable
+    # across runs, and only new/changed items are appended to upsert_path as
+    # newline-delimited bulkWrite ops (confirmItemUpserts once they are applied).
+    # The first run keeps the ids in output_items2.csv.
+    # stock_dir: safety stock table (safetyStock) to add safetyStock / reorderPoint from
+    from order_ingest import OrderAggregate
+    from item_export import export_items
+
+    aggregate = OrderAggregate.load(state_path)
+    changed = export_items(aggregate.to_frame(), export_state_path, upsert_path,
+                           seed_csv="output_items2.csv", output_csv=output_csv, stock_dir=stock_dir)
+
+    # print(f"✅ {changed} changed items written to '{upsert_path}'.")
+
+
+@timed
+def confirmItemUpserts(export_state_path='item_export_state.json', upsert_path='item_upserts.ndjson'):
+    # Run after Item.bulkWrite() applied every op in upsert_path: exportItems appends
+    # to that file and only treats its items as exported once they are confirmed here
+    from item_export import confirm_applied
+
+    confirmed = confirm_applied(export_state_path, upsert_path)
+
+    # print(f"✅ {confirmed} item upserts confirmed as applied.")
+
+
+@timed
+def safetyStock(method='normal', lead_time=1, service_level=0.95, forecast_month='2025-04'):
+    # Forecast intervals, safety stock and reorder points for all items in one batch
+    # (see safety_stock.py); exportItems(stock_dir='safety_stock') joins them into the upserts
+    from safety_stock import build_safety_stock
+
+    counts = build_safety_stock('item_summary_stats_updated.json', 'safety_stock',
+                                forecast_month=forecast_month, lead_time=lead_time,
+                                service_level=service_level, method=method,
+                                grid_path='final_output_with_nan.csv', export_csv='safety_stock.csv')
+
+    # print(f"Safety stock for {sum(counts['counts'].values())} items → safety_stock/")
+
+
 # addZeros()
 # handleMissingMonths()
+# buildFinalGrid()
+# ingestOrders()
 # addToDB()
+# exportItems()
+# confirmItemUpserts()
+# backtestModels()
+# classifyItems()
+# updateRankingIndex()
+# safetyStock()
 
 
+@timed
 def create_synthetic_march_orders(existing_summary_path='item_summary_stats.json',
                                    output_csv='orders_march_2025.csv',
                                    default_qty_range=(0, 10)):
-    import json
     import random
+    from summary_store import load_table
+    from summary_table import rank
 
     # Load item list from your summaries
-    with open(existing_summary_path, 'r') as f:
-        summaries = json.load(f)
+    table = load_table(existing_summary_path)
 
-    # Take top 30 items with highest mean_qty
-    top_items = sorted(summaries.items(), key=lambda x: x[1]['mean_qty'], reverse=True)[:30]
+    # Take top 30 items with highest mean_qty (partial selection, ties in summary order)
+    top_items = [table.items[i] for i in rank(table.mean_qty, 30)]
 
     # Generate fake March 2025 orders
     rows = []
-    for item, stats in top_items:
+    for item in top_items:
         qty = round(random.uniform(*default_qty_range))  # Random quantity for now
         rows.append({
             'Item_Code': item,
@@ -484,7 +652,8 @@ def create_synthetic_march_orders(existing_summary_path='item_summary_stats.json
     # print(f"✅ Created synthetic March 2025 orders at {output_csv} with {len(df)} items.")
 
 # Run it
-create_synthetic_march_orders()
+if __name__ == '__main__':
+    create_synthetic_march_orders()
 
 
 
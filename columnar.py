@@ -0,0 +1,138 @@
+"""
+Typed columnar format for the item × month grid, the intermediate between
+the grid build and the later stages (summaries, forecasts, charts, backtest).
+
+Every stage used to re-read final_output_with_nan.csv, parsing ~230k rows of
+text, dates and item codes each time. A .grid directory keeps the same long
+table as typed arrays instead:
+
+    meta.json                   first month ordinal, item and month counts
+    items.npy                   item codes, sorted (row order within a month)
+    qty.npy                     int64 quantities, months × items
+    missing.npy                 bool, months × items: True where Order_Qty is NA
+    description.npy             int32 codes into description_categories.npy, months × items
+    description_categories.npy  description strings
+
+Rows of the long table are month-major (Year, Month, Item_Code order, like the
+CSV), so a column of the table is a flattened array: Order_Qty is qty.npy and
+missing.npy as a nullable Int64 array without a copy, Item_Code and
+Description are Categoricals over int codes, and YearMonth / Year / Month are
+computed per month and repeated rather than parsed. The arrays are memory
+mapped; a stage reads only the columns it asks for.
+
+CSV stays available as an export (export_csv, or build_final_grid's csv_path),
+byte for byte what grid_to_frame(...).to_csv writes.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from dense_grid import GRID_COLUMNS, cell_descriptions, long_frame
+
+SUFFIX = '.grid'
+FORMAT_VERSION = 1
+META_NAME = 'meta.json'
+
+
+def is_columnar(path):
+    return str(path).rstrip('/\\').endswith(SUFFIX)
+
+
+def write_grid(path, items, first, qty, descriptions):
+    # build_grid output → .grid directory. Quantities are stored as int64 like
+    # grid_to_frame's Order_Qty; NaN months become missing.
+    os.makedirs(path, exist_ok=True)
+    values = np.asarray(qty, dtype=float).T
+    missing = np.isnan(values)
+    description = pd.Categorical(cell_descriptions(qty, descriptions))
+
+    arrays = {
+        'items': np.asarray(items, dtype=str),
+        'qty': np.where(missing, 0, values).astype(np.int64),
+        'missing': missing,
+        'description': description.codes.astype(np.int32).reshape(values.shape),
+        'description_categories': np.asarray(description.categories, dtype=str),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), array, allow_pickle=False)
+
+    # meta.json last: a directory without it is an incomplete write
+    with open(os.path.join(path, META_NAME), 'w') as f:
+        json.dump({'format': FORMAT_VERSION, 'first': int(first), 'items': len(items),
+                   'months': int(values.shape[0])}, f)
+
+
+def csv_to_grid(csv_path, path):
+    # Convert an existing grid CSV (final_output_with_nan.csv) to a .grid directory
+    from dense_grid import month_ordinals
+
+    df = pd.read_csv(csv_path, usecols=['YearMonth', 'Item_Code', 'Description', 'Order_Qty'],
+                     dtype={'Item_Code': 'category'})
+    ordinals = month_ordinals(pd.to_datetime(df['YearMonth']))
+    codes, items = pd.factorize(df['Item_Code'], sort=True)
+    first = int(ordinals.min())
+    shape = (len(items), int(ordinals.max()) - first + 1)
+    col = ordinals - first
+
+    qty = np.full(shape, np.nan)
+    qty[codes, col] = df['Order_Qty'].to_numpy(dtype=float)
+    # Every cell keeps its own description (blank ones as '', which the CSV writes the same way)
+    desc = df['Description'].fillna('').to_numpy(dtype=object)
+    descriptions = (codes * shape[1] + col, desc, np.full(len(items), '', dtype=object))
+    write_grid(path, np.asarray(items, dtype=object), first, qty, descriptions)
+
+
+class GridFile:
+    def __init__(self, path, mmap=True):
+        self.path = path
+        self.mmap_mode = 'r' if mmap else None
+        meta_path = os.path.join(path, META_NAME)
+        if not os.path.exists(meta_path):
+            raise ValueError(f"{path} is not a grid directory")
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get('format') != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported grid format {meta.get('format')}")
+        self.first = meta['first']
+        self.n_items = meta['items']
+        self.n_months = meta['months']
+
+    def __len__(self):
+        return self.n_items * self.n_months
+
+    def _load(self, name):
+        return np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode=self.mmap_mode, allow_pickle=False)
+
+    def item_codes(self):
+        return self._load('items').astype(object)
+
+    # === Columns ===
+
+    def order_qty(self, nullable=True):
+        # Order_Qty column: nullable Int64 over the stored arrays, or (nullable=False)
+        # what read_csv gives, int64 without missing months and float with NaN otherwise
+        qty, missing = self._load('qty').reshape(-1), self._load('missing').reshape(-1)
+        if nullable:
+            return pd.arrays.IntegerArray(qty, missing)
+        if not missing.any():
+            return np.array(qty)
+        return np.where(missing, np.nan, qty)
+
+    def description(self):
+        return pd.Categorical.from_codes(self._load('description').reshape(-1),
+                                         pd.Index(self._load('description_categories'), dtype=object))
+
+    def frame(self, columns=GRID_COLUMNS, nullable=True):
+        # Long frame with only the requested columns
+        return long_frame(self.item_codes(), self.first, self.n_months,
+                          self.order_qty(nullable) if 'Order_Qty' in columns else None,
+                          self.description() if 'Description' in columns else None, columns)
+
+    def matrix(self):
+        # items × months float matrix, NaN where missing (read_grid_matrix layout)
+        return np.where(self._load('missing'), np.nan, self._load('qty')).T.copy()
+
+    def export_csv(self, csv_path):
+        self.frame().to_csv(csv_path, index=False)
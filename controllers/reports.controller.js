@@ -147,48 +147,207 @@ export const getAgeDistribution = async (req, res) => {
   return res.json({ ageData: results })
 }
 
-// **GET /reports/forecast** - Run Python script to predict next month’s forecast for items
+// Long-lived Python forecast process, shared by all forecast requests
+let forecastShell = null
+let forecastRequestId = 0
+const pendingForecasts = new Map()
+
+const getPythonPath = () => {
+  if (process.env.SYSTEM === 'WINDOWS') {
+    // PATH for Windows systems
+    return path.resolve('forecast/.venv/Scripts/python')
+  }
+  // PATH for MacOS systems
+  return path.resolve('forecast/.venv/bin/python')
+}
+
+const getForecastShell = () => {
+  if (forecastShell) return forecastShell
+
+  const scriptPath = path.resolve('forecast/forecast_server.py')
+  const pythonPath = getPythonPath()
+  console.log('🚀 Starting Python forecast server:', scriptPath)
+
+  const shell = new PythonShell(scriptPath, { pythonPath, mode: 'json' })
+
+  shell.on('message', (message) => {
+    const pending = pendingForecasts.get(message.id)
+    if (!pending) return
+    // Multi-month requests send one message per month before the final one
+    if (message.month && pending.onMonth) return pending.onMonth(message)
+    pendingForecasts.delete(message.id)
+    if (message.error) pending.reject(Object.assign(new Error(message.error), { status: message.status }))
+    else pending.resolve(message.predictions)
+  })
+
+  // The server runs until its stdin is closed, so end() is only called on shutdown (stopPythonShells).
+  // If it exits or fails on its own, drop it and fail what is pending; the next request starts a new one.
+  const onExit = (err) => {
+    if (forecastShell !== shell) return
+    if (err) console.error('Python forecast server exited:', err)
+    forecastShell = null
+    pendingForecasts.forEach((pending) =>
+      pending.reject(err || new Error('Forecast server exited'))
+    )
+    pendingForecasts.clear()
+  }
+  shell.on('pythonError', onExit)
+  shell.on('error', onExit)
+  shell.on('close', () => onExit())
+
+  forecastShell = shell
+  return shell
+}
+
+// Close the long-lived Python processes' stdin so they exit cleanly with the Node process
+// (the job queue lets its running jobs finish first)
+export const stopPythonShells = () => {
+  if (forecastShell) forecastShell.end(() => {})
+  if (jobShell) jobShell.end(() => {})
+}
+process.once('exit', stopPythonShells)
+
+const queryForecast = (query, onMonth) =>
+  new Promise((resolve, reject) => {
+    const id = ++forecastRequestId
+    pendingForecasts.set(id, { resolve, reject, onMonth })
+    getForecastShell().send({ id, ...query })
+  })
+
+// Whole number from a query string value, or null when it is not one
+const parseCount = (value) => (/^\d+$/.test(String(value)) ? Number(value) : null)
+
+const forecastQuery = (req) => {
+  const query = {}
+  if (req.query.month) query.month = req.query.month
+  if (req.query.top) query.top_n = parseCount(req.query.top)
+  if (req.query.items) query.items = String(req.query.items).split(',')
+  if (req.query.prefix) query.prefix = String(req.query.prefix).split(',')
+  return query
+}
+
+// **GET /reports/forecast** - Predict next month’s forecast for items
+// Optional query params: month (YYYY-MM), top (number of items), items (comma separated codes),
+// prefix (comma separated code prefixes, e.g. PRO-,BRD-)
 export const predictForecast = async (req, res) => {
-  try {
-    const scriptPath = path.resolve('forecast/predict_runner.py')
-    let pythonPath
-    if (process.env.SYSTEM === 'WINDOWS') {
-      // PATH for Windows systems
-      pythonPath = path.resolve('forecast/.venv/Scripts/python')
-    } else {
-      // PATH for MacOS systems
-      pythonPath = path.resolve('forecast/.venv/bin/python')
-    }
-    console.log('🚀 Running Python script:', scriptPath)
+  if (req.query.top && parseCount(req.query.top) === null)
+    return res.status(400).json({ success: false, error: 'top must be a whole number' })
 
-    const shell = new PythonShell(scriptPath, { pythonPath })
+  const [err, predictions] = await to(queryForecast(forecastQuery(req)))
 
-    let rawOutput = ''
+  if (err) {
+    console.error('Python error:', err)
+    // 400 for a bad month / range / top (forecast_server.py flags those), 500 otherwise
+    return res.status(err.status || 500).json({ success: false, error: err.message })
+  }
 
-    shell.on('message', function (message) {
-      console.log('🐍 Python message:', message)
-      rawOutput += message
-    })
+  return res.status(200).json({ success: true, predictions })
+}
 
-    shell.end(function (err) {
-      if (err) {
-        console.error('Python error:', err)
-        return res.status(500).json({ success: false, error: err.message })
-      }
+// **GET /reports/forecast/range** - Forecast for several months, streamed as JSON lines
+// Query params as /reports/forecast, plus horizon (number of months, default 6).
+// Each line is {"month": "YYYY-MM", "predictions": [...]}
+export const predictForecastRange = async (req, res) => {
+  for (const name of ['top', 'horizon']) {
+    if (req.query[name] && parseCount(req.query[name]) === null)
+      return res.status(400).json({ success: false, error: `${name} must be a whole number` })
+  }
+  const query = { ...forecastQuery(req), horizon: req.query.horizon ? parseCount(req.query.horizon) : 6 }
 
-      try {
-        const predictions = JSON.parse(rawOutput)
-        console.log('📦 Final predictions parsed:', predictions)
-        return res.status(200).json({ success: true, predictions })
-      } catch (parseErr) {
-        console.error('JSON parse error:', parseErr)
-        return res
-          .status(500)
-          .json({ success: false, error: 'Invalid JSON from Python' })
-      }
-    })
-  } catch (error) {
-    console.error('Node catch block error:', error)
-    return res.status(500).json({ success: false, error: error.message })
+  res.type('application/x-ndjson')
+  const [err] = await to(
+    queryForecast(query, ({ month, predictions }) =>
+      res.write(JSON.stringify({ month, predictions }) + '\n')
+    )
+  )
+
+  if (err) {
+    console.error('Python error:', err)
+    // The range is validated before the first month is sent, so a bad request still gets its status
+    if (!res.headersSent) res.status(err.status || 500)
+    res.write(JSON.stringify({ error: err.message }) + '\n')
+  }
+  return res.end()
+}
+
+// Long-lived Python job queue for the slow pipeline jobs (Prophet training,
+// holdout evaluation, chart rendering, ...). Jobs run in the background; the
+// client submits one, gets its job_id back at once and polls for status.
+let jobShell = null
+let jobRequestId = 0
+const pendingJobRequests = new Map()
+
+const getJobShell = () => {
+  if (jobShell) return jobShell
+
+  const scriptPath = path.resolve('forecast/job_queue.py')
+  console.log('🚀 Starting Python job queue:', scriptPath)
+
+  const shell = new PythonShell(scriptPath, { pythonPath: getPythonPath(), mode: 'json' })
+
+  shell.on('message', (message) => {
+    const pending = pendingJobRequests.get(message.id)
+    if (!pending) return
+    pendingJobRequests.delete(message.id)
+    if (message.error) pending.reject(new Error(message.error))
+    else pending.resolve(message)
+  })
+
+  // Same lifecycle as the forecast server: end() only on shutdown
+  const onExit = (err) => {
+    if (jobShell !== shell) return
+    if (err) console.error('Python job queue exited:', err)
+    jobShell = null
+    pendingJobRequests.forEach((pending) =>
+      pending.reject(err || new Error('Job queue exited'))
+    )
+    pendingJobRequests.clear()
   }
+  shell.on('pythonError', onExit)
+  shell.on('error', onExit)
+  shell.on('close', () => onExit())
+
+  jobShell = shell
+  return shell
+}
+
+const queryJobs = (request) =>
+  new Promise((resolve, reject) => {
+    const id = ++jobRequestId
+    pendingJobRequests.set(id, { resolve, reject })
+    getJobShell().send({ id, ...request })
+  })
+
+// **POST /reports/jobs** - Start a pipeline job: body { job, params }
+// job is one of job_queue.py's JOBS (prophet, prophet_holdout, item_charts, ...).
+// params may only hold the settings job_queue.py's PARAMS allows for the job (workers,
+// timeout, horizon, ...); file paths are fixed on the server and other keys get a 400.
+// An identical job that is still queued or running is returned instead of a new one.
+export const submitJob = async (req, res) => {
+  const { job, params } = req.body || {}
+  if (!job) return res.status(400).json({ success: false, error: 'job is required' })
+  if (params !== undefined && (params === null || typeof params !== 'object' || Array.isArray(params)))
+    return res.status(400).json({ success: false, error: 'params must be an object' })
+
+  const [err, message] = await to(queryJobs({ op: 'submit', job, params: params || {} }))
+  if (err) return res.status(400).json({ success: false, error: err.message })
+
+  return res.status(202).json({ success: true, job: message.job })
+}
+
+// **GET /reports/jobs/:jobId** - Status of a job: queued / running (with progress) / done / failed
+export const getJobStatus = async (req, res) => {
+  const [err, message] = await to(queryJobs({ op: 'status', job_id: req.params.jobId }))
+  // Unknown and malformed job ids (job_queue.py only accepts ids it generates) are both a 404
+  if (err) return res.status(404).json({ success: false, error: err.message })
+
+  return res.status(200).json({ success: true, job: message.job })
+}
+
+// **GET /reports/jobs** - Jobs submitted since the job queue started
+export const listJobs = async (req, res) => {
+  const [err, message] = await to(queryJobs({ op: 'list' }))
+  if (err) return res.status(500).json({ success: false, error: err.message })
+
+  return res.status(200).json({ success: true, jobs: message.jobs })
 }
@@ -0,0 +1,227 @@
+"""
+Demand classification: route each item to a forecaster that fits its demand pattern.
+
+Items are classed on the Syntetos-Boylan scheme from two per-item metrics of
+the item × month grid:
+
+  ADI  average demand interval: observed months / months with demand > 0
+  CV²  squared coefficient of variation of the non-zero demand sizes
+
+                    CV² < 0.49     CV² >= 0.49
+    ADI < 1.32      smooth         erratic
+    ADI >= 1.32     intermittent   lumpy
+
+plus 'inactive' for items with no demand in the last `inactive_months` months
+of the grid (or none ever). Each class maps to a cost tier (ROUTES): only
+smooth items with enough history get a Prophet fit, the other classes go to
+the vectorized models of classical_models.py, and inactive items get no
+forecast at all.
+
+The metrics come from running sums (observed months, demand months, sum and
+sum of squares of demand sizes, last demand month), so the classification
+is saved and later grid months are folded in without recomputing the history.
+Months already folded in are assumed not to change; pass rebuild=True to
+load_or_build after correcting past data.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count_rows, timed
+
+CLASSES = ('smooth', 'erratic', 'intermittent', 'lumpy', 'inactive')
+
+ADI_CUTOFF = 1.32
+CV2_CUTOFF = 0.49
+
+# Class → model name (classical_models.MODELS or 'prophet'); None: no forecast
+ROUTES = {
+    'smooth': 'prophet',
+    'erratic': 'holt_winters',
+    'intermittent': 'croston',
+    'lumpy': 'tsb',
+    'inactive': None,
+}
+
+STAT_FIELDS = ('observed', 'demand', 'size_sum', 'size_sq', 'last_demand')
+
+
+class DemandClasses:
+    def __init__(self, codes=(), last=None, **stats):
+        self.codes = np.asarray(codes, dtype=object)
+        self.last = last  # ordinal of the last month folded in
+        self.observed = np.asarray(stats.get('observed', np.zeros(len(self.codes))), dtype=np.int64)
+        self.demand = np.asarray(stats.get('demand', np.zeros(len(self.codes))), dtype=np.int64)
+        self.size_sum = np.asarray(stats.get('size_sum', np.zeros(len(self.codes))), dtype=float)
+        self.size_sq = np.asarray(stats.get('size_sq', np.zeros(len(self.codes))), dtype=float)
+        self.last_demand = np.asarray(stats.get('last_demand', np.full(len(self.codes), -1)), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.codes)
+
+    # === Building / updating ===
+
+    @classmethod
+    def from_grid(cls, items, first, qty):
+        # items × months matrix (read_grid_matrix); NaN months are not observed
+        classes = cls(last=first - 1)
+        classes.update(items, first, qty)
+        return classes
+
+    def _rows(self, items):
+        # Row per item, appending rows for items not seen before
+        items = np.asarray(items, dtype=object)
+        rows = pd.Index(self.codes).get_indexer(items)
+        new = rows < 0
+        if new.any():
+            added = items[new]
+            rows[new] = len(self.codes) + np.arange(len(added))
+            self.codes = np.concatenate([self.codes, added])
+            self.observed = np.concatenate([self.observed, np.zeros(len(added), dtype=np.int64)])
+            self.demand = np.concatenate([self.demand, np.zeros(len(added), dtype=np.int64)])
+            self.size_sum = np.concatenate([self.size_sum, np.zeros(len(added))])
+            self.size_sq = np.concatenate([self.size_sq, np.zeros(len(added))])
+            self.last_demand = np.concatenate([self.last_demand, np.full(len(added), -1, dtype=np.int64)])
+        return rows
+
+    def update(self, items, first, qty):
+        # Fold in the months of the matrix after self.last; returns the number of months added
+        start = 0 if self.last is None else max(self.last + 1 - first, 0)
+        qty = np.asarray(qty, dtype=float)[:, start:]
+        if qty.shape[1] == 0:
+            return 0
+
+        rows = self._rows(items)
+        seen = ~np.isnan(qty)
+        positive = seen & (qty > 0)
+        sizes = np.where(positive, qty, 0.0)
+
+        self.observed[rows] += seen.sum(axis=1)
+        self.demand[rows] += positive.sum(axis=1)
+        self.size_sum[rows] += sizes.sum(axis=1)
+        self.size_sq[rows] += (sizes ** 2).sum(axis=1)
+
+        # Last month with demand: the last True column of each row
+        has_demand = positive.any(axis=1)
+        last_col = qty.shape[1] - 1 - np.argmax(positive[:, ::-1], axis=1)
+        self.last_demand[rows[has_demand]] = first + start + last_col[has_demand]
+
+        self.last = first + start + qty.shape[1] - 1
+        return qty.shape[1]
+
+    # === Metrics and classes ===
+
+    def adi(self):
+        # inf for items that never had demand
+        with np.errstate(divide='ignore'):
+            return np.where(self.demand > 0, self.observed / np.maximum(self.demand, 1), np.inf)
+
+    def cv2(self):
+        # Population variance of the demand sizes over their squared mean (0 for < 2 demands)
+        n = np.maximum(self.demand, 1)
+        mean = self.size_sum / n
+        var = np.maximum(self.size_sq / n - mean ** 2, 0.0)
+        return np.where(mean > 0, var / np.where(mean > 0, mean, 1.0) ** 2, 0.0)
+
+    def labels(self, inactive_months=12):
+        adi, cv2 = self.adi(), self.cv2()
+        labels = np.where(adi < ADI_CUTOFF,
+                          np.where(cv2 < CV2_CUTOFF, 'smooth', 'erratic'),
+                          np.where(cv2 < CV2_CUTOFF, 'intermittent', 'lumpy')).astype(object)
+        inactive = (self.last_demand < 0) | (self.last - self.last_demand >= inactive_months)
+        labels[inactive] = 'inactive'
+        return labels
+
+    def routes(self, inactive_months=12, prophet_min_points=24):
+        # Model per item; smooth items with too short a history for Prophet go to Holt-Winters
+        labels = self.labels(inactive_months)
+        models = np.array([ROUTES[label] for label in labels], dtype=object)
+        short = (models == 'prophet') & (self.observed < prophet_min_points)
+        models[short] = 'holt_winters'
+        return models
+
+    def to_frame(self, inactive_months=12, prophet_min_points=24):
+        return pd.DataFrame({
+            'Item_Code': self.codes,
+            'class': self.labels(inactive_months),
+            'model': self.routes(inactive_months, prophet_min_points),
+            'ADI': np.round(self.adi(), 3),
+            'CV2': np.round(self.cv2(), 3),
+            'observed_months': self.observed,
+            'demand_months': self.demand,
+        }).sort_values('Item_Code', kind='stable').reset_index(drop=True)
+
+    # === Persistence ===
+
+    def save(self, path):
+        state = {'codes': self.codes.tolist(), 'last': self.last}
+        state.update({field: getattr(self, field).tolist() for field in STAT_FIELDS})
+        with open(path, 'w') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            state = json.load(f)
+        return cls(state.pop('codes'), state.pop('last'), **state)
+
+
+@timed
+def load_or_build(path, grid_path, rebuild=False):
+    # Saved classification with any newer grid months folded in (saved back if changed)
+    from dense_grid import read_grid_matrix
+
+    items, first, qty = read_grid_matrix(grid_path)
+    count_rows(len(items))
+
+    if path and os.path.exists(path) and not rebuild:
+        classes = DemandClasses.load(path)
+        # A grid that ends before the saved state is a different dataset: start over
+        if classes.last is None or classes.last <= first + qty.shape[1] - 1:
+            if classes.update(items, first, qty):
+                classes.save(path)
+            return classes
+
+    classes = DemandClasses.from_grid(items, first, qty)
+    if path:
+        classes.save(path)
+    return classes
+
+
+# === Routed forecasting ===
+
+@timed
+def forecast_routed(input_file='final_output_with_nan.csv', output_dir='prophet_forecasts_all_items',
+                    classes_path='demand_classes.json', periods=12, inactive_months=12, prophet_min_points=24,
+                    workers=None, timeout=None, cache_dir=None, export_csv=False):
+    # Forecast every item with the model of its class; returns {model: items forecast}
+    from classical_models import forecast_catalog
+    from forecast_store import ForecastStore
+    from parallel_training import STORE_NAME, train_prophet_parallel
+
+    classes = load_or_build(classes_path, input_file)
+    routes = classes.routes(inactive_months, prophet_min_points)
+    os.makedirs(output_dir, exist_ok=True)
+    classes.to_frame(inactive_months, prophet_min_points).to_csv(os.path.join(output_dir, 'demand_classes.csv'),
+                                                                 index=False)
+
+    inactive = classes.labels(inactive_months) == 'inactive'
+    counts = {}
+    for model in sorted(set(routes[~inactive])):
+        items = classes.codes[routes == model]
+        if model == 'prophet':
+            train_prophet_parallel(input_file, output_dir, periods=periods, workers=workers, timeout=timeout,
+                                   cache_dir=cache_dir, items=items)
+        else:
+            forecast_catalog(input_file, output_dir, model=model, periods=periods, min_points=1, items=items)
+        counts[model] = len(items)
+
+    # Inactive items: drop forecasts left from earlier runs
+    with ForecastStore(os.path.join(output_dir, STORE_NAME)) as store:
+        store.delete(classes.codes[inactive].tolist())
+        if export_csv:
+            store.export_csv(output_dir)
+    counts['inactive'] = int(inactive.sum())
+    return counts
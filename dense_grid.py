@@ -0,0 +1,197 @@
+"""
+Single-pass item × month grid, replacing the addZeros → handleMissingMonths
+chain and its intermediate CSV.
+
+Items are integer-coded and months become ordinals (year * 12 + month - 1),
+so the grid is one preallocated (items × months) array filled with
+np.add.at. In the same pass the grid tells apart
+
+  0    the item had no orders in a month that has data for other items
+  NaN  no orders at all in that month (a gap in the source data)
+
+The output has the same columns and row order as final_output_with_nan2.csv.
+Note that the old chain never produced NaN: addZeros already spans every month
+from first to last, so handleMissingMonths found nothing to fill and gap months
+ended up as 0. gap_months='zero' reproduces that output byte for byte;
+the default 'nan' gives what handleMissingMonths was meant to produce.
+
+The grid can be saved as the CSV or as a typed .grid directory (columnar.py),
+which the later stages read back without parsing text; read_grid_matrix and
+read_grid_frame take either.
+"""
+import numpy as np
+import pandas as pd
+
+GRID_COLUMNS = ['Year', 'Month', 'YearMonth', 'Item_Code', 'Description', 'Order_Qty']
+
+
+def month_ordinals(ship_dates):
+    # Parsed Ship_Date → year * 12 + month - 1 (NaT rows come back as -1)
+    valid = ship_dates.notna().to_numpy()
+    ordinals = np.full(len(ship_dates), -1, dtype=np.int64)
+    ordinals[valid] = (ship_dates.dt.year.to_numpy()[valid] * 12 + ship_dates.dt.month.to_numpy()[valid] - 1)
+    return ordinals
+
+
+def build_grid(orders, gap_months='nan', dictionary=None):
+    # orders: DataFrame with Ship_Date (parsed), Item_Code, Description, Order_Qty.
+    # dictionary: optional ItemDictionary (item_dictionary.py) covering these items,
+    # used for the item ids and per-item descriptions instead of deriving them.
+    # Returns (items, first_ordinal, qty, descriptions).
+    # Lines without a ship date or item code are dropped, as the groupby in addZeros did
+    orders = orders[orders['Ship_Date'].notna() & orders['Item_Code'].notna()]
+    ordinals = month_ordinals(orders['Ship_Date'])
+
+    if dictionary is None:
+        codes, items = pd.factorize(orders['Item_Code'], sort=True)
+    else:
+        # Items present, in code order (their rank in the dictionary), renumbered densely
+        ids = dictionary.ids(orders['Item_Code'])
+        if (ids < 0).any():
+            raise ValueError("orders contain items missing from the item dictionary")
+        present, codes = np.unique(dictionary.rank[ids], return_inverse=True)
+        present = dictionary.order[present]
+        items = dictionary.codes[present]
+    first = int(ordinals.min())
+    n_months = int(ordinals.max()) - first + 1
+    col = ordinals - first
+
+    # === Quantities: one scatter-add into the dense matrix ===
+    qty = np.zeros((len(items), n_months))
+    np.add.at(qty, (codes, col), np.nan_to_num(orders['Order_Qty'].to_numpy(dtype=float)))
+
+    # Months with no order lines at all are gaps, not zeros
+    has_data = np.bincount(col, minlength=n_months) > 0
+    if gap_months == 'nan':
+        qty[:, ~has_data] = np.nan
+    elif gap_months != 'zero':
+        raise ValueError(f"Unknown gap_months: {gap_months}")
+
+    # === Descriptions: first non-empty per item-month, and per item ===
+    desc = orders['Description'].to_numpy(dtype=object)
+    named = pd.notna(desc)
+    cell = codes[named] * n_months + col[named]
+    cell_keys, first_pos = np.unique(cell, return_index=True)
+    cell_desc = desc[named][first_pos]
+
+    # For gap months: the item's non-blank description from its earliest month with one
+    if dictionary is not None:
+        item_desc = dictionary.descriptions[present]
+    else:
+        blank = np.array([not str(d).strip() for d in cell_desc], dtype=bool)
+        item_of_cell = cell_keys[~blank] // n_months
+        item_first = np.unique(item_of_cell, return_index=True)[1]
+        item_desc = np.full(len(items), '', dtype=object)
+        item_desc[item_of_cell[item_first]] = cell_desc[~blank][item_first]
+
+    descriptions = (cell_keys, cell_desc, item_desc)
+    return np.asarray(items), first, qty, descriptions
+
+
+def cell_descriptions(qty, descriptions):
+    # Description of every grid cell, month-major like the long frame: a cell with
+    # orders gets its own first description, a gap month the item's description
+    n_items, n_months = qty.shape
+    cell_keys, cell_desc, item_desc = descriptions
+
+    description = np.full(n_items * n_months, '', dtype=object)
+    gap = np.isnan(qty.T.ravel())
+    description[gap] = item_desc[np.tile(np.arange(n_items), n_months)[gap]]
+    # Cell key is item * n_months + month
+    description[(cell_keys % n_months) * n_items + cell_keys // n_months] = cell_desc
+    return description
+
+
+def long_frame(items, first, n_months, order_qty, description=None, columns=GRID_COLUMNS):
+    # Month-major long frame (rows sorted by Year, Month, Item_Code); only the
+    # requested columns are built. Month columns are computed once per month and repeated.
+    n_items = len(items)
+    ordinals = first + np.arange(n_months)
+    month_starts = pd.to_datetime(pd.DataFrame({'year': ordinals // 12, 'month': ordinals % 12 + 1, 'day': 1}))
+
+    # Item_Code and Description as Categoricals: int codes per row instead of strings
+    builders = {
+        'Year': lambda: np.repeat(ordinals // 12, n_items),
+        'Month': lambda: np.repeat(ordinals % 12 + 1, n_items),
+        'YearMonth': lambda: np.repeat(month_starts.to_numpy(), n_items),
+        'Item_Code': lambda: pd.Categorical.from_codes(np.tile(np.arange(n_items), n_months),
+                                                       pd.Index(items, dtype=object)),
+        'Description': lambda: description if isinstance(description, pd.Categorical) else pd.Categorical(description),
+        'Order_Qty': lambda: order_qty,
+    }
+    columns = [c for c in GRID_COLUMNS if c in columns]
+    return pd.DataFrame({c: builders[c]() for c in columns}, columns=columns)
+
+
+def grid_to_frame(items, first, qty, descriptions, columns=GRID_COLUMNS):
+    # Long format, sorted by (Year, Month, Item_Code) like final_output_with_nan2.csv
+    values = qty.T.ravel()
+    gap = np.isnan(values)
+    order_qty = pd.array(np.where(gap, 0, values).astype(np.int64), dtype='Int64')
+    order_qty[gap] = pd.NA
+
+    description = cell_descriptions(qty, descriptions) if 'Description' in columns else None
+    return long_frame(items, first, qty.shape[1], order_qty, description, columns)
+
+
+def read_grid_matrix(grid_path):
+    # Grid (final_output_with_nan.csv, or a .grid directory, see columnar.py) back to
+    # (items, first_ordinal, qty), qty an items × months matrix with NaN for missing months
+    from columnar import GridFile, is_columnar
+
+    if is_columnar(grid_path):
+        grid = GridFile(grid_path)
+        return grid.item_codes(), grid.first, grid.matrix()
+
+    df = pd.read_csv(grid_path, usecols=['YearMonth', 'Item_Code', 'Order_Qty'], dtype={'Item_Code': 'category'})
+    ordinals = month_ordinals(pd.to_datetime(df['YearMonth']))
+
+    codes, items = pd.factorize(df['Item_Code'], sort=True)
+    first = int(ordinals.min())
+    qty = np.full((len(items), int(ordinals.max()) - first + 1), np.nan)
+    qty[codes, ordinals - first] = df['Order_Qty'].to_numpy(dtype=float)
+    return np.asarray(items, dtype=object), first, qty
+
+
+def read_grid_frame(grid_path, columns=('YearMonth', 'Item_Code', 'Order_Qty')):
+    # Long frame with just these columns, from the grid CSV or a .grid directory.
+    # Same dtypes either way: YearMonth datetime, Item_Code categorical, Order_Qty
+    # as read_csv gives it (float with NaN when months are missing)
+    from columnar import GridFile, is_columnar
+
+    if is_columnar(grid_path):
+        return GridFile(grid_path).frame(columns, nullable=False)
+
+    df = pd.read_csv(grid_path, usecols=list(columns), dtype={'Item_Code': 'category'})
+    if 'YearMonth' in df:
+        df['YearMonth'] = pd.to_datetime(df['YearMonth'])
+    return df[[c for c in GRID_COLUMNS if c in columns]]
+
+
+def read_orders(orders_path):
+    df = pd.read_csv(orders_path, usecols=['Ship_Date', 'Item_Code', 'Description', 'Order_Qty'])
+    df['Ship_Date'] = pd.to_datetime(df['Ship_Date'], format='mixed', errors='coerce')
+    return df
+
+
+def build_final_grid(orders_path, output_path=None, gap_months='nan', dictionary_path=None, csv_path=None):
+    # orders CSV → final grid DataFrame, saved to output_path when given: a .grid
+    # directory (columnar.py) or a CSV. csv_path: also export it as CSV.
+    # dictionary_path: item dictionary to use and keep up to date (item_dictionary.py)
+    orders = read_orders(orders_path)
+    dictionary = None
+    if dictionary_path:
+        from item_dictionary import load_or_build
+        dictionary = load_or_build(dictionary_path, orders)
+    built = build_grid(orders, gap_months, dictionary)
+    grid = grid_to_frame(*built)
+
+    from columnar import is_columnar, write_grid
+
+    if output_path and is_columnar(output_path):
+        write_grid(output_path, *built)
+    elif output_path:
+        grid.to_csv(output_path, index=False)
+    if csv_path:
+        grid.to_csv(csv_path, index=False)
+    return grid
@@ -0,0 +1,131 @@
+"""
+Multi-month, filtered forecasts from the item summaries.
+
+Forecasts every requested month for the selected items in one batch
+(SummaryTable.forecast takes all target months at once), then ranks each month
+separately. Each month's values are identical to predict_next_month_quantities
+for that month; the model has no horizon term, so months differ only through
+seasonality.
+
+Items can be restricted to a list of codes and/or code prefixes ('PRO-',
+'BRD-'); top_n cuts each month's ranking. Results stream as JSON lines, one
+per month:
+
+    {"month": "2025-04", "predictions": [{"item_code": "BRD-1023-", "predicted_qty": 12}, ...]}
+
+    python forecast_api.py --start 2025-04 --horizon 6 --prefix PRO- BRD- --top 20
+"""
+import argparse
+import json
+import os
+import re
+import sys
+
+import numpy as np
+
+from summary_store import load_table
+from summary_table import rank
+
+
+# Furthest a request may reach past the last month of the summaries' data
+MAX_HORIZON = 24
+
+
+class QueryError(ValueError):
+    # A malformed or out-of-range request (the web server answers 400)
+    pass
+
+
+def parse_month(value):
+    # 'YYYY-MM' → month ordinal (year * 12 + month - 1)
+    match = re.fullmatch(r'(\d{4})-(\d{2})', str(value).strip())
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise QueryError(f"Invalid month {value!r}: expected YYYY-MM with a month from 01 to 12")
+    return int(match.group(1)) * 12 + int(match.group(2)) - 1
+
+
+def parse_count(value, name, minimum=0, maximum=None):
+    # Non-negative int from a request value (JSON number or numeric string; not a bool)
+    if isinstance(value, bool):
+        raise QueryError(f"Invalid {name} {value!r}: expected a whole number")
+    try:
+        count = int(value)
+    except (TypeError, ValueError):
+        raise QueryError(f"Invalid {name} {value!r}: expected a whole number") from None
+    if count != value and str(count) != str(value).strip():
+        raise QueryError(f"Invalid {name} {value!r}: expected a whole number")
+    if count < minimum or (maximum is not None and count > maximum):
+        bounds = f"from {minimum} to {maximum}" if maximum is not None else f"at least {minimum}"
+        raise QueryError(f"Invalid {name} {value!r}: must be {bounds}")
+    return count
+
+
+def check_range(table, start_month, horizon=1):
+    # Months start_month .. start_month + horizon - 1 must be valid and lie between the
+    # summaries' last data month and MAX_HORIZON months after it
+    start = parse_month(start_month)
+    horizon = parse_count(horizon, 'horizon', 1, MAX_HORIZON)
+    end = table.data_end()
+    if end is not None:
+        if start < end:
+            raise QueryError(f"Month {start_month} is before the summaries' last data month "
+                             f"{end // 12}-{end % 12 + 1:02d}")
+        if start + horizon - 1 > end + MAX_HORIZON:
+            raise QueryError(f"Forecast range ends more than {MAX_HORIZON} months after the summaries' "
+                             f"last data month {end // 12}-{end % 12 + 1:02d}")
+    return start, horizon
+
+
+def month_range(start_month, horizon=1):
+    # ['YYYY-MM', ...] for horizon months starting at start_month
+    ordinals = parse_month(start_month) + np.arange(horizon)
+    return [f"{o // 12}-{o % 12 + 1:02d}" for o in ordinals]
+
+
+def forecast_range(table, start_month, horizon=1, items=None, prefixes=None, top_n=None):
+    # Yields (month, [(item, qty), ...]) per month, each ranked like predict_next_month_quantities.
+    # Raises QueryError for a bad month or range before anything is computed
+    horizon = check_range(table, start_month, horizon)[1]
+    months = month_range(start_month, horizon)
+    rows = table.select(items, prefixes)
+    if rows is None:
+        rows = np.arange(len(table))
+
+    predicted, valid = table.forecast([int(m.split('-')[1]) for m in months], rows=rows)
+    rows = rows[valid]
+    predicted = predicted[valid]
+
+    for j, month in enumerate(months):
+        qty = predicted[:, j]
+        order = rank(qty, top_n)
+        yield month, [(table.items[i], int(q)) for i, q in zip(rows[order], qty[order])]
+
+
+def forecast_records(table, start_month, horizon=1, items=None, prefixes=None, top_n=None):
+    # JSON-ready {"month", "predictions"} dicts, one per month
+    for month, predictions in forecast_range(table, start_month, horizon, items, prefixes, top_n):
+        yield {"month": month,
+               "predictions": [{"item_code": item, "predicted_qty": qty} for item, qty in predictions]}
+
+
+def write_json_lines(records, stream=sys.stdout):
+    for record in records:
+        stream.write(json.dumps(record) + '\n')
+        stream.flush()
+
+
+if __name__ == '__main__':
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Stream multi-month summary forecasts as JSON lines.')
+    parser.add_argument('--summary', default=os.path.join(current_dir, 'item_summary_stats_updated.json'))
+    parser.add_argument('--start', default='2025-04', help="first forecast month, YYYY-MM")
+    parser.add_argument('--horizon', type=int, default=1, help="number of months")
+    parser.add_argument('--items', nargs='*', default=None)
+    parser.add_argument('--prefix', nargs='*', default=None)
+    parser.add_argument('--top', type=int, default=None)
+    parser.add_argument('--as-of', default=None, help="summary version label (YYYY-MM) of a versions directory")
+    args = parser.parse_args()
+
+    write_json_lines(forecast_records(load_table(args.summary, args.as_of), args.start, args.horizon,
+                                      args.items, args.prefix, args.top))
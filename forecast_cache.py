@@ -0,0 +1,133 @@
+"""
+Forecast cache keyed by a fingerprint of each item's input series.
+
+A fingerprint is a SHA-256 over the model config and the item's exact history:
+every month Prophet is given, with zero months as 0 and gap months (no data at
+all) absent, so two different inputs never share a key. When an item's
+fingerprint is unchanged since the last run, its stored forecast is reused
+instead of refitting.
+
+The fitted model is cached too, under orders_fingerprint: the history up to
+its last month with orders. A monthly rerun where an item only gained months
+without orders misses the forecast (its history changed) but finds the model,
+which then only predicts over the new history and horizon instead of being
+refit. Items with no orders at all have no model key.
+
+The cache is a directory of files plus an index.json holding per-entry size
+and last use. It is bounded by entry count and/or total bytes with
+least-recently-used eviction, and keeps running hit/miss counters for
+forecasts and models.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+INDEX_NAME = 'index.json'
+
+
+def fingerprint(ds, y, config):
+    ds = np.asarray(ds, dtype='datetime64[D]').astype(np.int64)
+    y = np.asarray(y, dtype=float)
+
+    h = hashlib.sha256()
+    h.update(json.dumps(config, sort_keys=True).encode('utf-8'))
+    h.update(ds.tobytes())
+    h.update(y.tobytes())
+    return h.hexdigest()
+
+
+def orders_fingerprint(ds, y, config):
+    # Key of the history up to its last month with orders; None without any orders
+    ordered = np.flatnonzero(np.asarray(y, dtype=float) != 0)
+    if not len(ordered):
+        return None
+    end = ordered[-1] + 1
+    return fingerprint(ds[:end], y[:end], dict(config, key='orders'))
+
+
+class ForecastCache:
+    def __init__(self, cache_dir, max_entries=None, max_bytes=None):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        index_path = os.path.join(cache_dir, INDEX_NAME)
+        if os.path.exists(index_path):
+            with open(index_path, 'r') as f:
+                index = json.load(f)
+        else:
+            index = {}
+        self.entries = index.get('entries', {})
+        self.hits = index.get('hits', 0)
+        self.misses = index.get('misses', 0)
+        self.model_hits = index.get('model_hits', 0)
+        self.model_misses = index.get('model_misses', 0)
+        self.evictions = index.get('evictions', 0)
+
+    def _path(self, key, suffix):
+        return os.path.join(self.cache_dir, key + suffix)
+
+    def get(self, key):
+        # Cached forecast DataFrame, or None; updates hit/miss counters
+        entry = self.entries.get(key)
+        if entry is None or not os.path.exists(self._path(key, '.csv')):
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry['last_used'] = time.time()
+        return pd.read_csv(self._path(key, '.csv'), parse_dates=['ds'])
+
+    def get_model(self, key):
+        # Serialized model (prophet.serialize.model_to_json) cached under key, or None
+        entry = self.entries.get(key)
+        if entry is None or not os.path.exists(self._path(key, '.model.json')):
+            self.model_misses += 1
+            return None
+        self.model_hits += 1
+        entry['last_used'] = time.time()
+        with open(self._path(key, '.model.json'), 'r') as f:
+            return f.read()
+
+    def put(self, key, item, forecast):
+        forecast.to_csv(self._path(key, '.csv'), index=False)
+        self._add(key, item, os.path.getsize(self._path(key, '.csv')))
+
+    def put_model(self, key, item, model_json):
+        with open(self._path(key, '.model.json'), 'w') as f:
+            f.write(model_json)
+        self._add(key, item, os.path.getsize(self._path(key, '.model.json')))
+
+    def _add(self, key, item, size):
+        self.entries[key] = {'item': item, 'size': size, 'last_used': time.time()}
+        self._evict()
+
+    def _evict(self):
+        total = sum(e['size'] for e in self.entries.values())
+        by_age = sorted(self.entries, key=lambda k: self.entries[k]['last_used'])
+
+        for key in by_age:
+            over_count = self.max_entries is not None and len(self.entries) > self.max_entries
+            over_size = self.max_bytes is not None and total > self.max_bytes
+            if not (over_count or over_size):
+                break
+            total -= self.entries.pop(key)['size']
+            self.evictions += 1
+            for suffix in ('.csv', '.model.json'):
+                if os.path.exists(self._path(key, suffix)):
+                    os.remove(self._path(key, suffix))
+
+    def stats(self):
+        return {'entries': len(self.entries), 'hits': self.hits, 'misses': self.misses,
+                'model_hits': self.model_hits, 'model_misses': self.model_misses,
+                'evictions': self.evictions, 'bytes': sum(e['size'] for e in self.entries.values())}
+
+    def save(self):
+        index = {'entries': self.entries, 'hits': self.hits, 'misses': self.misses, 'model_hits': self.model_hits,
+                 'model_misses': self.model_misses, 'evictions': self.evictions}
+        with open(os.path.join(self.cache_dir, INDEX_NAME), 'w') as f:
+            json.dump(index, f)
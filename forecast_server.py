@@ -0,0 +1,131 @@
+"""
+Long-lived forecast process.
+
+Loads the item summaries once and answers forecast queries as JSON lines on
+stdin/stdout, so the web server does not pay interpreter startup, imports and
+a full JSON parse on every request. The summary file (.json or .sumbin, see
+summary_store.py) is re-read only when its mtime changes.
+
+Request (one JSON object per line):
+    {"id": 1, "month": "2025-04", "top_n": 100, "items": ["BRD-1023-"], "prefix": ["PRO-"]}
+
+Response (one JSON object per line):
+    {"id": 1, "predictions": [{"item_code": "BRD-1023-", "predicted_qty": 12}]}
+    {"id": 1, "error": "...", "status": 400}
+
+A malformed or out-of-range request (bad month, horizon or top_n; months
+outside the summaries' data span, see forecast_api.check_range) gets status
+400; other errors have no status.
+
+A request with "horizon" (number of months from "month") is answered with one
+line per month, computed in one batch (see forecast_api.py), then a done line:
+    {"id": 2, "month": "2025-04", "predictions": [...]}
+    {"id": 2, "month": "2025-05", "predictions": [...]}
+    {"id": 2, "done": true}
+"""
+import argparse
+import json
+import os
+import sys
+
+from forecast_api import QueryError, check_range, forecast_records, parse_count
+from summary_store import load_table
+
+DEFAULT_MONTH = '2025-04'
+DEFAULT_TOP_N = 100
+
+
+class SummaryCache:
+    def __init__(self, summary_path):
+        self.summary_path = summary_path
+        self._mtime = None
+        self._table = None
+        self._predictions = {}
+
+    def table(self):
+        mtime = os.stat(self.summary_path).st_mtime_ns
+        if mtime != self._mtime:
+            self._table = load_table(self.summary_path)
+            self._mtime = mtime
+            self._predictions = {}
+        return self._table
+
+    def predictions(self, forecast_month, items=None, top_n=None, prefixes=None):
+        table = self.table()
+        if items or prefixes:
+            return table.predictions(forecast_month, top_n=top_n, rows=table.select(items, prefixes))
+
+        # Full ranking per month is cached until the summary file changes
+        if forecast_month not in self._predictions:
+            self._predictions[forecast_month] = table.predictions(forecast_month)
+        ranking = self._predictions[forecast_month]
+        return ranking if top_n is None else ranking[:top_n]
+
+
+def _query(request):
+    month = request.get('month') or DEFAULT_MONTH
+    top_n = request.get('top_n', DEFAULT_TOP_N)
+    items = request.get('items')
+    prefixes = request.get('prefix')
+
+    if top_n is not None:
+        top_n = parse_count(top_n, 'top_n')
+    # A single code or prefix may come as a string
+    if isinstance(items, str):
+        items = [items]
+    if isinstance(prefixes, str):
+        prefixes = [prefixes]
+
+    return month, top_n, items, prefixes
+
+
+def handle_request(cache, request):
+    month, top_n, items, prefixes = _query(request)
+    check_range(cache.table(), month)
+
+    predictions = cache.predictions(month, items=items, top_n=top_n, prefixes=prefixes)
+
+    return [{"item_code": item, "predicted_qty": qty} for item, qty in predictions]
+
+
+def handle_range_request(cache, request):
+    # {"month", "predictions"} per month of the horizon
+    month, top_n, items, prefixes = _query(request)
+    return forecast_records(cache.table(), month, request['horizon'], items, prefixes, top_n)
+
+
+def serve(summary_path, stdin=sys.stdin, stdout=sys.stdout):
+    cache = SummaryCache(summary_path)
+
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            if request.get('horizon') is not None:
+                for record in handle_range_request(cache, request):
+                    stdout.write(json.dumps({"id": request_id, **record}) + '\n')
+                response = {"id": request_id, "done": True}
+            else:
+                response = {"id": request_id, "predictions": handle_request(cache, request)}
+        except QueryError as e:
+            response = {"id": request_id, "error": str(e), "status": 400}
+        except Exception as e:
+            response = {"id": request_id, "error": str(e)}
+
+        stdout.write(json.dumps(response) + '\n')
+        stdout.flush()
+
+
+if __name__ == '__main__':
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Serve summary forecasts over stdin/stdout JSON lines.')
+    parser.add_argument('--summary', default=os.path.join(current_dir, 'item_summary_stats_updated.json'))
+    args = parser.parse_args()
+
+    serve(args.summary)
@@ -0,0 +1,95 @@
+"""
+Single SQLite store for all item forecasts.
+
+Replaces the one-CSV-per-item layout of prophet_forecasts_all_items/: every
+forecast row lives in one `forecasts` table keyed by (item, ds), with a
+secondary index on ds, so "all items for one month" is a single indexed query
+instead of opening thousands of files. The per-item CSV layout is still
+available through export_csv.
+"""
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forecasts (
+    item TEXT NOT NULL,
+    ds TEXT NOT NULL,
+    yhat REAL,
+    yhat_lower REAL,
+    yhat_upper REAL,
+    PRIMARY KEY (item, ds)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_forecasts_ds ON forecasts (ds);
+"""
+
+
+class ForecastStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, item, forecast):
+        # Replace the stored forecast of one item with forecast[ds, yhat, yhat_lower, yhat_upper]
+        self.write_many([(item, forecast)])
+
+    def write_many(self, forecasts):
+        with self.conn:
+            for item, forecast in forecasts:
+                ds = pd.to_datetime(forecast['ds']).dt.strftime('%Y-%m-%d')
+                rows = zip([item] * len(forecast), ds,
+                           forecast['yhat'].astype(float), forecast['yhat_lower'].astype(float),
+                           forecast['yhat_upper'].astype(float))
+                self.conn.execute("DELETE FROM forecasts WHERE item = ?", (item,))
+                self.conn.executemany("INSERT INTO forecasts VALUES (?, ?, ?, ?, ?)", rows)
+
+    def write_matrix(self, items, ds, yhat, yhat_lower, yhat_upper):
+        # Bulk write for batch models: ds is a list of 'YYYY-MM-DD' shared by all items,
+        # the value arrays are (items × len(ds)); NaN yhat cells are not stored
+        rows, cols = np.nonzero(~np.isnan(yhat))
+        ds = np.asarray(ds, dtype=object)
+        items = np.asarray(items, dtype=object)
+        values = zip(items[rows].tolist(), ds[cols].tolist(), yhat[rows, cols].tolist(),
+                     yhat_lower[rows, cols].tolist(), yhat_upper[rows, cols].tolist())
+        with self.conn:
+            self.conn.executemany("DELETE FROM forecasts WHERE item = ?", ((item,) for item in items.tolist()))
+            self.conn.executemany("INSERT INTO forecasts VALUES (?, ?, ?, ?, ?)", values)
+
+    def delete(self, items):
+        with self.conn:
+            self.conn.executemany("DELETE FROM forecasts WHERE item = ?", ((item,) for item in items))
+
+    def items(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT item FROM forecasts ORDER BY item")]
+
+    def item(self, item):
+        return pd.read_sql_query(
+            "SELECT ds, yhat, yhat_lower, yhat_upper FROM forecasts WHERE item = ? ORDER BY ds",
+            self.conn, params=(item,), parse_dates=['ds'])
+
+    def month(self, ds):
+        # [(item, yhat)] for one forecast month (ds as 'YYYY-MM-DD'), via the ds index
+        return self.conn.execute("SELECT item, yhat FROM forecasts WHERE ds = ?", (ds,)).fetchall()
+
+    def all(self):
+        return pd.read_sql_query("SELECT * FROM forecasts ORDER BY item, ds", self.conn, parse_dates=['ds'])
+
+    def export_csv(self, output_dir):
+        # Per-item {item}_forecast.csv files, the layout prophetModel used to write
+        os.makedirs(output_dir, exist_ok=True)
+        for item, forecast in self.all().groupby('item', sort=False):
+            forecast[FORECAST_COLUMNS].to_csv(os.path.join(output_dir, f'{item}_forecast.csv'), index=False)
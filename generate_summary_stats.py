@@ -1,15 +1,141 @@
-import pandas as pd
+# pandas and sklearn are imported inside the functions that build or update
+# summaries, so the prediction path (predict_next_month_quantities, used by
+# predict_runner.py) only loads numpy and the summary modules.
 import numpy as np
-from datetime import datetime
-from collections import defaultdict
-import json
-from sklearn.linear_model import LinearRegression
+from summary_table import SummaryTable
+from summary_store import load_summaries, save_summaries, load_table, load_records, save_records
+from instrumentation import count_rows, stage, timed
 
 
-def generate_summary_stats(input_path='final_output_with_nan.csv', output_path='item_summary_stats.json'):
-    # Load data
-    df = pd.read_csv(input_path)
-    df['YearMonth'] = pd.to_datetime(df['YearMonth'])
+@timed
+def generate_summary_stats(input_path='final_output_with_nan.csv', output_path='item_summary_stats.json',
+                           include_stats=False, classes_path=None):
+    from dense_grid import read_grid_frame
+
+    # Load data (grid CSV or .grid directory); Item_Code as a Categorical (sorted
+    # categories), so the sort and factorize in compute_summaries work on int codes
+    df = read_grid_frame(input_path)
+    count_rows(len(df))
+
+    # With a demand classification (demand_classes.py), inactive items get no summary
+    if classes_path:
+        from demand_classes import load_or_build
+        classes = load_or_build(classes_path, input_path)
+        inactive = classes.codes[classes.labels() == 'inactive']
+        df = df[~df['Item_Code'].isin(inactive)]
+        df['Item_Code'] = df['Item_Code'].cat.remove_unused_categories()
+
+    # include_stats adds the sufficient statistics needed by update_summary_incremental
+    summaries = compute_summaries(df, include_stats=include_stats)
+
+    # Save (JSON, binary store or versions directory, by extension)
+    save_summaries(summaries, output_path, label=df['YearMonth'].max().strftime('%Y-%m'))
+
+    # print(f"Saved summary for {len(summaries)} items → {output_path}")
+
+
+@timed(rows=len)
+def compute_summaries(df, min_months=6, include_stats=False):
+    # Single pass over all items: same output as compute_summaries_loop, but the
+    # per-item statistics are grouped NumPy reductions instead of one pandas
+    # groupby + sklearn fit per item.
+    import pandas as pd
+
+    df = df.dropna(subset=['Order_Qty'])
+    df = df.sort_values(['Item_Code', 'YearMonth'], kind='stable')
+
+    codes, items = pd.factorize(df['Item_Code'], sort=True)
+    qty = df['Order_Qty'].to_numpy()
+    month_num = df['YearMonth'].dt.month.to_numpy()
+    dates = df['YearMonth'].to_numpy()
+
+    counts = np.bincount(codes, minlength=len(items))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    # === Seasonality (avg qty by calendar month) for every item at once ===
+    cell = codes * 12 + (month_num - 1)
+    season_sum = np.bincount(cell, weights=qty, minlength=len(items) * 12).reshape(-1, 12)
+    season_cnt = np.bincount(cell, minlength=len(items) * 12).reshape(-1, 12)
+
+    mean_qty = np.empty(len(items))
+    std_qty = np.empty(len(items))
+    slope = np.empty(len(items))
+    intercept = np.empty(len(items))
+    total = np.empty(len(items))
+    total_sq = np.empty(len(items))
+    total_xy = np.empty(len(items))
+
+    # Items are bucketed by history length so each bucket is a dense
+    # (items × months) matrix and every reduction runs row-wise in one call.
+    eligible = np.flatnonzero(counts >= min_months)
+    for n in np.unique(counts[eligible]):
+        rows = eligible[counts[eligible] == n]
+        values = qty[starts[rows][:, None] + np.arange(n)]
+
+        # === Basic Stats ===
+        mean_qty[rows] = values.mean(axis=1)
+        std_qty[rows] = values.std(axis=1)
+
+        # === Linear Trend (closed-form OLS on month index 0..n-1) ===
+        # Normal equations over raw sums: for integer quantities every sum is
+        # exact, so each coefficient is a single correctly rounded division.
+        x = np.arange(n)
+        sum_x = x.sum()
+        sum_xx = (x * x).sum()
+        sum_y = values.sum(axis=1)
+        sum_xy = values @ x
+        denom = n * sum_xx - sum_x * sum_x
+        slope[rows] = (n * sum_xy - sum_x * sum_y) / denom
+        intercept[rows] = (sum_y * sum_xx - sum_x * sum_xy) / denom
+
+        total[rows] = sum_y
+        total_sq[rows] = (values * values).sum(axis=1)
+        total_xy[rows] = sum_xy
+
+    ends = starts + counts - 1
+    last_6_lists = {}
+    for i in eligible:
+        last_6_lists[i] = qty[max(ends[i] - 5, starts[i]):ends[i] + 1].tolist()
+
+    mean_r = np.round(mean_qty, 2).tolist()
+    std_r = np.round(std_qty, 2).tolist()
+    # + 0.0 turns -0.0 (flat or NaN-broken series) into 0.0, so the JSON does not depend on the sign of a zero
+    slope_r = (np.round(slope, 4) + 0.0).tolist()
+    intercept_r = (np.round(intercept, 2) + 0.0).tolist()
+    last_updated = pd.DatetimeIndex(dates[ends[eligible]]).strftime('%Y-%m-%d')
+
+    with np.errstate(invalid='ignore'):
+        season_mean = (season_sum / season_cnt).tolist()
+
+    # === Save summaries, in item order ===
+    summaries = {}
+    for k, i in enumerate(eligible):
+        summaries[items[i]] = {
+            "mean_qty": mean_r[i],
+            "std_dev_qty": std_r[i],
+            "slope": slope_r[i],
+            "intercept": intercept_r[i],
+            "last_6_months": last_6_lists[i],
+            "seasonality": {str(m + 1): round(season_mean[i][m], 2) for m in range(12) if season_cnt[i, m]},
+            "last_updated": last_updated[k]
+        }
+        if include_stats:
+            summaries[items[i]]["stats"] = {
+                "n": int(counts[i]),
+                "sum": float(total[i]),
+                "sum_sq": float(total_sq[i]),
+                "sum_xy": float(total_xy[i]),
+                "month_n": season_cnt[i].tolist(),
+                "month_sum": season_sum[i].tolist()
+            }
+
+    return summaries
+
+
+def compute_summaries_loop(df, min_months=6):
+    # Original per-item implementation, kept as the reference for
+    # benchmarks/bench_summary_stats.py
+    from sklearn.linear_model import LinearRegression
 
     summaries = {}
 
@@ -17,7 +143,7 @@ def generate_summary_stats(input_path='final_output_with_nan.csv', output_path='
         group = group.sort_values('YearMonth')
         group = group.dropna(subset=['Order_Qty'])
 
-        if len(group) < 6:
+        if len(group) < min_months:
             continue  # skip items with insufficient data
 
         # === Basic Stats ===
@@ -51,23 +177,29 @@ def generate_summary_stats(input_path='final_output_with_nan.csv', output_path='
             "last_updated": group['YearMonth'].max().strftime('%Y-%m-%d')
         }
 
-    # Save to JSON
-    import json
-    with open(output_path, 'w') as f:
-        json.dump(summaries, f, indent=2)
+    return summaries
 
-    # print(f"Saved summary for {len(summaries)} items → {output_path}")
 
+@timed
+def update_summary_with_new_month(summary_path, new_data_csv, output_path, mode='window'):
+    # mode='window' keeps the original behaviour (stats over the last 6 months);
+    # mode='incremental' keeps exact whole-history stats, see update_summary_incremental
+    if mode == 'incremental':
+        return update_summary_incremental(summary_path, new_data_csv, output_path)
+    if mode != 'window':
+        raise ValueError(f"Unknown update mode: {mode}")
+
+    import pandas as pd
+    from sklearn.linear_model import LinearRegression
 
-def update_summary_with_new_month(summary_path, new_data_csv, output_path):
     # Load existing summary
-    with open(summary_path, 'r') as f:
-        summaries = json.load(f)
+    summaries = load_summaries(summary_path)
 
     # Load new data
     new_df = pd.read_csv(new_data_csv)
     new_df['YearMonth'] = pd.to_datetime(new_df['YearMonth'])
     new_df['MonthNum'] = new_df['YearMonth'].dt.month
+    count_rows(len(new_df))
 
     for _, row in new_df.iterrows():
         item = row['Item_Code']
@@ -110,54 +242,122 @@ def update_summary_with_new_month(summary_path, new_data_csv, output_path):
         # === Update last_updated ===
         summary['last_updated'] = date_str
 
-    # Save updated summary
-    with open(output_path, 'w') as f:
-        json.dump(summaries, f, indent=2)
+    # Save updated summary (a versions directory only stores the changed items)
+    save_summaries(summaries, output_path, label=new_df['YearMonth'].max().strftime('%Y-%m'))
 
     # print(f"✅ Updated summaries saved to → {output_path}")
 
 
-def predict_next_month_quantities(summary_path='item_summary_stats_updated.json', forecast_month='2025-04'):
-    with open(summary_path, 'r') as f:
-        summaries = json.load(f)
-
-    month_num = int(forecast_month.split('-')[1])  # "04" → 4
-    predictions = []
-
-    for item, stats in summaries.items():
-        last6 = stats.get('last_6_months', [])
-        if len(last6) < 2:
-            continue
-
-        # Recent average
-        recent_avg = np.mean(last6)
-
-        # Linear trend (assume next index = len(last6))
-        slope = stats.get('slope', 0)
-        intercept = stats.get('intercept', 0)
-        trend_estimate = slope * len(last6) + intercept
+@timed
+def update_summary_incremental(summary_path, new_data_csv, output_path):
+    # Constant-time-per-item update from sufficient statistics kept in the summary
+    # (generate_summary_stats(..., include_stats=True)). Mean, std, trend and
+    # seasonality stay whole-history values, and each month is applied to all items
+    # in one vectorized step.
+    #
+    # Like regenerating from the grid, an item with statistics that has no orders in a
+    # month of the file gets a 0 for that month (a month with no quantities at all is
+    # a gap and is skipped). Months an item already has (up to its last_updated) are
+    # skipped, so ingesting the same file twice changes nothing. Unlike regenerating,
+    # items without a summary are not added, even once they reach min_months.
+    items, records = load_records(summary_path)
+    if 'n' not in records.dtype.names:
+        raise ValueError(f"{summary_path} has no sufficient statistics; "
+                         "regenerate it with generate_summary_stats(..., include_stats=True)")
+
+    import pandas as pd
 
-        # Seasonality adjustment
-        seasonality = stats.get('seasonality', {})
-        seasonal_factor = seasonality.get(str(month_num), stats['mean_qty'])  # fallback = mean
-        seasonal_boost = seasonal_factor - stats['mean_qty']
-
-        # Final forecast
-        predicted_qty = trend_estimate + recent_avg + seasonal_boost
-        predicted_qty = max(0, round(predicted_qty))  # no negative forecasts
-
-        predictions.append((item, predicted_qty))
-
-    # Sort results by predicted_qty descending
-    predictions.sort(key=lambda x: x[1], reverse=True)
-
-    # Print Top N
-    # print(f"📦 Forecast for {forecast_month} (Top 100):")
-    # print("-" * 40)
-    # for item, qty in predictions[:100]:
-        # print(f"{item:100s} → {qty}")
-
-    return predictions
+    new_df = pd.read_csv(new_data_csv)
+    # Version label for a versions directory, even when the month has no quantities
+    label = pd.to_datetime(new_df['YearMonth']).max().strftime('%Y-%m')
+    new_df = new_df.dropna(subset=['Order_Qty'])
+    new_df['YearMonth'] = pd.to_datetime(new_df['YearMonth'])
+    is_int = pd.api.types.is_integer_dtype(new_df['Order_Qty'])
+    count_rows(len(new_df))
+
+    # Several order lines for the same item and month count as one monthly total
+    monthly = new_df.groupby(['YearMonth', 'Item_Code'], sort=True)['Order_Qty'].sum().reset_index()
+
+    position = pd.Index(items).get_indexer(monthly['Item_Code'])
+    monthly['row'] = position
+    # Unknown items, and items without statistics, are skipped
+    monthly = monthly[position >= 0]
+    monthly = monthly[records['n'][monthly['row'].to_numpy()] >= 0]
+
+    tracked = np.flatnonzero(records['n'] >= 0)
+    for month, chunk in monthly.groupby('YearMonth', sort=True):
+        qty = np.zeros(len(tracked))
+        qty[np.searchsorted(tracked, chunk['row'].to_numpy())] = chunk['Order_Qty'].to_numpy(dtype=float)
+        # Only items whose history ends before this month
+        fresh = records['last_updated'][tracked] < month.strftime('%Y-%m-%d').encode('ascii')
+        ingest_month(records, tracked[fresh], qty[fresh], month, is_int)
+
+    save_records(items, records, output_path, label=label)
+
+
+def ingest_month(records, rows, qty, month, qty_is_int=True):
+    # Apply one month of quantities to the given record rows in place
+    m = month.month - 1
+
+    # === Sufficient statistics (x = month index, continuing after the last one) ===
+    x = records['n'][rows]
+    records['sum'][rows] += qty
+    records['sum_sq'][rows] += qty * qty
+    records['sum_xy'][rows] += x * qty
+    records['n'][rows] = x + 1
+    records['month_n'][rows, m] += 1
+    records['month_sum'][rows, m] += qty
+
+    # === Whole-history mean, std and trend ===
+    n = records['n'][rows].astype(float)
+    total = records['sum'][rows]
+    total_sq = records['sum_sq'][rows]
+    total_xy = records['sum_xy'][rows]
+
+    records['mean_qty'][rows] = np.round(total / n, 2)
+    records['std_dev_qty'][rows] = np.round(np.sqrt(np.maximum(n * total_sq - total * total, 0)) / n, 2)
+
+    sum_x = n * (n - 1) / 2
+    sum_xx = (n - 1) * n * (2 * n - 1) / 6
+    with np.errstate(invalid='ignore', divide='ignore'):
+        denom = n * sum_xx - sum_x * sum_x
+        records['slope'][rows] = np.round((n * total_xy - sum_x * total) / denom, 4) + 0.0
+        records['intercept'][rows] = np.round((total * sum_xx - sum_x * total_xy) / denom, 2) + 0.0
+
+    # === Seasonality: only the ingested calendar month changes ===
+    season = records['month_sum'][rows, m] / records['month_n'][rows, m]
+    records['seasonality'][rows, m] = [round(v, 2) for v in season.tolist()]
+
+    # === last_6_months: drop the oldest value once 6 are stored ===
+    last6 = records['last6']
+    length = records['last6_len'][rows].astype(np.int64)
+    full = length >= 6
+    full_rows = rows[full]
+    last6[full_rows, :-1] = last6[full_rows, 1:]
+    last6[full_rows, -1] = 0
+    length[full] -= 1
+    last6[rows, length] = qty
+    records['last6_len'][rows] = length + 1
+    records['last6_int'][rows] &= qty_is_int
+
+    records['last_updated'][rows] = month.strftime('%Y-%m-%d').encode('ascii')
+
+
+@timed(rows=len)
+def predict_next_month_quantities(summary_path='item_summary_stats_updated.json', forecast_month='2025-04',
+                                  as_of=None):
+    # as_of picks a version (number or month label) when summary_path is a versions directory
+    with stage('load_summaries'):
+        table = load_table(summary_path, as_of)
+    return table.predictions(forecast_month)
+
+
+@timed(rows=len)
+def predict_from_summaries(summaries, forecast_month='2025-04'):
+    # Same forecast as predict_next_month_quantities, on summaries already in memory.
+    # All items are computed in one vectorized pass (see summary_table.py);
+    # results are sorted by predicted_qty descending, ties in summary order.
+    return SummaryTable.from_summaries(summaries).predictions(forecast_month)
 
 
 # generate_summary_stats("final_output_with_nan2.csv", "item_summary_stats.json")
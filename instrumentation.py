@@ -0,0 +1,166 @@
+"""
+Opt-in stage timing for the forecasting scripts.
+
+Off unless FORECAST_METRICS is set (or enable() is called):
+
+    FORECAST_METRICS=stderr              one JSON line per stage on stderr
+    FORECAST_METRICS=/tmp/metrics.jsonl  the same lines appended to a file
+    FORECAST_PROFILE=/tmp/run.prof       cProfile dump of a profile_run() block
+                                         (for a sampling profile, run the script under py-spy instead)
+
+Each record has the stage name, wall and CPU seconds, rows processed (when
+the stage reports them with count_rows) and the process peak RSS so far:
+
+    {"stage": "predict_next_month_quantities", "wall_s": 0.041, "cpu_s": 0.04,
+     "rows": 2077, "peak_rss_mib": 88.2, "parent": "predict_runner", "pid": 123}
+
+Nothing is ever written to stdout, so predict_runner.py's output is unchanged.
+When disabled, @timed adds one flag check per call.
+
+Long per-item loops also report progress(done, total, item); it goes to the
+callback set with on_progress (the job queue's status files, see
+job_queue.py) and is a no-op otherwise.
+"""
+import functools
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_sink = os.environ.get('FORECAST_METRICS') or None
+_active = []  # records of the stages currently running, innermost last
+_progress = None
+
+
+def enable(sink='stderr'):
+    global _sink
+    _sink = sink
+
+
+def disable():
+    global _sink
+    _sink = None
+
+
+def enabled():
+    return _sink is not None
+
+
+def peak_rss_mib():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2 ** 20, 1)
+
+
+def process_age():
+    # Seconds since this process started (Linux only), None elsewhere
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(uptime - start_ticks / os.sysconf('SC_CLK_TCK'), 3)
+
+
+def emit(record):
+    if _sink is None:
+        return
+    line = json.dumps(record)
+    if _sink == 'stderr':
+        print(line, file=sys.stderr, flush=True)
+    else:
+        with open(_sink, 'a') as f:
+            f.write(line + '\n')
+
+
+def count_rows(n):
+    # Add n processed rows to the innermost running stage
+    if _active:
+        _active[-1]['rows'] = (_active[-1]['rows'] or 0) + int(n)
+
+
+@contextmanager
+def stage(name, rows=None):
+    if _sink is None:
+        yield None
+        return
+
+    record = {'stage': name, 'rows': rows, 'parent': _active[-1]['stage'] if _active else None}
+    _active.append(record)
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        _active.pop()
+        record['wall_s'] = round(time.perf_counter() - wall, 4)
+        record['cpu_s'] = round(time.process_time() - cpu, 4)
+        record['peak_rss_mib'] = peak_rss_mib()
+        record['pid'] = os.getpid()
+        emit(record)
+
+
+def timed(fn=None, *, name=None, rows=None):
+    # @timed or @timed(rows=len): rows is called on the return value to count rows
+    if fn is None:
+        return functools.partial(timed, name=name, rows=rows)
+
+    stage_name = name or fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _sink is None:
+            return fn(*args, **kwargs)
+        with stage(stage_name):
+            result = fn(*args, **kwargs)
+            if rows is not None:
+                count_rows(rows(result))
+            return result
+
+    return wrapper
+
+
+def startup():
+    # Record the time from process start to now (interpreter startup + imports so far)
+    age = process_age()
+    if _sink is not None and age is not None:
+        emit({'stage': 'startup', 'wall_s': age, 'peak_rss_mib': peak_rss_mib(), 'pid': os.getpid()})
+
+
+@contextmanager
+def profile_run(path=None):
+    # cProfile the block and dump stats to path (default: FORECAST_PROFILE); no-op without one
+    path = path or os.environ.get('FORECAST_PROFILE')
+    if not path:
+        yield None
+        return
+
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def on_progress(callback):
+    # callback(done, total, item), or None to stop reporting
+    global _progress
+    _progress = callback
+
+
+def progress(done, total, item=None):
+    if _progress is not None:
+        _progress(done, total, item)
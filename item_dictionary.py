@@ -0,0 +1,155 @@
+"""
+Shared item dictionary: item codes → dense integer ids and canonical descriptions.
+
+Built once from the order lines and saved next to the data, instead of every
+stage deriving its own item → Description map (addZeros' per-group lambda,
+handleMissingMonths' drop_duplicates, addToDB's dict loop).
+
+Ids are stable across runs: a code keeps the id it was first given, and new
+codes get the next free ids (in code order within one update), so arrays
+keyed by id stay valid. A separate sorted view of the codes serves lookups and
+the categorical dtype, whose categories are in string order: sorting, merging
+and grouping on Item_Code then compare ints but keep string order. The
+Categorical's codes are positions in that sorted view (rank), not ids.
+
+The canonical description of an item is the one handleMissingMonths uses for
+gap months: each item-month takes its first non-null Description (as addZeros
+does), and the item takes the first of those that is not blank, by month.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from dense_grid import month_ordinals
+
+
+class ItemDictionary:
+    def __init__(self, codes=(), descriptions=()):
+        self.codes = np.asarray(codes, dtype=object)                # item codes, id = position
+        self.descriptions = np.asarray(descriptions, dtype=object)  # canonical description per id, '' if none
+        self._reset()
+
+    def _reset(self):
+        self._dtype = None
+        self._order = None
+        self._sorted = None
+        self._rank = None
+
+    def __len__(self):
+        return len(self.codes)
+
+    # === Building ===
+
+    @staticmethod
+    def _first_descriptions(orders):
+        # code → canonical description, for items that have one
+        named = orders['Description'].notna().to_numpy()
+        cells = pd.DataFrame({
+            'Item_Code': orders['Item_Code'].to_numpy()[named],
+            'ordinal': month_ordinals(orders['Ship_Date'])[named],
+            'Description': orders['Description'].to_numpy(dtype=object)[named],
+        })
+        # First non-null per item-month (file order), then the earliest non-blank month
+        cells = cells.drop_duplicates(subset=['Item_Code', 'ordinal'])
+        cells = cells[cells['Description'].astype(str).str.strip().ne('')]
+        first = cells.sort_values('ordinal', kind='stable').drop_duplicates(subset='Item_Code')
+        return pd.Series(first['Description'].to_numpy(), index=first['Item_Code'].to_numpy())
+
+    @classmethod
+    def from_orders(cls, orders):
+        # orders: Ship_Date (parsed), Item_Code, Description; lines without a date or item code are skipped
+        orders = orders[orders['Ship_Date'].notna() & orders['Item_Code'].notna()]
+        codes = np.sort(pd.unique(orders['Item_Code']).astype(object))
+        first = cls._first_descriptions(orders)
+        descriptions = first.reindex(codes).fillna('').to_numpy(dtype=object)
+        return cls(codes, descriptions)
+
+    def update(self, orders):
+        # Add items under the next free ids (and descriptions for items that had none);
+        # existing ids are kept. Returns the added codes.
+        other = ItemDictionary.from_orders(orders)
+        at = self.ids(other.codes)
+        added = other.codes[at < 0]
+
+        descriptions = self.descriptions.copy()
+        missing = descriptions[at[at >= 0]] == ''
+        descriptions[at[at >= 0][missing]] = other.descriptions[at >= 0][missing]
+
+        self.codes = np.concatenate([self.codes, added]).astype(object)
+        self.descriptions = np.concatenate([descriptions, other.descriptions[at < 0]]).astype(object)
+        self._reset()
+        return added
+
+    # === Encoding ===
+
+    @property
+    def order(self):
+        # Ids in code order: the sorted view used for lookups
+        if self._order is None:
+            self._order = np.argsort(self.codes.astype(str), kind='stable')
+            self._sorted = self.codes.astype(str)[self._order]
+        return self._order
+
+    @property
+    def rank(self):
+        # Position of each id in the sorted view (the Categorical code of its item)
+        if self._rank is None:
+            self._rank = np.empty(len(self.codes), dtype=np.int64)
+            self._rank[self.order] = np.arange(len(self.codes))
+        return self._rank
+
+    @property
+    def dtype(self):
+        # CategoricalDtype over the item codes in string order; its codes are ranks
+        if self._dtype is None:
+            self._dtype = pd.CategoricalDtype(pd.Index(self.codes[self.order], dtype=object))
+        return self._dtype
+
+    def ids(self, codes):
+        # Ids for item codes, -1 for codes not in the dictionary (binary search in the sorted view)
+        codes = np.asarray(codes, dtype=object).astype(str)
+        if not len(self.codes):
+            return np.full(len(codes), -1, dtype=np.int64)
+        order = self.order
+        at = np.minimum(np.searchsorted(self._sorted, codes), len(order) - 1)
+        return np.where(self._sorted[at] == codes, order[at], -1)
+
+    def categorical(self, codes):
+        return pd.Categorical(codes, dtype=self.dtype)
+
+    def description(self, code):
+        i = self.ids([code])[0]
+        return self.descriptions[i] if i >= 0 else ''
+
+    def description_map(self):
+        return dict(zip(self.codes.tolist(), self.descriptions.tolist()))
+
+    # === Persistence ===
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({'codes': self.codes.tolist(), 'descriptions': self.descriptions.tolist()}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            state = json.load(f)
+        return cls(state['codes'], state['descriptions'])
+
+
+def load_or_build(path, orders):
+    # Saved dictionary extended with any new items in orders (saved back if it changed)
+    if path and os.path.exists(path):
+        dictionary = ItemDictionary.load(path)
+        before = dictionary.description_map()
+        dictionary.update(orders)
+        if dictionary.description_map() != before:
+            dictionary.save(path)
+        return dictionary
+
+    dictionary = ItemDictionary.from_orders(orders)
+    if path:
+        dictionary.save(path)
+    return dictionary
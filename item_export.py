@@ -0,0 +1,228 @@
+"""
+Incremental item export for the MongoDB item collection.
+
+addToDB rereads the whole item × month CSV and renumbers every item
+(OBJ{i} by sorted position) on each run. This module instead
+
+  * takes last-restock info straight from the dense grid arrays
+    (dense_grid.build_grid): last month with a positive quantity, its quantity
+    and description, in one vectorized pass;
+  * keeps item IDs stable across runs in a small state file, seeded from an
+    existing output_items2.csv so current IDs are kept;
+  * writes only new or changed items as newline-delimited bulkWrite
+    operations (updateOne with upsert), ready for Item.bulkWrite();
+  * appends those operations to the upsert file and keeps their digests as
+    pending until confirm_applied is called after the file went through
+    Item.bulkWrite(), so a second export before then neither loses the
+    unapplied operations nor drops items whose change was never applied;
+  * optionally joins safetyStock / reorderPoint from a saved safety stock
+    table (safety_stock.py) into those documents.
+
+The full CSV in the addToDB format is still available with write_csv.
+"""
+import csv
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from dense_grid import build_grid
+
+CSV_FIELDNAMES = [
+    "Object Id",
+    "str ItemNo",
+    "str ItemName",
+    "str Unit",
+    "int GrossWeight",
+    "int LastRestockQty",
+    "Int CurrentQty",
+    "date LastRestockDate",
+    "str Category",
+    "list[] History{ Object Id Purchase }",
+    "list[] Complimentary Items{ 1: ObjectId, 2: ObjectId }"
+]
+
+# Document fields derived from order data (and the safety stock table), updated on every change
+UPDATED_FIELDS = ("itemName", "lastRestockQuantity", "lastRestockDate", "safetyStock", "reorderPoint")
+
+
+def restock_info(items, first, qty, descriptions):
+    # [(item, last_qty, last_date or None, description)] from build_grid output
+    n_items, n_months = qty.shape
+    cell_keys, cell_desc, item_desc = descriptions
+
+    positive = np.nan_to_num(qty) > 0
+    has_restock = positive.any(axis=1)
+    # Last positive month per item: first True scanning from the right
+    last_col = n_months - 1 - np.argmax(positive[:, ::-1], axis=1)
+
+    rows = np.arange(n_items)
+    last_qty = np.where(has_restock, np.nan_to_num(qty[rows, last_col]), 0).astype(np.int64)
+
+    # Description of the last restock cell, '' if that cell had none
+    desc_by_cell = dict(zip(cell_keys.tolist(), cell_desc.tolist()))
+    ordinals = first + last_col
+
+    info = []
+    for i, item in enumerate(items.tolist()):
+        if has_restock[i]:
+            date = f"{ordinals[i] // 12}-{ordinals[i] % 12 + 1:02d}-01"
+            description = str(desc_by_cell.get(i * n_months + last_col[i], '')).strip()
+        else:
+            date = None
+            description = str(item_desc[i]).strip()
+        info.append((item.strip(), int(last_qty[i]), date, description))
+    return info
+
+
+class ItemIdRegistry:
+    # item code → stable "OBJ{n}" id; new items get the next free number
+    def __init__(self, ids=None):
+        self.ids = dict(ids or {})
+        self.next_id = max((int(v[3:]) for v in self.ids.values()), default=0) + 1
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, mode="r", newline="", encoding="utf-8") as f:
+            return cls({row["str ItemNo"]: row["Object Id"] for row in csv.DictReader(f)})
+
+    def get(self, item):
+        if item not in self.ids:
+            self.ids[item] = f"OBJ{self.next_id}"
+            self.next_id += 1
+        return self.ids[item]
+
+
+def item_document(object_id, item, last_qty, last_date, description, stock=None):
+    # stock: {'safetyStock', 'reorderPoint'} for the item (SafetyStock.lookup), if any
+    item_name = f"{item} - {description}" if description else item
+    doc = {
+        "exportId": object_id,
+        "itemNo": item,
+        "itemName": item_name,
+        "unit": "pcs",
+        "grossUnitWeight": 0,
+        "lastRestockQuantity": last_qty,
+        "currentQuantity": 0,
+        "lastRestockDate": last_date,
+        "category": "Uncategorized",
+        "history": [],
+    }
+    if stock:
+        doc.update(stock)
+    return doc
+
+
+def upsert_operation(doc):
+    # Fields derived from order data are updated; the rest are only set on insert
+    # (itemNo comes from the filter on insert). Derived fields the document no longer
+    # has (safetyStock / reorderPoint of an item without a stock row) are unset, so
+    # stale values do not stay in the collection.
+    updated = {key: doc[key] for key in UPDATED_FIELDS if key in doc}
+    inserted = {key: value for key, value in doc.items() if key not in updated and key != "itemNo"}
+    update = {"$set": updated, "$setOnInsert": inserted}
+    removed = {key: "" for key in UPDATED_FIELDS if key not in doc}
+    if removed:
+        update["$unset"] = removed
+    return {"updateOne": {"filter": {"itemNo": doc["itemNo"]}, "update": update, "upsert": True}}
+
+
+def _digest(doc):
+    return hashlib.sha1(json.dumps(doc, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _load_state(state_path):
+    with open(state_path, 'r') as f:
+        state = json.load(f)
+    state.setdefault('pending', {})
+    return state
+
+
+def _save_state(state_path, state):
+    with open(state_path, 'w') as f:
+        json.dump(state, f)
+
+
+def export_changed_items(info, state_path, upsert_path, seed_csv=None, output_csv=None, stock=None):
+    # Appends bulkWrite ops for new/changed items to upsert_path; returns how many.
+    # Their digests stay pending until confirm_applied; until then an item is compared
+    # against its pending (last written) document, so the file never holds a stale op
+    # that a later one does not override (bulkWrite applies them in file order).
+    # output_csv additionally writes the full CSV export with the same ids.
+    # stock: item → {'safetyStock', 'reorderPoint'} to include in the documents
+    stock = stock or {}
+    if os.path.exists(state_path):
+        state = _load_state(state_path)
+        registry = ItemIdRegistry(state['ids'])
+    else:
+        registry = ItemIdRegistry.from_csv(seed_csv) if seed_csv and os.path.exists(seed_csv) else ItemIdRegistry()
+        state = {'digests': {}, 'pending': {}}
+    digests, pending = state['digests'], state['pending']
+
+    # IDs for new items are handed out in item-code order, like addToDB
+    changed = 0
+    with open(upsert_path, 'a', encoding='utf-8') as out:
+        for item, last_qty, last_date, description in sorted(info):
+            doc = item_document(registry.get(item), item, last_qty, last_date, description, stock.get(item))
+            digest = _digest(doc)
+            if pending.get(item, digests.get(item)) == digest:
+                continue
+            pending[item] = digest
+            out.write(json.dumps(upsert_operation(doc)) + '\n')
+            changed += 1
+
+    if output_csv:
+        write_csv(info, output_csv, registry)
+
+    # Ids are kept at once: the written ops already carry them
+    state['ids'] = registry.ids
+    _save_state(state_path, state)
+    return changed
+
+
+def confirm_applied(state_path, upsert_path):
+    # Call once every op in upsert_path went through Item.bulkWrite(): the pending
+    # digests become the applied ones and the file is removed. Returns how many items.
+    state = _load_state(state_path)
+    confirmed = len(state['pending'])
+    state['digests'].update(state['pending'])
+    state['pending'] = {}
+    _save_state(state_path, state)
+    if os.path.exists(upsert_path):
+        os.remove(upsert_path)
+    return confirmed
+
+
+def export_items(orders, state_path, upsert_path, seed_csv=None, output_csv=None, stock_dir=None):
+    # orders: parsed order lines (dense_grid.read_orders) or OrderAggregate.to_frame().
+    # stock_dir: saved safety stock table (safety_stock.build_safety_stock) to join
+    info = restock_info(*build_grid(orders, gap_months='zero'))
+    stock = None
+    if stock_dir:
+        from safety_stock import SafetyStock
+        stock = SafetyStock.load(stock_dir).lookup([row[0] for row in info])
+    return export_changed_items(info, state_path, upsert_path, seed_csv, output_csv, stock)
+
+
+def write_csv(info, output_csv, registry):
+    # Full export in the addToDB / output_items2.csv format, with stable ids
+    with open(output_csv, mode="w", newline="", encoding="utf-8") as out:
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDNAMES)
+        writer.writeheader()
+
+        for item, last_qty, last_date, description in sorted(info):
+            item_name = f"{item} - {description}" if description else item
+            writer.writerow({
+                "Object Id": registry.get(item),
+                "str ItemNo": item,
+                "str ItemName": item_name,
+                "str Unit": "pcs",
+                "int GrossWeight": 0,
+                "int LastRestockQty": last_qty,
+                "Int CurrentQty": 0,
+                "date LastRestockDate": last_date or "N/A",
+                "str Category": "Uncategorized",
+                "list[] History{ Object Id Purchase }": "[]",
+                "list[] Complimentary Items{ 1: ObjectId, 2: ObjectId }": "{}"
+            })
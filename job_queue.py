@@ -0,0 +1,325 @@
+"""
+Background runner for the long pipeline jobs (Prophet training, holdout
+evaluation, chart rendering, ...), so the web app can start them and poll
+instead of holding a request open.
+
+Like forecast_server.py it is a long-lived process speaking JSON lines on
+stdin/stdout. An asyncio loop takes requests while jobs run on a process
+pool (one job at a time by default; the jobs parallelize over items
+themselves).
+
+Requests:
+    {"id": 1, "op": "submit", "job": "prophet", "params": {"workers": 4}}
+    {"id": 2, "op": "status", "job_id": "prophet-3f9c2a1b7d40-1718000000-1"}
+    {"id": 3, "op": "list"}
+
+Responses:
+    {"id": 1, "job": {...}}     the job record (also written to jobs/<job_id>.json)
+    {"id": 3, "jobs": [...]}
+    {"id": 2, "error": "..."}
+
+Only the params listed in PARAMS for a job are accepted (scalars such as
+workers, timeout, horizon); input and output paths are fixed to the
+functions' defaults in the data directory, so a client cannot point a job at
+other files. Anything else is rejected with an error.
+
+A job record has job_id, job, params, status (queued / running / done /
+failed), submitted / started / finished timestamps, progress
+{"done", "total", "item"} from the job's per-item loop, and result or
+error. A submit identical (same job and params) to one that is still queued
+or running returns that job, flagged "deduplicated", instead of starting a
+second run.
+
+Status files are kept in the jobs directory, so finished jobs can still be
+looked up after a restart. Job ids are <job>-<params digest>-<time>-<n>; a
+status request for anything not of that form is rejected as an unknown job,
+so a job id can never name a file outside the jobs directory.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import hashlib
+import importlib
+import json
+import os
+import re
+import sys
+import time
+
+# Job name → (module, function); params are passed as keyword arguments and
+# paths are relative to the working directory (the data directory)
+JOBS = {
+    'prophet': ('parallel_training', 'train_prophet_parallel'),        # prophetModel
+    'prophet_holdout': ('parallel_training', 'holdout_prophet_parallel'),  # trainSplit
+    'plot_forecasts': ('parallel_training', 'plot_forecasts'),
+    'item_charts': ('chart_render', 'render_item_charts'),              # plotForAtItem2
+    'classical': ('classical_models', 'forecast_catalog'),
+    'routed': ('demand_classes', 'forecast_routed'),
+    'backtest': ('backtest', 'run_backtest'),
+    'summary_stats': ('generate_summary_stats', 'generate_summary_stats'),
+    'safety_stock': ('safety_stock', 'build_safety_stock'),
+}
+
+
+# === Allowed params ===
+
+def _count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _seconds(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def _flag(value):
+    return isinstance(value, bool)
+
+
+def _fraction(value):
+    return _seconds(value) and value < 1
+
+
+def _month(value):
+    return isinstance(value, str) and re.fullmatch(r'\d{4}-(0[1-9]|1[0-2])', value) is not None
+
+
+def _choice(*values):
+    return lambda value: isinstance(value, str) and value in values
+
+
+def _choices(*values):
+    return lambda value: isinstance(value, list) and bool(value) and all(v in values for v in value)
+
+
+CLASSICAL_MODELS = ('seasonal_naive', 'holt_winters', 'croston', 'tsb')
+
+# Job name → {param: check}; params not listed here (paths above all) cannot be set by clients
+PARAMS = {
+    'prophet': {'workers': _count, 'timeout': _seconds, 'periods': _count},
+    'prophet_holdout': {'workers': _count, 'timeout': _seconds, 'test_months': _count},
+    'plot_forecasts': {'workers': _count},
+    'item_charts': {'workers': _count, 'force': _flag},
+    'classical': {'model': _choice(*CLASSICAL_MODELS), 'periods': _count},
+    'routed': {'workers': _count, 'timeout': _seconds, 'periods': _count, 'inactive_months': _count},
+    'backtest': {'backends': _choices('summary', 'prophet', *CLASSICAL_MODELS), 'folds': _count,
+                 'horizon': _count, 'min_train': _count, 'workers': _count, 'timeout': _seconds},
+    'summary_stats': {'include_stats': _flag},
+    'safety_stock': {'forecast_month': _month, 'horizon': _count, 'lead_time': _count,
+                     'service_level': _fraction, 'coverage': _fraction, 'method': _choice('normal', 'empirical')},
+}
+
+
+def check_params(job, params):
+    # Raises ValueError for a param the job does not allow or a bad value
+    if not isinstance(params, dict):
+        raise ValueError("params must be an object")
+    allowed = PARAMS[job]
+    unknown = sorted(set(params) - set(allowed))
+    if unknown:
+        raise ValueError(f"Job {job!r} does not take {', '.join(unknown)}; allowed: {', '.join(allowed) or 'none'}")
+    for name, value in params.items():
+        if not allowed[name](value):
+            raise ValueError(f"Invalid value for {name}: {value!r}")
+
+
+ACTIVE = ('queued', 'running')
+JOB_ID = re.compile(r'(%s)-[0-9a-f]{12}-\d+-\d+' % '|'.join(map(re.escape, JOBS)))
+PROGRESS_INTERVAL = 0.5  # seconds between progress file writes
+
+
+def _now():
+    return time.strftime('%Y-%m-%dT%H:%M:%S')
+
+
+def _write_json(path, data):
+    # Atomic replace, so pollers never read a half-written file
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, default=str)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def job_key(job, params):
+    # Identical job + params → same key, whatever the param order
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f'{job}-{digest[:12]}'
+
+
+# === Worker side (runs in the pool process) ===
+
+def _run_job(job, params, progress_path):
+    from instrumentation import on_progress
+
+    # The progress file appearing is what marks the job as running
+    started = _now()
+    _write_json(progress_path, {'started': started, 'done': 0, 'total': None, 'item': None})
+    last_write = [0.0]
+
+    def report(done, total, item):
+        now = time.monotonic()
+        if done == total or now - last_write[0] >= PROGRESS_INTERVAL:
+            _write_json(progress_path, {'started': started, 'done': done, 'total': total, 'item': item})
+            last_write[0] = now
+
+    check_params(job, params)
+    module, function = JOBS[job]
+    on_progress(report)
+    try:
+        result = getattr(importlib.import_module(module), function)(**params)
+    finally:
+        on_progress(None)
+    # Results only need to be JSON-able; large ones (manifests) are cut down to their counts
+    if isinstance(result, dict) and 'counts' in result:
+        result = {'counts': result['counts']}
+    return json.loads(json.dumps(result, default=str))
+
+
+# === Front end ===
+
+class JobQueue:
+    def __init__(self, jobs_dir='jobs', workers=1):
+        self.jobs_dir = jobs_dir
+        os.makedirs(jobs_dir, exist_ok=True)
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+        self.jobs = {}     # job_id → record
+        self.active = {}   # job key → job_id, for queued and running jobs
+        self.counter = 0
+
+    def _status_path(self, job_id):
+        return os.path.join(self.jobs_dir, f'{job_id}.json')
+
+    def _progress_path(self, job_id):
+        return os.path.join(self.jobs_dir, f'{job_id}.progress.json')
+
+    def _save(self, record):
+        _write_json(self._status_path(record['job_id']), record)
+
+    def submit(self, job, params=None):
+        if job not in JOBS:
+            raise ValueError(f"Unknown job {job!r}; expected one of {', '.join(JOBS)}")
+        params = params or {}
+        check_params(job, params)
+        key = job_key(job, params)
+
+        if key in self.active:
+            return dict(self.status(self.active[key]), deduplicated=True)
+
+        self.counter += 1
+        job_id = f'{key}-{int(time.time())}-{self.counter}'
+        record = {'job_id': job_id, 'job': job, 'params': params, 'status': 'queued', 'submitted': _now()}
+        self.jobs[job_id] = record
+        self.active[key] = job_id
+        self._save(record)
+        asyncio.get_running_loop().create_task(self._run(key, record))
+        return dict(record)
+
+    def _refresh(self, record):
+        # Pick up the worker's progress file: started (queued → running) and per-item progress
+        progress = _read_json(self._progress_path(record['job_id']))
+        if progress is None:
+            return
+        record['started'] = progress.pop('started', None)
+        record['progress'] = progress
+        if record['status'] == 'queued':
+            record['status'] = 'running'
+            self._save(record)
+
+    async def _run(self, key, record):
+        loop = asyncio.get_running_loop()
+        try:
+            record['result'] = await loop.run_in_executor(self.pool, _run_job, record['job'], record['params'],
+                                                          self._progress_path(record['job_id']))
+            record['status'] = 'done'
+        except Exception as e:
+            record['status'] = 'failed'
+            record['error'] = f'{type(e).__name__}: {e}'
+        finally:
+            self._refresh(record)
+            record['finished'] = _now()
+            self.active.pop(key, None)
+            self._save(record)
+
+    def status(self, job_id):
+        if not isinstance(job_id, str) or not JOB_ID.fullmatch(job_id):
+            raise KeyError(f"Unknown job {job_id!r}")
+        record = self.jobs.get(job_id)
+        if record is None:
+            # A job from an earlier run of the queue
+            record = _read_json(self._status_path(job_id))
+            if record is None:
+                raise KeyError(f"Unknown job {job_id!r}")
+        elif record['status'] in ACTIVE:
+            self._refresh(record)
+        return dict(record)
+
+    def list(self):
+        return [self.status(job_id) for job_id in self.jobs]
+
+    def handle(self, request):
+        op = request.get('op', 'status')
+        if op == 'submit':
+            return {'job': self.submit(request['job'], request.get('params'))}
+        if op == 'status':
+            return {'job': self.status(request['job_id'])}
+        if op == 'list':
+            return {'jobs': self.list()}
+        raise ValueError(f"Unknown op {op!r}")
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+
+async def serve(queue, stdin=sys.stdin, stdout=sys.stdout):
+    loop = asyncio.get_running_loop()
+    while True:
+        # Blocking readline on a thread, so running jobs keep being tracked meanwhile
+        line = await loop.run_in_executor(None, stdin.readline)
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            response = queue.handle(request)
+        except Exception as e:
+            response = {'error': str(e)}
+
+        stdout.write(json.dumps(dict(response, id=request_id), default=str) + '\n')
+        stdout.flush()
+
+    # stdin closed: let running and queued jobs finish
+    pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+def main():
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description='Run pipeline jobs in the background, answering JSON lines.')
+    parser.add_argument('--workdir', default=current_dir, help="data directory the jobs run in")
+    parser.add_argument('--jobs-dir', default='jobs')
+    parser.add_argument('--workers', type=int, default=1, help="jobs run at the same time")
+    args = parser.parse_args()
+
+    os.chdir(args.workdir)
+    queue = JobQueue(args.jobs_dir, args.workers)
+    try:
+        asyncio.run(serve(queue))
+    finally:
+        queue.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,14 @@
 import { model, Schema, SchemaTypes } from 'mongoose'
 
 const ItemSchema = new Schema({
+  // Stable "OBJ{n}" id from the item export (item_export.py); sparse, as items
+  // created in the app have none
+  exportId: {
+    type: SchemaTypes.String,
+    unique: true,
+    sparse: true,
+    index: true,
+  },
   itemNo: {
     type: SchemaTypes.String,
     required: true,
@@ -30,6 +38,12 @@ const ItemSchema = new Schema({
   lastRestockDate: {
     type: SchemaTypes.Date,
   },
+  safetyStock: {
+    type: SchemaTypes.Number,
+  },
+  reorderPoint: {
+    type: SchemaTypes.Number,
+  },
   category: {
     type: SchemaTypes.String,
     required: true,
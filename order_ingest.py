@@ -0,0 +1,147 @@
+"""
+Chunked, incremental ingestion of raw order CSVs (orders2.csv and later files).
+
+Order files are read in chunks and folded into running per-(item, month)
+totals, so memory is bounded by the number of distinct item-months rather
+than by the number of order lines. Ship_Date strings go through a parse
+cache: each distinct string is parsed once with the same mixed-format rules
+as addZeros, and later occurrences are dictionary lookups.
+
+The aggregate can be saved and reloaded. Files that were already ingested
+(same path, size and mtime) are skipped, so new order files can be appended
+without rescanning the old ones.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+ORDER_COLUMNS = ['Ship_Date', 'Item_Code', 'Description', 'Order_Qty']
+
+
+class DateParseCache:
+    # Ship_Date string → month ordinal (year * 12 + month - 1), -1 if unparseable
+    def __init__(self):
+        self.ordinals = {}
+
+    def lookup(self, values):
+        inverse, uniques = pd.factorize(values, use_na_sentinel=True)
+        missing = [u for u in uniques if u not in self.ordinals]
+        if missing:
+            parsed = pd.to_datetime(pd.Series(missing), format='mixed', errors='coerce')
+            ordinals = np.where(parsed.isna(), -1, parsed.dt.year.fillna(0) * 12 + parsed.dt.month.fillna(1) - 1)
+            self.ordinals.update(zip(missing, ordinals.astype(np.int64).tolist()))
+
+        lookup = np.array([self.ordinals[u] for u in uniques] + [-1], dtype=np.int64)
+        # NaN Ship_Date rows have inverse == -1, which picks the trailing -1
+        return lookup[inverse]
+
+
+class OrderAggregate:
+    def __init__(self):
+        self.totals = {}        # (item, ordinal) → total Order_Qty
+        self.descriptions = {}  # (item, ordinal) → first non-null Description
+        self.files = {}         # path → {'size': ..., 'mtime': ..., 'rows': ...}
+        self.dates = DateParseCache()
+
+    # === Ingestion ===
+
+    def ingest_file(self, path, chunksize=100_000):
+        # Returns the number of order lines read, 0 if the file was already ingested
+        key = os.path.abspath(path)
+        stat = os.stat(path)
+        seen = self.files.get(key)
+        if seen is not None:
+            if seen['size'] == stat.st_size and seen['mtime'] == stat.st_mtime:
+                return 0
+            raise ValueError(f"{path} changed since it was ingested; rebuild the aggregate from scratch")
+
+        rows = 0
+        for chunk in pd.read_csv(path, usecols=ORDER_COLUMNS, chunksize=chunksize):
+            rows += len(chunk)
+            self.ingest_chunk(chunk)
+
+        self.files[key] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'rows': rows}
+        return rows
+
+    def ingest_chunk(self, chunk):
+        ordinals = self.dates.lookup(chunk['Ship_Date'])
+        valid = ordinals >= 0
+        chunk = pd.DataFrame({
+            'Item_Code': chunk['Item_Code'].to_numpy()[valid],
+            'ordinal': ordinals[valid],
+            'Order_Qty': chunk['Order_Qty'].to_numpy(dtype=float)[valid],
+            'Description': chunk['Description'].to_numpy(dtype=object)[valid],
+        })
+
+        grouped = chunk.groupby(['Item_Code', 'ordinal'], sort=False).agg(
+            Order_Qty=('Order_Qty', 'sum'), Description=('Description', 'first'))
+
+        totals = self.totals
+        descriptions = self.descriptions
+        for key, qty, desc in zip(grouped.index, grouped['Order_Qty'].tolist(), grouped['Description'].tolist()):
+            totals[key] = totals.get(key, 0.0) + qty
+            if key not in descriptions and isinstance(desc, str):
+                descriptions[key] = desc
+
+    # === Queries ===
+
+    def months(self):
+        return sorted({ordinal for _, ordinal in self.totals})
+
+    def missing_months(self):
+        # Months between the first and last with no order lines at all, as 'YYYY-MM'
+        present = self.months()
+        if not present:
+            return []
+        gaps = sorted(set(range(present[0], present[-1] + 1)) - set(present))
+        return [f"{o // 12}-{o % 12 + 1:02d}" for o in gaps]
+
+    def to_frame(self):
+        # One pseudo order line per item-month (dated the 1st), ready for dense_grid.build_grid
+        keys = list(self.totals)
+        ordinals = np.array([o for _, o in keys], dtype=np.int64)
+        return pd.DataFrame({
+            'Ship_Date': pd.to_datetime(pd.DataFrame({'year': ordinals // 12, 'month': ordinals % 12 + 1, 'day': 1})),
+            'Item_Code': [item for item, _ in keys],
+            'Description': [self.descriptions.get(k) for k in keys],
+            'Order_Qty': list(self.totals.values()),
+        }, columns=ORDER_COLUMNS)
+
+    # === Persistence ===
+
+    def save(self, path):
+        state = {
+            'files': self.files,
+            'dates': self.dates.ordinals,
+            'totals': [[item, ordinal, qty, self.descriptions.get((item, ordinal))]
+                       for (item, ordinal), qty in self.totals.items()],
+        }
+        with open(path, 'w') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path):
+        aggregate = cls()
+        if not os.path.exists(path):
+            return aggregate
+        with open(path, 'r') as f:
+            state = json.load(f)
+        aggregate.files = state['files']
+        aggregate.dates.ordinals = state['dates']
+        for item, ordinal, qty, desc in state['totals']:
+            aggregate.totals[(item, ordinal)] = qty
+            if desc is not None:
+                aggregate.descriptions[(item, ordinal)] = desc
+        return aggregate
+
+
+def ingest_orders(order_files, state_path=None, chunksize=100_000):
+    # Fold order files into the saved aggregate (if any) and save it back
+    aggregate = OrderAggregate.load(state_path) if state_path else OrderAggregate()
+    for path in order_files:
+        aggregate.ingest_file(path, chunksize)
+    if state_path:
+        aggregate.save(state_path)
+    return aggregate
@@ -0,0 +1,375 @@
+"""
+Parallel Prophet training for prophetModel and trainSplit.
+
+The item × month grid is split into per-item series once in the parent; each
+worker only receives (item, dates, quantities) arrays, never the full
+DataFrame. Items are scheduled in chunks over a process pool, each fit can be
+given a timeout (a worker whose fit overruns is killed together with its Stan
+child and replaced), and every item's outcome (ok / failed / timeout) is
+written to a manifest. Forecasts go to one ForecastStore (forecast_store.py), with the old
+per-item CSVs only as an export option. Plotting is a separate stage
+(plot_forecasts) that reads the saved forecasts, so it never holds up fitting.
+
+With a cache_dir, items whose input fingerprint is unchanged since the last
+run reuse their cached forecast instead of being refit, and items that only
+gained months without orders reuse their cached model, which just predicts
+over the new horizon (see forecast_cache.py).
+"""
+import json
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+import pandas as pd
+
+from forecast_cache import ForecastCache, fingerprint, orders_fingerprint
+from dense_grid import read_grid_frame
+from forecast_store import ForecastStore
+from instrumentation import progress
+
+MANIFEST_NAME = 'manifest.json'
+STORE_NAME = 'forecasts.sqlite'
+HOLDOUT_MANIFEST_NAME = 'holdout_manifest.json'
+
+
+def extract_series(df, min_points=6):
+    # [(item, ds, y)] with missing months dropped, skipping short histories
+    df = df.dropna(subset=['Order_Qty']).sort_values(['Item_Code', 'YearMonth'], kind='stable')
+
+    series = []
+    for item, group in df.groupby('Item_Code', sort=False, observed=True):
+        if len(group) < min_points:
+            continue
+        series.append((item, group['YearMonth'].to_numpy(), group['Order_Qty'].to_numpy(dtype=float)))
+    return series
+
+
+def _fit_model(ds, y, periods):
+    from prophet import Prophet
+
+    model = Prophet()
+    model.fit(pd.DataFrame({'ds': ds, 'y': y}))
+    future = model.make_future_dataframe(periods=periods, freq='MS')
+    return model, model.predict(future)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
+
+def _fit_forecast(ds, y, periods):
+    return _fit_model(ds, y, periods)[1]
+
+
+def _predict_saved(model_json, ds, periods):
+    # A cached fit's forecast over this history plus periods months, the dates
+    # make_future_dataframe would give for a model fit on ds
+    from prophet.serialize import model_from_json
+
+    model = model_from_json(model_json)
+    last = pd.Timestamp(ds[-1])
+    future = pd.date_range(start=last, periods=periods + 1, freq='MS')
+    future = future[future > last][:periods]
+    dates = pd.DataFrame({'ds': pd.concat([pd.Series(pd.to_datetime(ds)), pd.Series(future)], ignore_index=True)})
+    return model.predict(dates)[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+
+
+def _forecast_task(task):
+    # model_json: cached fit to predict from instead of fitting; keep_model: hand the
+    # serialized fit back for the cache
+    item, ds, y, periods, output_dir, save_model, keep_model, model_json = task
+    start = time.perf_counter()
+    entry = {'status': 'ok'}
+
+    try:
+        if model_json is not None:
+            # Handed back to the parent, which is the only writer of the store
+            entry = {'status': 'reused', 'forecast': _predict_saved(model_json, ds, periods)}
+        else:
+            model, forecast = _fit_model(ds, y, periods)
+            entry['forecast'] = forecast
+
+            if save_model or keep_model:
+                from prophet.serialize import model_to_json
+                model_json = model_to_json(model)
+            if keep_model:
+                entry['model_json'] = model_json
+            if save_model:
+                model_path = os.path.join(output_dir, f'{item}_model.json')
+                with open(model_path, 'w') as f:
+                    f.write(model_json)
+                entry['model'] = model_path
+    except Exception as e:
+        entry = {'status': 'failed', 'error': str(e)}
+
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return item, entry
+
+
+def _holdout_task(task):
+    item, ds, y, test_months = task
+    start = time.perf_counter()
+
+    try:
+        train_ds, train_y = ds[:-test_months], y[:-test_months]
+        test = pd.DataFrame({'ds': ds[-test_months:], 'y': y[-test_months:]}).set_index('ds')
+
+        forecast = _fit_forecast(train_ds, train_y, test_months)
+        merged = test.join(forecast[['ds', 'yhat']].set_index('ds'), how='left').dropna()
+        if merged.empty:
+            entry = {'status': 'failed', 'error': 'no overlap between forecast and test months'}
+        else:
+            mae = float(np.mean(np.abs(merged['y'] - merged['yhat'])))
+            total_actual = merged['y'].sum()
+            percentage_error = (mae / total_actual * 100) if total_actual > 0 else np.nan
+            entry = {'status': 'ok', 'mae': round(mae, 2), 'percentage_error': round(percentage_error, 2)}
+    except Exception as e:
+        entry = {'status': 'failed', 'error': str(e)}
+
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return item, entry
+
+
+def _timed_worker(fn, conn):
+    # Long-lived worker for _run_timed: runs the chunks it is sent, one result per task,
+    # until it gets None. Its own process group, so a timeout kills it together with
+    # the Stan process of the fit it is running.
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    while True:
+        chunk = conn.recv()
+        if chunk is None:
+            break
+        for task in chunk:
+            conn.send(fn(task))
+    conn.close()
+
+
+def _start_worker(fn):
+    conn, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_timed_worker, args=(fn, child), daemon=True)
+    process.start()
+    child.close()
+    return process, conn
+
+
+def _kill(process):
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # not yet in its own group
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+
+def _run_timed(fn, tasks, workers, chunksize, timeout):
+    # Chunks over up to `workers` long-lived processes, like the pool. A worker whose
+    # current task runs past timeout seconds is killed with its process group
+    # (cmdstan included) and replaced; the rest of its chunk is queued again.
+    # The first element of each task is its key.
+    chunks = [tasks[i:i + chunksize] for i in range(0, len(tasks), chunksize)][::-1]
+    idle = []     # (process, conn)
+    running = {}  # conn → [process, tasks of the chunk not yet done, start of the current one]
+
+    try:
+        while chunks or running:
+            while chunks and (idle or len(running) < workers):
+                process, conn = idle.pop() if idle else _start_worker(fn)
+                chunk = chunks.pop()
+                conn.send(chunk)
+                running[conn] = [process, list(chunk), time.monotonic()]
+
+            deadline = min(started for _, _, started in running.values()) + timeout
+            for conn in wait(list(running), max(deadline - time.monotonic(), 0)):
+                process, remaining, _ = state = running[conn]
+                try:
+                    result = conn.recv()
+                except EOFError:
+                    # The worker died mid-task: that task fails, the rest of the chunk is requeued
+                    del running[conn]
+                    conn.close()
+                    _kill(process)
+                    if remaining[1:]:
+                        chunks.append(remaining[1:])
+                    yield remaining[0][0], {'status': 'failed', 'error': 'fit process died'}
+                    continue
+                remaining.pop(0)
+                state[2] = time.monotonic()
+                if not remaining:
+                    del running[conn]
+                    idle.append((process, conn))
+                yield result
+
+            now = time.monotonic()
+            for conn, (process, remaining, started) in list(running.items()):
+                if now - started >= timeout:
+                    del running[conn]
+                    conn.close()
+                    _kill(process)
+                    if remaining[1:]:
+                        chunks.append(remaining[1:])
+                    yield remaining[0][0], {'status': 'timeout', 'error': f'exceeded {timeout}s',
+                                            'seconds': round(now - started, 3)}
+    finally:
+        for process, conn in idle:
+            conn.send(None)
+            conn.close()
+            process.join()
+        for conn, (process, _, _) in running.items():
+            conn.close()
+            _kill(process)
+
+
+def _run_pool(fn, tasks, workers, chunksize, timeout=None):
+    # Yields (key, entry) as tasks finish, in completion order. With a timeout the
+    # chunks run on workers that can be killed when a fit overruns (_run_timed).
+    if timeout:
+        yield from _run_timed(fn, tasks, workers, chunksize, timeout)
+        return
+
+    if workers == 1:
+        for task in tasks:
+            yield fn(task)
+        return
+
+    with multiprocessing.Pool(processes=workers) as pool:
+        yield from pool.imap_unordered(fn, tasks, chunksize=chunksize)
+
+
+def _write_manifest(path, config, entries):
+    manifest = {
+        'config': config,
+        'counts': {status: sum(1 for e in entries.values() if e['status'] == status)
+                   for status in ('ok', 'cached', 'reused', 'failed', 'timeout')},
+        'items': entries,
+    }
+    with open(path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def train_prophet_parallel(input_file='final_output_with_nan.csv', output_dir='prophet_forecasts_all_items',
+                           periods=12, workers=None, chunksize=4, timeout=None, min_points=6,
+                           cache_dir=None, cache_max_entries=None, cache_max_bytes=None,
+                           save_models=False, export_csv=False, items=None):
+    os.makedirs(output_dir, exist_ok=True)
+    store_path = os.path.join(output_dir, STORE_NAME)
+
+    df = read_grid_frame(input_file)
+    if items is not None:
+        # Only these items (e.g. the ones demand_classes routes to Prophet)
+        df = df[df['Item_Code'].isin(items)]
+
+    workers = workers or os.cpu_count()
+    cache = ForecastCache(cache_dir, cache_max_entries, cache_max_bytes) if cache_dir else None
+    model_config = {'model': 'prophet', 'periods': periods}
+
+    # === Reuse cached forecasts for unchanged items and cached fits for items that
+    # only gained months without orders, queue the rest ===
+    store = ForecastStore(store_path)
+    entries = {}
+    keys = {}
+    model_keys = {}
+    tasks = []
+    for item, ds, y in extract_series(df, min_points):
+        model_json = None
+        if cache is not None:
+            key = fingerprint(ds, y, model_config)
+            cached = cache.get(key)
+            if cached is not None:
+                store.write(item, cached)
+                entries[item] = {'status': 'cached', 'seconds': 0.0}
+                continue
+            keys[item] = key
+            model_keys[item] = orders_fingerprint(ds, y, model_config)
+            if model_keys[item] is not None:
+                model_json = cache.get_model(model_keys[item])
+        tasks.append((item, ds, y, periods, output_dir, save_models, cache is not None, model_json))
+
+    total = len(entries) + len(tasks)
+    for item, entry in _run_pool(_forecast_task, tasks, workers, chunksize, timeout):
+        forecast = entry.pop('forecast', None)
+        model_json = entry.pop('model_json', None)
+        entries[item] = entry
+        progress(len(entries), total, item)
+        if forecast is not None:
+            store.write(item, forecast)
+            if cache is not None:
+                cache.put(keys[item], item, forecast)
+                if model_json is not None and model_keys[item] is not None:
+                    cache.put_model(model_keys[item], item, model_json)
+
+    if export_csv:
+        store.export_csv(output_dir)
+    store.close()
+
+    config = {'input_file': input_file, 'store': store_path, 'periods': periods, 'workers': workers,
+              'chunksize': chunksize, 'timeout': timeout, 'min_points': min_points}
+    if cache is not None:
+        cache.save()
+        config['cache'] = cache.stats()
+    return _write_manifest(os.path.join(output_dir, MANIFEST_NAME), config, entries)
+
+
+def holdout_prophet_parallel(input_file='final_output_with_nan.csv', output_csv='forecast_error_summary.csv',
+                             test_months=12, min_points=24, workers=None, chunksize=4, timeout=None):
+    # Parallel version of trainSplit: same split, metrics and output CSV, plus a manifest
+    df = read_grid_frame(input_file)
+
+    workers = workers or os.cpu_count()
+    tasks = [(item, ds, y, test_months) for item, ds, y in extract_series(df, min_points)]
+
+    entries = {}
+    for item, entry in _run_pool(_holdout_task, tasks, workers, chunksize, timeout):
+        entries[item] = entry
+        progress(len(entries), len(tasks), item)
+
+    results = [(item, e['mae'], e['percentage_error']) for item, e in entries.items() if e['status'] == 'ok']
+    results_df = pd.DataFrame(results, columns=['Item_Code', 'MAE', 'Percentage_Error'])
+    results_df = results_df.sort_values(by='Percentage_Error')
+    results_df.to_csv(output_csv, index=False)
+
+    config = {'input_file': input_file, 'test_months': test_months, 'workers': workers,
+              'chunksize': chunksize, 'timeout': timeout, 'min_points': min_points}
+    manifest_path = os.path.join(os.path.dirname(os.path.abspath(output_csv)), HOLDOUT_MANIFEST_NAME)
+    return _write_manifest(manifest_path, config, entries)
+
+
+# === Plotting stage ===
+
+def _plot_task(task):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    item, ds, y, forecast, output_dir = task
+
+    # Same elements as Prophet's model.plot: history points, forecast line, interval band
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.plot(ds, y, 'k.')
+    ax.plot(forecast['ds'], forecast['yhat'], ls='-', c='#0072B2')
+    ax.fill_between(forecast['ds'], forecast['yhat_lower'], forecast['yhat_upper'], color='#0072B2', alpha=0.2)
+    ax.grid(True, which='major', c='gray', ls='-', lw=1, alpha=0.2)
+    ax.set_title(f"Forecast for {item}")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Order Quantity")
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, f"{item}_forecast_plot.png"))
+    plt.close(fig)
+    return item, {'status': 'ok'}
+
+
+def plot_forecasts(input_file='final_output_with_nan.csv', output_dir='prophet_forecasts_all_items',
+                   workers=None, chunksize=8):
+    df = read_grid_frame(input_file)
+
+    # One read of the store, split per item in the parent
+    with ForecastStore(os.path.join(output_dir, STORE_NAME)) as store:
+        forecasts = {item: group for item, group in store.all().groupby('item', sort=False)}
+
+    tasks = [(item, ds, y, forecasts[item], output_dir)
+             for item, ds, y in extract_series(df, min_points=1) if item in forecasts]
+
+    for done, (item, _) in enumerate(_run_pool(_plot_task, tasks, workers or os.cpu_count(), chunksize), 1):
+        progress(done, len(tasks), item)
@@ -1,17 +1,25 @@
 import json
 import os
-from generate_summary_stats import predict_next_month_quantities
+from instrumentation import profile_run, stage, startup
 
-try:
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    summary_path = os.path.join(current_dir, 'item_summary_stats_updated.json')
+startup()
 
-    predictions = predict_next_month_quantities(summary_path, forecast_month='2025-04')
+with stage('import'):
+    from generate_summary_stats import predict_next_month_quantities
 
-    result = [{"item_code": item, "predicted_qty": qty} for item, qty in predictions[:100]]
+with profile_run(), stage('predict_runner'):
+    try:
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        summary_path = os.path.join(current_dir, 'item_summary_stats_updated.json')
 
-    # ✅ ONLY THIS should be printed to stdout
-    print(json.dumps(result))
+        predictions = predict_next_month_quantities(summary_path, forecast_month='2025-04')
 
-except Exception as e:
-    print(json.dumps({"error": str(e)}))
+        with stage('serialize'):
+            result = [{"item_code": item, "predicted_qty": qty} for item, qty in predictions[:100]]
+            output = json.dumps(result)
+
+        # ✅ ONLY THIS should be printed to stdout
+        print(output)
+
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
@@ -0,0 +1,211 @@
+"""
+Maintained top-N index over the item × month quantities.
+
+plotForAtItem3 used to read the whole grid, group it to per-item totals for
+nlargest and pivot the top items; create_synthetic_march_orders sorted every
+summary for its top 30. The index keeps, next to the items × months matrix,
+
+  totals        cumulative quantity per item
+  month_totals  total quantity per month
+  order         item rows sorted by total (descending, ties by item code)
+
+and updates them as months are ingested: only the items whose total changed
+are taken out of `order` and merged back in by binary search (a full sort
+only when most items changed). Top-N overall is then a slice of `order`;
+top-N over a window of months sums just those matrix columns; and the heatmap
+gets its item × month slice by row, from a memory-mapped matrix, without
+reading the rest of the data.
+
+Saved as a directory of .npy files plus meta.json. The meta records the size
+and modification time of the grid the index was built from; open_index
+rebuilds when the grid has been regenerated since.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from summary_table import rank
+
+ARRAYS = ('codes', 'qty', 'totals', 'month_totals', 'order')
+
+
+def _ordinal(month):
+    month = pd.Timestamp(month)
+    return month.year * 12 + month.month - 1
+
+
+def source_stamp(path):
+    # Size and modification time of a grid CSV, or of every file in a .grid directory
+    files = [path] if os.path.isfile(path) else [os.path.join(path, name) for name in sorted(os.listdir(path))]
+    stats = [os.stat(name) for name in files]
+    return {'size': sum(st.st_size for st in stats), 'mtime_ns': max(st.st_mtime_ns for st in stats)}
+
+
+def _month_start(ordinal):
+    return pd.Timestamp(year=int(ordinal // 12), month=int(ordinal % 12 + 1), day=1)
+
+
+class RankingIndex:
+    def __init__(self, codes, first, qty, totals=None, month_totals=None, order=None):
+        self.codes = np.asarray(codes, dtype=str)   # sorted item codes, row = position
+        self.first = int(first)                     # ordinal of the first month column
+        self.qty = qty                              # items × months, NaN where missing
+        self.totals = np.nansum(qty, axis=1) if totals is None else totals
+        self.month_totals = np.nansum(qty, axis=0) if month_totals is None else month_totals
+        self.order = self._sorted(np.arange(len(self.codes))) if order is None else order
+        self.source = None                          # source_stamp of the grid it was built from
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_grid(cls, items, first, qty):
+        # read_grid_matrix output (items sorted)
+        return cls(items, first, np.asarray(qty, dtype=float))
+
+    @property
+    def months(self):
+        return self.qty.shape[1]
+
+    # === Maintenance ===
+
+    def _sorted(self, rows):
+        # rows by total descending, ties by row (= item code order, like nlargest on the grouped sum)
+        return rows[np.lexsort((rows, -self.totals[rows]))]
+
+    def _rerank(self, changed):
+        if len(changed) * 8 > len(self.order):
+            self.order = self._sorted(np.arange(len(self.codes)))
+            return
+        keep = self.order[~np.isin(self.order, changed)]
+        moved = self._sorted(changed)
+        # Complex keys compare lexicographically (real, then imaginary): (-total, row)
+        at = np.searchsorted(-self.totals[keep] + 1j * keep, -self.totals[moved] + 1j * moved)
+        self.order = np.insert(keep, at, moved)
+
+    def _add_items(self, codes):
+        # Rows for new item codes; rows stay in code order, so existing row numbers shift
+        codes = np.union1d(self.codes, codes)
+        at = np.searchsorted(codes, self.codes)
+        qty = np.full((len(codes), self.months), np.nan)
+        qty[at] = self.qty
+        totals = np.zeros(len(codes))
+        totals[at] = self.totals
+        self.codes, self.qty, self.totals = codes, qty, totals
+        self.order = self._sorted(np.arange(len(codes)))
+
+    def ingest_month(self, items, month, qty):
+        # Add one month's quantities (several lines per item are summed; NaN quantities skipped)
+        items = np.asarray(items, dtype=str)
+        qty = np.asarray(qty, dtype=float)
+        present = ~np.isnan(qty)
+        items, qty = items[present], qty[present]
+
+        if isinstance(self.qty, np.memmap):
+            self.qty = np.array(self.qty)
+        unknown = np.setdiff1d(items, self.codes)
+        if len(unknown):
+            self._add_items(unknown)
+
+        col = _ordinal(month) - self.first
+        if col < 0:
+            raise ValueError(f"{month} is before the first month of the index")
+        if col >= self.months:
+            grow = col + 1 - self.months
+            self.qty = np.concatenate([self.qty, np.full((len(self.codes), grow), np.nan)], axis=1)
+            self.month_totals = np.concatenate([self.month_totals, np.zeros(grow)])
+
+        rows = np.searchsorted(self.codes, items)
+        cell = self.qty[:, col]
+        cell[rows] = np.where(np.isnan(cell[rows]), 0, cell[rows])
+        np.add.at(cell, rows, qty)
+        np.add.at(self.totals, rows, qty)
+        self.month_totals[col] += qty.sum()
+        self._rerank(np.unique(rows))
+
+    def ingest_csv(self, path):
+        # A month file like the ones update_summary_with_new_month takes (YearMonth, Item_Code, Order_Qty)
+        df = pd.read_csv(path, usecols=['YearMonth', 'Item_Code', 'Order_Qty'])
+        df['YearMonth'] = pd.to_datetime(df['YearMonth'])
+        for month, chunk in df.groupby('YearMonth', sort=True):
+            self.ingest_month(chunk['Item_Code'].to_numpy(), month, chunk['Order_Qty'].to_numpy(dtype=float))
+
+    # === Queries ===
+
+    def _window(self, start=None, end=None):
+        # Column slice for months start..end (labels or timestamps, inclusive)
+        a = 0 if start is None else max(_ordinal(start) - self.first, 0)
+        b = self.months if end is None else min(_ordinal(end) - self.first + 1, self.months)
+        return slice(a, b)
+
+    def top(self, n=10, start=None, end=None):
+        # [(item, total)] for the n largest totals, over all months or a window of months
+        if start is None and end is None:
+            rows = self.order[:n]
+            return [(str(self.codes[i]), float(self.totals[i])) for i in rows]
+        sums = np.nansum(self.qty[:, self._window(start, end)], axis=1)
+        rows = rank(sums, n)
+        return [(str(self.codes[i]), float(sums[i])) for i in rows]
+
+    def heatmap_frame(self, items, start=None, end=None):
+        # Item × month quantities of the given items, like pivot_table(..., aggfunc='sum', fill_value=0)
+        # on the grid: rows in item code order, missing months as 0
+        rows = np.sort(np.searchsorted(self.codes, np.asarray(items, dtype=str)))
+        window = self._window(start, end)
+        months = [_month_start(self.first + c) for c in range(window.start, window.stop)]
+        return pd.DataFrame(np.nan_to_num(np.asarray(self.qty[rows, window])),
+                            index=pd.Index(self.codes[rows], name='Item_Code'),
+                            columns=pd.DatetimeIndex(months, name='YearMonth'))
+
+    def monthly_totals(self):
+        return pd.Series(self.month_totals, index=pd.DatetimeIndex(
+            [_month_start(self.first + c) for c in range(self.months)], name='YearMonth'))
+
+    # === Persistence ===
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), np.asarray(getattr(self, name)))
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'first': self.first, 'items': len(self.codes), 'months': self.months,
+                       'source': self.source}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        # The quantity matrix is memory mapped, so slices only read their rows
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), allow_pickle=False,
+                                mmap_mode='r' if mmap and name == 'qty' else None)
+                  for name in ARRAYS}
+        index = cls(arrays['codes'], meta['first'], arrays['qty'], arrays['totals'], arrays['month_totals'],
+                    arrays['order'])
+        index.source = meta.get('source')
+        return index
+
+
+def open_index(directory, grid_path):
+    # Saved index, (re)built from the grid (CSV or .grid) and saved when there is none
+    # or the grid changed since it was built. Months ingested later are kept until then.
+    stamp = source_stamp(grid_path)
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        index = RankingIndex.load(directory)
+        if index.source == stamp:
+            return index
+
+    from dense_grid import read_grid_matrix
+
+    index = RankingIndex.from_grid(*read_grid_matrix(grid_path))
+    index.source = stamp
+    index.save(directory)
+    return index
+
+
+def top_by_forecast(summary_path, forecast_month='2025-04', n=10, as_of=None):
+    # [(item, qty)] of the n largest summary forecasts for a month
+    from summary_store import load_table
+
+    return load_table(summary_path, as_of).predictions(forecast_month, top_n=n)
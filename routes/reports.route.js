@@ -5,6 +5,10 @@ import {
   getGenderDistribution,
   getAgeDistribution,
   predictForecast,
+  predictForecastRange,
+  submitJob,
+  getJobStatus,
+  listJobs,
 } from '../controllers/reports.controller'
 
 const router = express.Router()
@@ -14,5 +18,9 @@ router.get('/items-by-season', getItemsBySeason)
 router.get('/gender-distribution', getGenderDistribution)
 router.get('/age-distribution', getAgeDistribution)
 router.get('/forecast', predictForecast)
+router.get('/forecast/range', predictForecastRange)
+router.post('/jobs', submitJob)
+router.get('/jobs', listJobs)
+router.get('/jobs/:jobId', getJobStatus)
 
 export default router
@@ -0,0 +1,221 @@
+"""
+Forecast intervals, safety stock and reorder points for every item in one batch.
+
+The summary forecaster (summary_table.py) gives a point quantity per item and
+month. This stage adds, for `horizon` months from the forecast month:
+
+  forecast, lower, upper   point forecast and a `coverage` interval per month
+  safety_stock             stock to hold against demand variation over the lead time,
+                           at the `service_level` (probability of no stockout)
+  reorder_point            forecast demand over the lead time + safety stock, rounded up
+
+Two ways to size the variation:
+
+  normal     from the stored std_dev_qty: interval f ± z·σ, safety stock
+             z·σ·√lead_time (monthly demand taken as independent)
+  empirical  from the item's own history in the grid: quantiles of the monthly
+             deviations from mean_qty (interval) and of the deviations of every
+             lead_time-month window sum (safety stock), so skewed and
+             intermittent demand is not forced into a symmetric band. Items with
+             fewer than min_points windows fall back to normal.
+
+The summary forecaster has no horizon-dependent error model, so the interval
+width is the same for every month of the horizon.
+
+All items are computed together on (items × months) arrays; quantiles are
+taken row-wise on sorted arrays, without a per-item loop. The result is saved
+as a directory of .npy files plus meta.json, rows sorted by item code, which
+item_export.py joins into the item upserts.
+"""
+import json
+import math
+import os
+from statistics import NormalDist
+
+import numpy as np
+
+from instrumentation import count_rows, timed
+
+METHODS = ('normal', 'empirical')
+ARRAYS = ('items', 'forecast', 'lower', 'upper', 'safety_stock', 'reorder_point', 'method')
+
+
+def _months(forecast_month, horizon):
+    # (month numbers, 'YYYY-MM' labels) of the horizon months
+    year, month = (int(part) for part in forecast_month.split('-'))
+    ordinals = year * 12 + month - 1 + np.arange(horizon)
+    return ordinals % 12 + 1, [f'{o // 12}-{o % 12 + 1:02d}' for o in ordinals]
+
+
+def row_quantile(values, q):
+    # Per-row quantile ignoring NaN, linear interpolation like np.nanquantile; NaN for empty rows
+    values = np.sort(values, axis=1)  # NaN sorts last
+    n = (~np.isnan(values)).sum(axis=1)
+    position = q * np.maximum(n - 1, 0)
+    lo = np.floor(position).astype(np.int64)
+    hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+    rows = np.arange(len(values))
+    with np.errstate(invalid='ignore'):
+        result = values[rows, lo] + (position - lo) * (values[rows, hi] - values[rows, lo])
+    result[n == 0] = np.nan
+    return result
+
+
+def window_sums(qty, width):
+    # Sums of every `width` consecutive months per row; NaN where a window has a missing month
+    if width > qty.shape[1]:
+        return np.full((len(qty), 0), np.nan)
+    missing = np.isnan(qty)
+    total = np.cumsum(np.nan_to_num(qty), axis=1)
+    gaps = np.cumsum(missing, axis=1)
+    total = np.concatenate([np.zeros((len(qty), 1)), total], axis=1)
+    gaps = np.concatenate([np.zeros((len(qty), 1), dtype=np.int64), gaps], axis=1)
+    sums = total[:, width:] - total[:, :-width]
+    sums[(gaps[:, width:] - gaps[:, :-width]) > 0] = np.nan
+    return sums
+
+
+class SafetyStock:
+    def __init__(self, items, months, forecast, lower, upper, safety_stock, reorder_point, method, params):
+        self.items = np.asarray(items, dtype=str)  # sorted item codes, row = position
+        self.months = list(months)                  # 'YYYY-MM' label per horizon column
+        self.forecast = forecast                    # items × horizon, NaN for items without a forecast
+        self.lower = lower
+        self.upper = upper
+        self.safety_stock = safety_stock            # (items,)
+        self.reorder_point = reorder_point          # (items,)
+        self.method = method                        # (items,) index into METHODS
+        self.params = params
+
+    def __len__(self):
+        return len(self.items)
+
+    def rows(self, items):
+        # Row per item code, -1 for items not in the table
+        items = np.asarray(items, dtype=str)
+        at = np.minimum(np.searchsorted(self.items, items), max(len(self.items) - 1, 0))
+        found = len(self.items) > 0
+        return np.where(found & (self.items[at] == items), at, -1) if found else np.full(len(items), -1)
+
+    def lookup(self, items):
+        # item → {'safetyStock', 'reorderPoint'} for the items that have them
+        rows = self.rows(items)
+        out = {}
+        for item, row in zip(np.asarray(items).tolist(), rows.tolist()):
+            if row >= 0 and not np.isnan(self.reorder_point[row]):
+                out[item] = {'safetyStock': int(math.ceil(self.safety_stock[row])),
+                             'reorderPoint': int(self.reorder_point[row])}
+        return out
+
+    def to_frame(self):
+        import pandas as pd
+
+        # Long table: one row per item and horizon month
+        n, horizon = self.forecast.shape
+        return pd.DataFrame({
+            'Item_Code': np.repeat(self.items, horizon),
+            'YearMonth': np.tile(self.months, n),
+            'forecast': self.forecast.ravel(),
+            'lower': self.lower.ravel(),
+            'upper': self.upper.ravel(),
+            'safety_stock': np.repeat(self.safety_stock, horizon),
+            'reorder_point': np.repeat(self.reorder_point, horizon),
+            'method': np.repeat(np.asarray(METHODS)[self.method], horizon),
+        })
+
+    # === Persistence ===
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(directory, f'{name}.npy'), np.asarray(getattr(self, name)), allow_pickle=False)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'months': self.months, 'params': self.params}, f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        with open(os.path.join(directory, 'meta.json'), 'r') as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(directory, f'{name}.npy'), allow_pickle=False,
+                                mmap_mode='r' if mmap and name != 'items' else None)
+                  for name in ARRAYS}
+        return cls(months=meta['months'], params=meta['params'], **arrays)
+
+
+def compute_safety_stock(table, forecast_month='2025-04', horizon=3, lead_time=1, service_level=0.95,
+                         coverage=0.8, method='normal', history=None, min_points=6):
+    # table: SummaryTable. history: read_grid_matrix output, needed for method='empirical'
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r}; expected one of {', '.join(METHODS)}")
+    if not 1 <= lead_time <= horizon:
+        raise ValueError("lead_time must be between 1 and horizon months")
+    if method == 'empirical' and history is None:
+        raise ValueError("method='empirical' needs the grid history")
+
+    month_nums, labels = _months(forecast_month, horizon)
+    forecast, valid = table.forecast(month_nums)
+    forecast = forecast.astype(float)
+    forecast[~valid] = np.nan
+
+    # === Normal: stored standard deviation ===
+    sigma = np.nan_to_num(table.std_dev_qty)
+    z_interval = NormalDist().inv_cdf((1 + coverage) / 2)
+    z_service = NormalDist().inv_cdf(service_level)
+    low_dev = np.repeat(-z_interval * sigma[:, None], horizon, axis=1)
+    high_dev = np.repeat(z_interval * sigma[:, None], horizon, axis=1)
+    safety = z_service * sigma * math.sqrt(lead_time)
+    used = np.zeros(len(table), dtype=np.int8)
+
+    # === Empirical: quantiles of the item's own deviations ===
+    if method == 'empirical':
+        import pandas as pd
+
+        items, _, qty = history
+        at = pd.Index(items).get_indexer(table.items)
+        qty = np.where(at[:, None] >= 0, np.asarray(qty, dtype=float)[np.maximum(at, 0)], np.nan)
+        mean = table.mean_qty[:, None]
+
+        monthly = qty - mean
+        lead = window_sums(qty, lead_time) - lead_time * mean
+        enough = (~np.isnan(lead)).sum(axis=1) >= min_points
+
+        emp_low = row_quantile(monthly, (1 - coverage) / 2)
+        emp_high = row_quantile(monthly, (1 + coverage) / 2)
+        low_dev[enough] = emp_low[enough, None]
+        high_dev[enough] = emp_high[enough, None]
+        safety = np.where(enough, np.maximum(row_quantile(lead, service_level), 0), safety)
+        used[enough] = METHODS.index('empirical')
+
+    lower = np.maximum(forecast + low_dev, 0)
+    upper = np.maximum(forecast + high_dev, 0)
+    safety = np.where(valid, safety, np.nan)
+    reorder_point = np.ceil(forecast[:, :lead_time].sum(axis=1) + safety)
+
+    # Rows sorted by item code, for binary search joins
+    order = np.argsort(np.asarray(table.items, dtype=str), kind='stable')
+    params = {'forecast_month': forecast_month, 'horizon': horizon, 'lead_time': lead_time,
+              'service_level': service_level, 'coverage': coverage, 'method': method}
+    return SafetyStock(np.asarray(table.items, dtype=str)[order], labels, forecast[order], lower[order],
+                       upper[order], safety[order], reorder_point[order], used[order], params)
+
+
+@timed
+def build_safety_stock(summary_path='item_summary_stats_updated.json', output_dir='safety_stock',
+                       forecast_month='2025-04', horizon=3, lead_time=1, service_level=0.95, coverage=0.8,
+                       method='normal', grid_path=None, as_of=None, export_csv=None):
+    # Safety stock for every summarized item, saved to output_dir; returns row counts per method
+    from summary_store import load_table
+
+    table = load_table(summary_path, as_of)
+    count_rows(len(table))
+    history = None
+    if method == 'empirical':
+        from dense_grid import read_grid_matrix
+        history = read_grid_matrix(grid_path or 'final_output_with_nan.csv')
+
+    result = compute_safety_stock(table, forecast_month, horizon, lead_time, service_level, coverage,
+                                  method, history)
+    result.save(output_dir)
+    if export_csv:
+        result.to_frame().to_csv(export_csv, index=False)
+    return {'counts': {name: int((result.method == i).sum()) for i, name in enumerate(METHODS)}}
@@ -0,0 +1,339 @@
+"""
+Storage backends for the item summaries.
+
+Three formats, picked by file extension:
+
+  .json    the original pretty-printed JSON (item → stats dict)
+  .sumbin  fixed-width binary records, memory-mapped on open
+  (none)   a versions directory (summary_versions.py): reads take an optional
+           version (number or month label, default latest), writes add a
+           version labelled with the month they bring the summaries up to
+
+A .sumbin file is laid out as
+
+    magic (8 bytes) | header length (uint32) | JSON header | padding
+    records   structured array, one fixed-width record per item, summary order
+    codes     item codes (fixed-width UTF-8), summary order
+    sorted    item codes sorted, for binary search
+    perm      int64 position of each sorted code in the records
+
+Opening the file only parses the small header; looking up one item is a binary
+search over the sorted code column plus one record read, without touching the
+rest of the file. Missing float fields are stored as NaN. Summaries carrying
+sufficient statistics ("stats") get extra record fields, flagged in the header.
+"""
+import json
+import os
+
+import numpy as np
+
+from summary_table import SummaryTable
+
+MAGIC = b'ITMSUM01'
+ALIGN = 64
+LAST6_WIDTH = 6
+
+SUMMARY_FIELDS = ['mean_qty', 'std_dev_qty', 'slope', 'intercept']
+STATS_FIELDS = ['sum', 'sum_sq', 'sum_xy']
+
+
+def record_dtype(last6_width=LAST6_WIDTH, with_stats=False):
+    fields = [
+        ('mean_qty', '<f8'),
+        ('std_dev_qty', '<f8'),
+        ('slope', '<f8'),
+        ('intercept', '<f8'),
+        ('last6', '<f8', (last6_width,)),
+        ('last6_len', '<i2'),
+        ('last6_int', '?'),
+        ('seasonality', '<f8', (12,)),
+        ('last_updated', 'S10'),
+    ]
+    if with_stats:
+        # Sufficient statistics (see generate_summary_stats.update_summary_incremental);
+        # n == -1 marks an item without them
+        fields += [
+            ('n', '<i8'),
+            ('sum', '<f8'),
+            ('sum_sq', '<f8'),
+            ('sum_xy', '<f8'),
+            ('month_n', '<i8', (12,)),
+            ('month_sum', '<f8', (12,)),
+        ]
+    return np.dtype(fields)
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+# === Dispatch ===
+
+def is_binary(path):
+    return str(path).endswith('.sumbin')
+
+
+def is_versioned(path):
+    return os.path.isdir(path) or not os.path.splitext(str(path))[1]
+
+
+def _versions(path):
+    from summary_versions import SummaryVersions
+    return SummaryVersions(path)
+
+
+def load_summaries(path, version=None):
+    # Full item → stats dict, whatever the backend
+    if is_versioned(path):
+        return summaries_from_records(*_versions(path).materialize(version))
+    if is_binary(path):
+        return BinarySummaryStore(path).to_dict()
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_summaries(summaries, path, label=None):
+    if is_versioned(path):
+        _versions(path).commit(*records_from_summaries(summaries), label)
+    elif is_binary(path):
+        write_binary(summaries, path)
+    else:
+        with open(path, 'w') as f:
+            json.dump(summaries, f, indent=2)
+
+
+def load_records(path, version=None):
+    # (items, records) with records as an in-memory structured array
+    if is_versioned(path):
+        return _versions(path).materialize(version)
+    if is_binary(path):
+        store = BinarySummaryStore(path)
+        return store.item_codes(), np.array(store.records)
+    return records_from_summaries(load_summaries(path))
+
+
+def save_records(items, records, path, label=None):
+    if is_versioned(path):
+        _versions(path).commit(items, records, label)
+    elif is_binary(path):
+        write_records(items, records, path)
+    else:
+        save_summaries(summaries_from_records(items, records), path)
+
+
+def load_table(path, version=None):
+    # SummaryTable for batch forecasting; the binary and versioned backends skip the dict entirely
+    if is_versioned(path):
+        return _versions(path).table(version)
+    if is_binary(path):
+        return BinarySummaryStore(path).table()
+    return SummaryTable.from_summaries(load_summaries(path))
+
+
+def json_to_binary(json_path, binary_path):
+    with open(json_path, 'r') as f:
+        write_binary(json.load(f), binary_path)
+
+
+def binary_to_json(binary_path, json_path):
+    save_summaries(BinarySummaryStore(binary_path).to_dict(), json_path)
+
+
+# === Binary backend ===
+
+def write_binary(summaries, path):
+    write_records(*records_from_summaries(summaries), path)
+
+
+def records_from_summaries(summaries):
+    items = list(summaries.keys())
+    n = len(items)
+
+    width = max((len(s.get('last_6_months', [])) for s in summaries.values()), default=0)
+    with_stats = any('stats' in s for s in summaries.values())
+    dtype = record_dtype(max(width, LAST6_WIDTH), with_stats)
+    records = np.zeros(n, dtype=dtype)
+    for field in SUMMARY_FIELDS:
+        records[field] = np.nan
+    records['seasonality'] = np.nan
+    if with_stats:
+        records['n'] = -1
+
+    for i, stats in enumerate(summaries.values()):
+        rec = records[i]
+        for field in SUMMARY_FIELDS:
+            if field in stats:
+                rec[field] = stats[field]
+
+        values = stats.get('last_6_months', [])
+        rec['last6'][:len(values)] = values
+        rec['last6_len'] = len(values)
+        rec['last6_int'] = all(isinstance(v, (int, np.integer)) for v in values)
+
+        for month, value in stats.get('seasonality', {}).items():
+            rec['seasonality'][int(month) - 1] = value
+
+        rec['last_updated'] = stats.get('last_updated', '').encode('ascii')
+
+        if 'stats' in stats:
+            suff = stats['stats']
+            rec['n'] = suff['n']
+            for field in STATS_FIELDS:
+                rec[field] = suff[field]
+            rec['month_n'] = suff['month_n']
+            rec['month_sum'] = suff['month_sum']
+
+    return items, records
+
+
+def write_records(items, records, path):
+    n = len(items)
+
+    encoded = [item.encode('utf-8') for item in items]
+    code_width = max((len(c) for c in encoded), default=1)
+    codes = np.array(encoded, dtype=f'S{code_width}')
+    perm = np.argsort(codes, kind='stable').astype('<i8')
+    sorted_codes = codes[perm]
+
+    header = {
+        'n_items': n,
+        'code_width': code_width,
+        'last6_width': int(records.dtype['last6'].shape[0]),
+        'with_stats': 'n' in records.dtype.names,
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+
+    sections = [records, codes, sorted_codes, perm]
+    offset = _aligned(len(MAGIC) + 4 + len(header_bytes))
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint32(len(header_bytes)).tobytes())
+        f.write(header_bytes)
+        for section in sections:
+            f.write(b'\0' * (offset - f.tell()))
+            f.write(section.tobytes())
+            offset = _aligned(f.tell())
+
+
+class BinarySummaryStore:
+    def __init__(self, path):
+        self.path = path
+
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a summary store file")
+            header_len = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+            header = json.loads(f.read(header_len))
+
+        n = header['n_items']
+        code_dtype = np.dtype(f"S{header['code_width']}")
+        dtype = record_dtype(header['last6_width'], header.get('with_stats', False))
+
+        offset = _aligned(len(MAGIC) + 4 + header_len)
+        sections = {}
+        for name, section_dtype in [('records', dtype), ('codes', code_dtype),
+                                    ('sorted', code_dtype), ('perm', np.dtype('<i8'))]:
+            sections[name] = self._map(section_dtype, n, offset)
+            offset = _aligned(offset + section_dtype.itemsize * n)
+
+        self.records = sections['records']
+        self.codes = sections['codes']
+        self._sorted = sections['sorted']
+        self._perm = sections['perm']
+
+    def _map(self, dtype, n, offset):
+        if n == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode='r', offset=offset, shape=(n,))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __contains__(self, item):
+        return self.position(item) is not None
+
+    def position(self, item):
+        key = item.encode('utf-8')
+        if len(key) > self.codes.dtype.itemsize:
+            return None
+        i = int(np.searchsorted(self._sorted, key))
+        if i < len(self._sorted) and self._sorted[i] == key:
+            return int(self._perm[i])
+        return None
+
+    def get(self, item, default=None):
+        pos = self.position(item)
+        if pos is None:
+            return default
+        return _record_to_stats(self.records[pos])
+
+    def __getitem__(self, item):
+        stats = self.get(item)
+        if stats is None:
+            raise KeyError(item)
+        return stats
+
+    def item_codes(self):
+        return [c.decode('utf-8') for c in self.codes]
+
+    def to_dict(self):
+        return summaries_from_records(self.item_codes(), self.records)
+
+    def table(self):
+        return table_from_records(self.item_codes(), self.records)
+
+
+def table_from_records(items, records):
+    # SummaryTable straight from a records array (memory mapped or in memory)
+    return SummaryTable(
+        items=items,
+        mean_qty=np.array(records['mean_qty']),
+        slope=np.nan_to_num(records['slope'], nan=0.0),
+        intercept=np.nan_to_num(records['intercept'], nan=0.0),
+        last6=np.array(records['last6']),
+        last6_len=records['last6_len'].astype(np.int64),
+        seasonality=np.array(records['seasonality']),
+        std_dev_qty=np.array(records['std_dev_qty']),
+        last_updated=np.char.decode(np.asarray(records['last_updated']), 'ascii'),
+    )
+
+
+def summaries_from_records(items, records):
+    # Column-wise conversion: one tolist() per field instead of per-record access
+    rec = records
+    fields = {field: rec[field].tolist() for field in SUMMARY_FIELDS}
+    last6 = rec['last6'].tolist()
+    last6_len = rec['last6_len'].tolist()
+    last6_int = rec['last6_int'].tolist()
+    seasonality = rec['seasonality'].tolist()
+    last_updated = rec['last_updated'].tolist()
+    with_stats = 'n' in rec.dtype.names
+    if with_stats:
+        suff = {field: rec[field].tolist() for field in ['n', 'month_n', 'month_sum'] + STATS_FIELDS}
+
+    summaries = {}
+    for i, item in enumerate(items):
+        stats = _stats_from_columns(
+            [fields[field][i] for field in SUMMARY_FIELDS],
+            last6[i][:last6_len[i]], last6_int[i], seasonality[i], last_updated[i])
+        if with_stats and suff['n'][i] >= 0:
+            stats['stats'] = {field: suff[field][i] for field in ['n'] + STATS_FIELDS + ['month_n', 'month_sum']}
+        summaries[item] = stats
+    return summaries
+
+
+def _record_to_stats(rec):
+    return summaries_from_records([None], np.asarray(rec).reshape(1))[None]
+
+
+def _stats_from_columns(values, last6, last6_int, seasonality, last_updated):
+    # NaN marks a float field that was absent from the original summary
+    stats = {field: value for field, value in zip(SUMMARY_FIELDS, values) if value == value}
+    stats['last_6_months'] = [int(v) for v in last6] if last6_int else last6
+    stats['seasonality'] = {str(m + 1): v for m, v in enumerate(seasonality) if v == v}
+
+    last_updated = last_updated.decode('ascii')
+    if last_updated:
+        stats['last_updated'] = last_updated
+    return stats
@@ -0,0 +1,154 @@
+"""
+Columnar view of the item summaries for batch forecasting.
+
+The summaries dict (item → stats) is turned into NumPy arrays once, after which
+forecasts for every item and any number of target months are computed in one
+vectorized pass. Results match predict_next_month_quantities exactly,
+including its ordering (quantity descending, ties in summary order).
+"""
+import numpy as np
+
+
+class SummaryTable:
+    def __init__(self, items, mean_qty, slope, intercept, last6, last6_len, seasonality, std_dev_qty=None,
+                 last_updated=None):
+        self.items = items                  # list of item codes, in summary order
+        self.mean_qty = mean_qty            # (n,)
+        self.slope = slope                  # (n,)
+        self.intercept = intercept          # (n,)
+        self.last6 = last6                  # (n, w) zero padded on the right
+        self.last6_len = last6_len          # (n,) number of real values per row
+        self.seasonality = seasonality      # (n, 12) NaN where a month is missing
+        # (n,) NaN where a summary has none; only used for intervals (safety_stock.py)
+        self.std_dev_qty = np.full(len(items), np.nan) if std_dev_qty is None else std_dev_qty
+        self.last_updated = last_updated    # (n,) 'YYYY-MM-DD' of each item's last month, '' if unknown
+        self._index = None
+        self._codes = None
+
+    @classmethod
+    def from_summaries(cls, summaries):
+        items = list(summaries.keys())
+        n = len(items)
+
+        width = max((len(s.get('last_6_months', [])) for s in summaries.values()), default=0)
+        width = max(width, 6)
+
+        mean_qty = np.empty(n)
+        std_dev_qty = np.empty(n)
+        last_updated = np.array([s.get('last_updated', '') for s in summaries.values()], dtype=str)
+        slope = np.empty(n)
+        intercept = np.empty(n)
+        last6 = np.zeros((n, width))
+        last6_len = np.empty(n, dtype=np.int64)
+        seasonality = np.full((n, 12), np.nan)
+
+        for i, stats in enumerate(summaries.values()):
+            mean_qty[i] = stats['mean_qty']
+            std_dev_qty[i] = stats.get('std_dev_qty', np.nan)
+            slope[i] = stats.get('slope', 0)
+            intercept[i] = stats.get('intercept', 0)
+
+            values = stats.get('last_6_months', [])
+            last6[i, :len(values)] = values
+            last6_len[i] = len(values)
+
+            for month, value in stats.get('seasonality', {}).items():
+                seasonality[i, int(month) - 1] = value
+
+        return cls(items, mean_qty, slope, intercept, last6, last6_len, seasonality, std_dev_qty, last_updated)
+
+    def __len__(self):
+        return len(self.items)
+
+    def data_end(self):
+        # Month ordinal (year * 12 + month - 1) of the latest data in the summaries, None if unknown
+        if self.last_updated is None or not len(self.last_updated):
+            return None
+        latest = max(self.last_updated)
+        if not latest:
+            return None
+        return int(latest[:4]) * 12 + int(latest[5:7]) - 1
+
+    def index_of(self, item_codes):
+        # Row positions for the given codes in summary order; unknown codes are dropped
+        if self._index is None:
+            self._index = {item: i for i, item in enumerate(self.items)}
+        return np.unique(np.array([self._index[c] for c in item_codes if c in self._index], dtype=np.int64))
+
+    def select(self, items=None, prefixes=None):
+        # Rows matching an item list and/or code prefixes ('PRO-', 'BRD-'), None for all
+        if not items and not prefixes:
+            return None
+        selected = np.zeros(len(self), dtype=bool)
+        if items:
+            selected[self.index_of(items)] = True
+        if prefixes:
+            if self._codes is None:
+                self._codes = np.array(self.items, dtype=str)
+            for prefix in prefixes:
+                selected |= np.char.startswith(self._codes, prefix)
+        return np.flatnonzero(selected)
+
+    def forecast(self, month_nums, rows=None):
+        """Forecast matrix (rows × months) of rounded, non-negative quantities.
+
+        Items with fewer than 2 recent values cannot be forecast; their rows
+        are returned but flagged False in the accompanying valid mask.
+        """
+        month_nums = np.atleast_1d(np.asarray(month_nums, dtype=np.int64))
+        if rows is None:
+            rows = np.arange(len(self))
+
+        n_recent = self.last6_len[rows]
+        mean_qty = self.mean_qty[rows]
+
+        # Recent average: padding is zero so the row sum equals the sum of real values
+        with np.errstate(invalid='ignore', divide='ignore'):
+            recent_avg = self.last6[rows].sum(axis=1) / n_recent
+
+        # Linear trend at the next index (len(last6))
+        trend_estimate = self.slope[rows] * n_recent + self.intercept[rows]
+
+        # Seasonality adjustment per target month, falling back to the mean
+        seasonal = self.seasonality[rows][:, month_nums - 1]
+        seasonal = np.where(np.isnan(seasonal), mean_qty[:, None], seasonal)
+        seasonal_boost = seasonal - mean_qty[:, None]
+
+        predicted = (trend_estimate + recent_avg)[:, None] + seasonal_boost
+        valid = n_recent >= 2
+        predicted[~valid] = 0
+        predicted = np.maximum(0, np.rint(predicted)).astype(np.int64)
+
+        return predicted, valid
+
+    def predictions(self, forecast_month='2025-04', top_n=None, rows=None):
+        # Same output as predict_next_month_quantities: [(item, qty), ...] sorted
+        month_num = int(forecast_month.split('-')[1])
+        predicted, valid = self.forecast([month_num], rows=rows)
+
+        if rows is None:
+            rows = np.arange(len(self))
+        rows = rows[valid]
+        qty = predicted[valid, 0]
+
+        order = rank(qty, top_n)
+        return [(self.items[i], int(q)) for i, q in zip(rows[order], qty[order])]
+
+
+def rank(qty, top_n=None):
+    """Positions of qty sorted descending, ties in original order, cut to top_n."""
+    n = len(qty)
+    if top_n is None or top_n >= n:
+        candidates = np.arange(n)
+    elif top_n <= 0:
+        return np.arange(0)
+    else:
+        # Everything strictly above the top_n-th value, then ties in original order
+        kth = np.argpartition(-qty, top_n - 1)[top_n - 1]
+        threshold = qty[kth]
+        above = np.flatnonzero(qty > threshold)
+        ties = np.flatnonzero(qty == threshold)[:top_n - len(above)]
+        candidates = np.concatenate([above, ties])
+
+    order = np.lexsort((candidates, -qty[candidates]))
+    return candidates[order]
@@ -0,0 +1,176 @@
+"""
+Versioned item summaries: one base snapshot plus per-month copy-on-write deltas.
+
+Instead of a full item_summary_stats_updated.json per monthly update, a
+versions directory keeps
+
+    manifest.json             version list: label (e.g. '2025-03'), kind, files
+    base.sumbin               version 0, a full summary store (summary_store.py)
+    delta_00001.npz           item codes + full records of only the items that
+                              changed (or were added) in that version, compressed
+    checkpoint_00008.sumbin   full materialized state every `checkpoint_every` deltas
+
+Materializing a version starts from the newest full file at or before it
+(base, checkpoint or snapshot) and applies at most checkpoint_every - 1
+deltas, each one vectorized row replacement. A version whose record layout
+differs from the previous one (e.g. stats added) is stored as a full
+snapshot instead of a delta.
+
+With the zero-filled grid every item gets a row every month, so a monthly
+delta holds nearly all items; compressed, it is still about a tenth of a
+full snapshot. Monthly files with only the items that had orders give
+smaller deltas.
+
+summary_store.py treats a path without an extension as a versions directory,
+so the summary functions read (any version) and write (a new version) it
+like a .json or .sumbin file, and forecasts can be made as of an earlier
+month.
+"""
+import json
+import os
+
+import numpy as np
+
+from summary_store import BinarySummaryStore, load_records, save_records, table_from_records, write_records
+
+MANIFEST_NAME = 'manifest.json'
+FULL_KINDS = ('base', 'snapshot')
+
+
+def _row_bytes(records):
+    # One opaque value per record, for change detection (NaN == NaN, unlike field compares)
+    records = np.ascontiguousarray(records)
+    return records.view(np.dtype((np.void, records.dtype.itemsize)))
+
+
+class SummaryVersions:
+    def __init__(self, directory, checkpoint_every=6):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {'checkpoint_every': checkpoint_every, 'versions': []}
+
+    def __len__(self):
+        return len(self.manifest['versions'])
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _save_manifest(self):
+        tmp = self.manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    # === Lookup ===
+
+    def versions(self):
+        return list(self.manifest['versions'])
+
+    def resolve(self, version=None):
+        # Version number for an int, a label ('2025-03') or None (latest)
+        versions = self.manifest['versions']
+        if not versions:
+            raise ValueError(f"{self.directory} has no summary versions")
+        if version is None:
+            return len(versions) - 1
+        if isinstance(version, str):
+            for entry in reversed(versions):
+                if entry['label'] == version:
+                    return entry['version']
+            raise KeyError(f"No summary version labelled {version!r}")
+        if not 0 <= version < len(versions):
+            raise KeyError(f"No summary version {version}")
+        return version
+
+    # === Reading ===
+
+    def materialize(self, version=None):
+        # (items, records) of a version, as an in-memory structured array
+        target = self.resolve(version)
+        versions = self.manifest['versions']
+
+        start = target
+        while versions[start]['kind'] not in FULL_KINDS and 'checkpoint' not in versions[start]:
+            start -= 1
+        full = versions[start].get('checkpoint') or versions[start]['file']
+        store = BinarySummaryStore(self._path(full))
+        items, records = store.item_codes(), np.array(store.records)
+
+        for entry in versions[start + 1:target + 1]:
+            items, records = self._apply(items, records, entry)
+        return items, records
+
+    def _apply(self, items, records, entry):
+        with np.load(self._path(entry['file']), allow_pickle=False) as delta:
+            codes, rows = delta['codes'].tolist(), delta['records']
+
+        position = {item: i for i, item in enumerate(items)}
+        at = np.array([position.get(code, -1) for code in codes], dtype=np.int64)
+        known = at >= 0
+        records[at[known]] = rows[known]
+        if not known.all():
+            items = items + [code for code, k in zip(codes, known) if not k]
+            records = np.concatenate([records, rows[~known]])
+        return items, records
+
+    def table(self, version=None):
+        return table_from_records(*self.materialize(version))
+
+    # === Writing ===
+
+    def commit(self, items, records, label):
+        # Add a version; returns its number. Items are never dropped from later versions.
+        os.makedirs(self.directory, exist_ok=True)
+        versions = self.manifest['versions']
+        number = len(versions)
+        entry = {'version': number, 'label': label}
+
+        previous = self.materialize() if versions else None
+        if previous is None or previous[1].dtype != records.dtype:
+            entry['kind'] = 'base' if previous is None else 'snapshot'
+            entry['file'] = 'base.sumbin' if previous is None else f'snapshot_{number:05d}.sumbin'
+            write_records(list(items), records, self._path(entry['file']))
+            entry['items'] = len(items)
+        else:
+            old_items, old_records = previous
+            position = {item: i for i, item in enumerate(old_items)}
+            at = np.array([position.get(item, -1) for item in items], dtype=np.int64)
+            changed = at < 0
+            known = ~changed
+            changed[known] = _row_bytes(records[known]) != _row_bytes(old_records[at[known]])
+
+            entry['kind'] = 'delta'
+            entry['file'] = f'delta_{number:05d}.npz'
+            entry['changed'] = int(changed.sum())
+            np.savez_compressed(self._path(entry['file']),
+                                codes=np.array([items[i] for i in np.flatnonzero(changed)], dtype=str),
+                                records=records[changed])
+
+            # Deltas since the last full file; checkpoint every checkpoint_every of them
+            since = 1
+            for prior in reversed(versions):
+                if prior['kind'] in FULL_KINDS or 'checkpoint' in prior:
+                    break
+                since += 1
+            if since >= self.manifest['checkpoint_every']:
+                merged_items, merged = self._apply(list(old_items), old_records, entry)
+                entry['checkpoint'] = f'checkpoint_{number:05d}.sumbin'
+                write_records(merged_items, merged, self._path(entry['checkpoint']))
+
+        versions.append(entry)
+        self._save_manifest()
+        return number
+
+    def commit_file(self, summary_path, label):
+        # Add a version from a summary file (.json or .sumbin)
+        items, records = load_records(summary_path)
+        return self.commit(items, records, label)
+
+    def export(self, path, version=None):
+        # Full summary file of one version (.json or .sumbin, by extension)
+        items, records = self.materialize(version)
+        save_records(items, records, path)